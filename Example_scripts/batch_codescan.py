@@ -1,58 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os,sys,subprocess
-from codescanner_analysis import CodescannerAnalysisData as CAD
-
-import os,sys,inspect
-import subprocess
-import shutil
-import re
-import shutil
-import time
-import pickle
-import errno
+import os,sys
+from codescanner_analysis import batch
+from codescanner_analysis.columnar_export import ColumnarWriter
 
 RESULTFOLDER = "/ram/"
+# bigger files are scanned and plotted up to this size only
+MAX_SCAN_SIZE = 1024*1024*2
 
 # Example code
 
 # Description:
-# Take an input folder (with subdirs) and simply batch codescan all to RESULTDOLDER.
+# Take an input folder (with subdirs, any depth) and batch codescan all files to RESULTFOLDER,
+# using all cpu cores. A byteplot png of every file is written by the workers,
+# results are printed as soon as they are finished,
+# and appended to columnar chunk files in outdir, if given.
+#
+# python3 batch_codescan.py indir (processes) (timeout in seconds per file) (outdir)
 
 # The imports assume codescanner_analysis is globally installed (or use virtualenv).
 # Or change the imports to your liking.
 
-def dummyfunction(finamepath):
-    
-    print(finamepath)
-    
-    return
-
 
-def plot_file(finamepath):
-    
-    print(finamepath)
-    
-    finamesize = os.path.getsize(finamepath)
-    cad = None
-    
-    if (finamesize > (1024*1024*2)): 
-        startAt = 0
-        endsAt = (1024*1024*2)
-        cad = CAD(finamepath,startAt,endsAt)
-    else:
-        cad = CAD(finamepath)
-        
-    if cad is None:
-        print("error: cad object is None!")
-        sys.exit()
-        
-    print(cad.decision)
-    print(cad.file_header)
-    print(cad.architecture)
+def plot_file(cad):
     
-    short_finame = os.path.split(finamepath)[1]
+    short_finame = os.path.split(cad.file_path)[1]
     
     finame_template = ""
     fi_splitext = os.path.splitext(short_finame)
@@ -65,80 +38,13 @@ def plot_file(finamepath):
         
     cad.plot_to_file(os.path.join(RESULTFOLDER,pngname), 75,1)
     
-    return 
-    
-
-def DoSomethingWithFiles(FileList):
-    
-    for f in FileList:
-        if ("~" == f[-1]):
-            fipath, finame = os.path.split(f)
-            os.rename(f,os.path.join(f[:-1]))
-            
-        if ("." == f[0]): 
-            fipath, finame = os.path.split(f)
-            os.rename(f,os.path.join(f[1:]))
-        
-        plot_file(f)
-    
     return
-    
-    
-def collectDirectories(indir):
-    dirlist = []
-    filelist = []
-    
-    # print("indir: %s" % (indir))
-    
-    for x in os.scandir(indir): 
-        if (x.is_dir()): 
-            dirlist.append(os.path.join(indir,x.name))
-        elif (x.is_file()):
-            filelist.append(os.path.join(indir,x.name))
-            
-    return dirlist,filelist
 
-    
-def scanBigdata(indir):
-    
-    if not os.path.isdir(indir):
-        print("Sorry, In-Directory %s does not exist!" % (indir))
-        sys.exit()
-    
-    FileList = []
-    dirlist_global = []
-    rootdir, FileList = collectDirectories(indir)
-    if FileList: DoSomethingWithFiles(FileList)
-    
-    subdir = []
-    subsubdir = []
-    subsubsubdir = []
-    lastDepthdir = []
-    
-    if (rootdir): # not a File List
-        for x in rootdir: 
-            subdir, FileList = collectDirectories(x)
-            if (subdir): 
-                for y in subdir:
-                    subsubdir,FileList = collectDirectories(y)
-                    if (subsubdir):
-                        for z in subsubdir:
-                            subsubsubdir,FileList = collectDirectories(z)
-                            if (subsubsubdir): 
-                                for q in subsubsubdir:
-                                    lastDepthdir,FileList = collectDirectories(q)
-                                    if (lastDepthdir): print("Sorry, but stopping here, too much depth for %s." % (q))
-                                    elif (FileList): DoSomethingWithFiles(FileList,)
-                            elif (FileList): DoSomethingWithFiles(FileList)
-                    elif (FileList): DoSomethingWithFiles(FileList)
-            elif (FileList): DoSomethingWithFiles(FileList)
-        
-    return
 
 if __name__=="__main__":
     
     if (len(sys.argv) < 2):
-        print("Usage: python3 %s %s" % (__file__," indir"))
+        print("Usage: python3 %s %s" % (__file__," indir (processes) (timeout) (outdir)"))
         sys.exit()
         
     INDIR = sys.argv[1]
@@ -147,7 +53,27 @@ if __name__=="__main__":
         print("Sorry, In-Directory %s does not exist!" % (INDIR))
         sys.exit()
     
-    scanBigdata(INDIR)
-    
+    processes = None
+    timeout = None
+    if (len(sys.argv) > 2):
+        processes = int(sys.argv[2])
+    if (len(sys.argv) > 3):
+        timeout = float(sys.argv[3])
+    writer = None
+    if (len(sys.argv) > 4):
+        writer = ColumnarWriter(sys.argv[4])
+    
+    for result in batch.analyze(INDIR, processes, timeout, max_size=MAX_SCAN_SIZE, file_callback=plot_file):
+        if writer:
+            writer.append(result)
+        print(result.path)
+        if result.error:
+            print("error: %s" % (result.error))
+            continue
+        print(result.decision)
+        print(result.file_header)
+        print(result.architecture)
+    
+    if writer:
+        writer.close()
     sys.exit()
-
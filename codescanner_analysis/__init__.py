@@ -1,11 +1,21 @@
+from codescanner_analysis import batch
 from codescanner_analysis.byte_plot import BytePlot
+from codescanner_analysis.byte_summary import ByteSummary
 from codescanner_analysis.codescan_interface import CodescanInterface
-from codescanner_analysis.codescanner_analysis import CodescannerAnalysisData
+from codescanner_analysis.codescanner_analysis import CodescannerAnalysisData, RenderSpec
 from codescanner_analysis.color_map import ColorMap
+from codescanner_analysis import columnar_export
+from codescanner_analysis.columnar_export import ColumnarWriter
 from codescanner_analysis.comparison_analysis import ComparisonAnalysis
+from codescanner_analysis.entropy_plot import EntropyPlot
+from codescanner_analysis.entropy_trace import EntropyTrace
+from codescanner_analysis.libcodescanpy import CodescanError
+from codescanner_analysis.lod_byte_plot import LodBytePlot
 from codescanner_analysis import file_header_parser
 from codescanner_analysis.overlay_plot import OverlayPlot
 from codescanner_analysis.plot_base import PlotBase
+from codescanner_analysis.raster_byte_plot import RasterBytePlot
+from codescanner_analysis.result_cache import ResultCache
 
 
 # major, minor, micro, release, serial
@@ -17,12 +27,23 @@ __VERSION__ = "%d.%d.%d" % (
 )
 __all__ = [
     "__VERSION__",
+    "batch",
     "CodescannerAnalysisData",
+    "RenderSpec",
     "ComparisonAnalysis",
     "ColorMap",
     "file_header_parser",
     "OverlayPlot",
     "PlotBase",
     "BytePlot",
+    "RasterBytePlot",
+    "LodBytePlot",
+    "ByteSummary",
+    "EntropyPlot",
+    "EntropyTrace",
     "CodescanInterface",
+    "CodescanError",
+    "ResultCache",
+    "columnar_export",
+    "ColumnarWriter",
 ]
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from multiprocessing.connection import wait
+
+from codescanner_analysis import libcodescanpy
+from codescanner_analysis.codescanner_analysis import CodescannerAnalysisData
+
+BatchResult = namedtuple('BatchResult', ['path', 'regions', 'sizes', 'decision', 'decision_detail', 'architecture',
+                                         'file_header', 'error'])
+
+
+def iter_files(source):
+    '''
+    Yield the file paths of a source.
+
+    :param source: a directory root (walked recursively, without depth limit), a single file path
+                   or an iterable of file paths
+    :return: generator of file paths
+    '''
+    if isinstance(source, str):
+        source = os.path.expanduser(source)
+        if not os.path.isdir(source):
+            yield source
+            return
+
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if os.path.isfile(path):
+                    yield path
+        return
+
+    for path in source:
+        yield path
+
+
+def analyze(source, processes=None, timeout=None, start=0, end=0, aggressive=0, cache=None, max_size=None,
+            file_callback=None):
+    '''
+    Analyse many files in parallel, see BatchAnalyzer.
+
+    :return: generator of BatchResult, in order of completion
+    '''
+    return BatchAnalyzer(processes, timeout, start, end, aggressive, cache, max_size, file_callback).run(source)
+
+
+class BatchAnalyzer(object):
+    '''
+    Fans CodescannerAnalysisData work out over a pool of worker processes.
+
+    * each worker loads libcodescan once and analyses one file after another
+    * results are streamed back as soon as they are finished
+    * backpressure: a worker only gets a new path after its last result was fetched,
+      so the source is consumed lazily and at most `processes` results are pending
+    * failure isolation: errors are reported in BatchResult.error, a crashed or timed out worker is replaced
+    '''
+
+    def __init__(self, processes=None, timeout=None, start=0, end=0, aggressive=0, cache=None, max_size=None,
+                 file_callback=None):
+        '''
+        :param processes: number of worker processes, defaults to the cpu count
+        :param timeout: optional timeout in seconds per file
+        :param start: start offset of the codescanner (s= parameter)
+        :param end: end offset of the codescanner (e= parameter)
+        :param aggressive: affects code region search (a= parameter)
+        :param cache: optional ResultCache shared by all workers
+        :param max_size: optional maximum number of bytes scanned per file, larger files are scanned
+                         from start to start + max_size only
+        :param file_callback: optional function called in the worker with the CodescannerAnalysisData of every
+                              analysed file, e.g. to plot it; it has to be picklable for non-fork start methods,
+                              its errors are reported in BatchResult.error
+        '''
+        if processes is not None and processes < 1:
+            raise ValueError("Number of processes must be at least 1!")
+
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        self._options = (start, end, aggressive, cache, max_size, file_callback)
+        self._context = multiprocessing.get_context()
+
+    def run(self, source):
+        '''
+        Analyse all files of source.
+
+        :param source: a directory root, a single file path or an iterable of file paths
+        :return: generator of BatchResult, in order of completion
+        '''
+        paths = iter_files(source)
+        workers = [self._spawn() for _ in range(self.processes)]
+        # worker index -> (task id, path, deadline)
+        busy = {}
+        task_id = 0
+        exhausted = False
+
+        try:
+            while True:
+                for i in range(len(workers)):
+                    if exhausted or i in busy:
+                        continue
+                    path = next(paths, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    task_id += 1
+                    workers[i][1].send((task_id, path))
+                    busy[i] = (task_id, path, self._deadline())
+
+                if not busy:
+                    break
+
+                connections = {workers[i][1]: i for i in busy}
+                for connection in wait(list(connections), self._wait_timeout(busy)):
+                    i = connections[connection]
+                    try:
+                        received_id, result = connection.recv()
+                    except (EOFError, OSError):
+                        result = self._error_result(busy[i][1], "WorkerError: Worker exited with code %s."
+                                                    % workers[i][0].exitcode)
+                        workers[i] = self._respawn(workers[i])
+                        received_id = busy[i][0]
+
+                    if received_id == busy[i][0]:
+                        del busy[i]
+                        yield result
+
+                now = time.monotonic()
+                for i in [i for i in busy if busy[i][2] is not None and busy[i][2] <= now]:
+                    path = busy.pop(i)[1]
+                    workers[i] = self._respawn(workers[i])
+                    yield self._error_result(path, "TimeoutError: Analysis exceeded %s seconds." % self.timeout)
+        finally:
+            self._shutdown(workers)
+
+    def _deadline(self):
+        if self.timeout is None:
+            return None
+        return time.monotonic() + self.timeout
+
+    def _wait_timeout(self, busy):
+        deadlines = [b[2] for b in busy.values() if b[2] is not None]
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - time.monotonic())
+
+    def _spawn(self):
+        connection, worker_connection = self._context.Pipe()
+        process = self._context.Process(target=_work, args=(worker_connection, self._options), daemon=True)
+        process.start()
+        worker_connection.close()
+
+        return process, connection
+
+    def _respawn(self, worker):
+        self._kill(worker)
+        return self._spawn()
+
+    def _kill(self, worker):
+        process, connection = worker
+        connection.close()
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+    def _shutdown(self, workers):
+        for process, connection in workers:
+            try:
+                connection.send(None)
+            except (OSError, ValueError):
+                pass
+        for process, connection in workers:
+            process.join(1)
+            self._kill((process, connection))
+
+    def _error_result(self, path, error):
+        return BatchResult(path, None, None, None, None, None, None, error)
+
+
+def _work(connection, options):
+    '''
+    Worker process main loop: receive paths, send BatchResults, until None is received.
+    '''
+    start, end, aggressive, cache, max_size, file_callback = options
+
+    try:
+        libcodescanpy.init()
+    except libcodescanpy.CodescanError:
+        # reported for every single file by the scans
+        pass
+
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        task_id, path = task
+        connection.send((task_id, _analyze_file(path, start, end, aggressive, cache, max_size, file_callback)))
+
+
+def _analyze_file(path, start, end, aggressive, cache=None, max_size=None, file_callback=None):
+    try:
+        if max_size and os.path.getsize(path) - start > max_size:
+            end = min(end or start + max_size, start + max_size)
+        cad = CodescannerAnalysisData(path, start, end, aggressive, cache=cache)
+        if file_callback is not None:
+            file_callback(cad)
+        return BatchResult(path, cad.regions, cad.sizes, cad.decision, cad.decision_detail, cad.architecture,
+                           cad.file_header, None)
+    except Exception as e:
+        return BatchResult(path, None, None, None, None, None, None, "%s: %s" % (type(e).__name__, e))
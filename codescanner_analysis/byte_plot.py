@@ -1,17 +1,11 @@
 # -*- coding: utf-8 -*-
 import os
 
-import matplotlib
 import numpy
-
-from codescanner_analysis.codescan_interface import CodescanInterface
-
-matplotlib.use('agg')
-
-from matplotlib.pyplot import legend
 from matplotlib.ticker import MultipleLocator, FuncFormatter
-from pylab import xticks, figure, sca
 
+import codescanner_analysis.utils.file_utils as file_utils
+from codescanner_analysis.codescan_interface import CodescanInterface
 from codescanner_analysis.plot_base import PlotBase
 
 # This is the minimum for which it makes sense to analyze or plot a file.
@@ -31,11 +25,13 @@ class BytePlot(PlotBase):
     def __del__(self):
         pass
 
-    def plot_to_buffer(self, dpi, fig_size=None):
+    def plot_to_buffer(self, dpi, fig_size=None, image_format='png', compression=None):
         '''
         Plot image with fixed (16:8) size to buffer.
         :param dpi: the disired dpi
         :param fig_size: the size ratio of the figure. Will be multiplied with dpi, to get the real size.
+        :param image_format: one of PlotBase.IMAGE_FORMATS, RGBA returns a numpy array
+        :param compression: optional compression level, see PlotBase._save_plot_to_buffer()
         :return:
         '''
         if (self.filesize < MIN_FILE_SIZE):
@@ -43,13 +39,14 @@ class BytePlot(PlotBase):
 
         if dpi < PlotBase.MIN_DPI:
             raise ValueError("DPI must be at mimimum %d!" % PlotBase.MIN_DPI)
+        self._check_image_format(image_format, compression)
 
         if fig_size is None:
             fig_size = self.FIG_SIZE
 
-        return self._plot_to_buffer(dpi, fig_size)
+        return self._plot_to_buffer(dpi, fig_size, image_format, compression)
 
-    def plot_to_dynamic_size_buffer(self, dpi, width, height):
+    def plot_to_dynamic_size_buffer(self, dpi, width, height, image_format='png', compression=None):
         '''
         Plot image with desired widht and height to buffer.
         A dpi of 72 will plot a file with the expected with and height.
@@ -57,6 +54,8 @@ class BytePlot(PlotBase):
         :param dpi: The desired dpi.
         :param width: The desired width.
         :param height: The desired heigth.
+        :param image_format: one of PlotBase.IMAGE_FORMATS, RGBA returns a numpy array
+        :param compression: optional compression level, see PlotBase._save_plot_to_buffer()
         :return:
         '''
 
@@ -65,6 +64,7 @@ class BytePlot(PlotBase):
 
         if dpi < PlotBase.MIN_DPI:
             raise ValueError("DPI must be at mimimum %d!" % PlotBase.MIN_DPI)
+        self._check_image_format(image_format, compression)
         if width == 0:
             raise ValueError("Width must not be zero!")
         if height == 0:
@@ -84,15 +84,15 @@ class BytePlot(PlotBase):
         # if height * dpi > PlotBase.MAX_PLOT_AXIS_SIZE:
         #     raise ValueError("Height to big!")
 
-        return self._plot_to_buffer(dpi, fig_size)
+        return self._plot_to_buffer(dpi, fig_size, image_format, compression)
 
-    def _plot_to_buffer(self, dpi, fig_size):
+    def _plot_to_buffer(self, dpi, fig_size, image_format='png', compression=None):
 
         if (self.filesize < MIN_FILE_SIZE):
             raise IOError("File is too small to even have a proper x-axis!")
 
         byte_array = self._get_byte_array()
-        byte_indices = numpy.arange(0, byte_array.size, dtype=numpy.uint32)
+        byte_indices = numpy.arange(0, byte_array.size, dtype=numpy.int64)
 
         # marker size depends on height of fig
         # prevents visually unpleasant gabs between dots, if fig is stretched in height more than the sum of normal dot size
@@ -100,32 +100,39 @@ class BytePlot(PlotBase):
         # self.ms = self.height / 1.8
         self.ms = 72. / dpi
 
-        plot = figure(figsize=fig_size)
+        plot = self._new_figure(fig_size)
         subplot = plot.add_subplot(111)  # (Add bottom image)
         # subplot.axis('off')
         self._generate_plot(byte_array, byte_indices, subplot)
+        self._plot_entropy_overlay(subplot)
         plot.tight_layout()
 
-        legend(loc='upper right')
+        subplot.legend(loc='upper right')
 
-        return self._save_plot_to_buffer(plot, dpi)
+        return self._save_plot_to_buffer(plot, dpi, image_format, compression)
 
     def _get_byte_array(self):
-        byte_array = numpy.fromfile(self._file_name, dtype=numpy.uint8)
+        '''
+        The bytes to plot, a window of the shared read-only map of the file (see file_utils.map_file()).
+        Only the pages of the window are read.
+        '''
+        if self._offsets[1] != 0:
+            byte_array = file_utils.map_bytes(self._file_name, self._offsets[0], self._offsets[1])
+        else:
+            byte_array = file_utils.map_bytes(self._file_name)
+
         if byte_array is None:
             raise RuntimeError('Source file seems to be empty: {}'.format(self._file_name))
 
-        if self._offsets[1] != 0:
-            byte_array = byte_array[self._offsets[0]:self._offsets[1]]
-
         return byte_array
 
     def _generate_plot(self, byte_array, byte_indices, subplot):
         self._prepare_axes(subplot)
 
         subplot.plot(byte_indices, byte_array, '.', markerfacecolor='y', markeredgecolor='#323300')
-        for spec in self._area_specs:
-            self._plot_byte_regions(subplot, byte_array, byte_indices, spec)
+        byte_labels = self._region_labels(0, byte_array.size)
+        for label, spec in enumerate(self._area_specs):
+            self._plot_byte_regions(subplot, byte_array, byte_labels, label, spec)
 
         if self._regions.get("Code"):
             for cr in self._regions.get("Code"):
@@ -150,35 +157,37 @@ class BytePlot(PlotBase):
         ax.yaxis.set_major_locator(major_locator_y)
         ax.yaxis.set_major_formatter(major_formatter_y)
 
-    def _plot_byte_regions(self, ax, raw_bytes, byte_indices, area_spec):
-
-        if area_spec.id not in self._regions: return
+    def _plot_byte_regions(self, ax, raw_bytes, byte_labels, label, area_spec):
+        '''
+        Plot the bytes of all regions of an area spec with a single call, plus its region bounds.
 
-        sca(ax)
+        :param ax: the axes
+        :param raw_bytes: the bytes
+        :param byte_labels: area spec index of every byte, see _region_labels()
+        :param label: the index of area_spec
+        :param area_spec: the area spec
+        '''
+        if not self._regions.get(area_spec.id): return
 
-        set_label = True
-        for region in self._regions[area_spec.id]:
-            start = region[0]
-            end = region[1]
+        x_axis = numpy.flatnonzero(byte_labels == label)  # Offsets of points
+        y_axis = raw_bytes[x_axis]  # Associated values
 
-            points = byte_indices[byte_indices >= start]
-            points = points[points < end]
+        ax.plot(x_axis, y_axis, '.', markerfacecolor=area_spec.dot_color, markeredgecolor=area_spec.line_color,
+                label=area_spec.label
+                # , markersize=self.ms  # somehow overwrites markerfacecolor
+                )
+        self._plot_region_bounds(ax, area_spec)
 
-            x_axis = byte_indices[points]  # Offsets of points
-            y_axis = raw_bytes[points]  # Associated values
+    def _plot_region_bounds(self, ax, area_spec):
+        '''
+        Mark start and end of all regions of an area spec, drawn as one LineCollection.
+        '''
+        regions = self._regions.get(area_spec.id)
+        if not regions:
+            return
 
-            if set_label:
-                ax.plot(x_axis, y_axis, '.', markerfacecolor=area_spec.dot_color, markeredgecolor=area_spec.line_color,
-                        label=area_spec.label
-                        # , markersize=self.ms  # somehow overwrites markerfacecolor
-                        )
-                set_label = False
-            else:
-                ax.plot(x_axis, y_axis, '.', markerfacecolor=area_spec.dot_color, markeredgecolor=area_spec.line_color,
-                        # markersize=self.ms  # somehow overwrites markerfacecolor
-                        )
-            ax.axvline(x=start, ymin=0, ymax=255, linewidth=1.0, color=area_spec.line_color)
-            ax.axvline(x=end, ymin=0, ymax=255, linewidth=1.0, color=area_spec.line_color)
+        bounds = [r[0] for r in regions] + [r[1] for r in regions]
+        ax.vlines(bounds, 0, 0x100, linewidth=1.0, color=area_spec.line_color)
 
     def _plot_cr_label(self, ax, cr):
         spec = self._area_specs[0]
@@ -194,7 +203,7 @@ class BytePlot(PlotBase):
         subplot.set_xlabel('Byte location')
         subplot.set_ylabel('Byte value')
         subplot.set_title('{} ({} kB)'.format(self._short_filename, round(1.0 * (self._file_size / 1024))))
-        xticks(rotation=315)
+        subplot.tick_params(axis='x', labelrotation=315)
 
     def _build_filename(self, resultdir):
         '''
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy
+
+import codescanner_analysis.utils.file_utils as file_utils
+
+
+class ByteSummary(object):
+    '''
+    Level of detail summary of the bytes of a file: a histogram of the byte values per column,
+    column i summarizes the bytes [column_bounds[i], column_bounds[i + 1]).
+
+    * built in one streamed pass over the read-only map of the file, memory does not grow with the file size
+    * a summary can be resampled to any smaller number of columns, without reading the file again
+    * serializable (to_bytes(), from_bytes()), see ResultCache.put_bytes()
+    '''
+    DEFAULT_COLUMNS = 0x1000
+
+    def __init__(self, column_bounds, histograms):
+        '''
+        :param column_bounds: numpy int64 array of columns + 1 offsets, relative to the first summarized byte
+        :param histograms: numpy uint32 array of shape (columns, 0x100)
+        '''
+        if len(column_bounds) != len(histograms) + 1:
+            raise ValueError("Number of column bounds does not match the number of histograms!")
+
+        self.column_bounds = numpy.asarray(column_bounds, dtype=numpy.int64)
+        self.histograms = numpy.asarray(histograms, dtype=numpy.uint32)
+
+    @property
+    def size(self):
+        return int(self.column_bounds[-1])
+
+    @property
+    def columns(self):
+        return len(self.histograms)
+
+    @property
+    def minimum(self):
+        '''
+        :return: smallest byte value of every column, 0 for empty columns
+        '''
+        return numpy.argmax(self.histograms > 0, axis=1)
+
+    @property
+    def maximum(self):
+        '''
+        :return: largest byte value of every column, 0 for empty columns
+        '''
+        present = self.histograms > 0
+        return numpy.where(present.any(axis=1), 0xff - numpy.argmax(present[:, ::-1], axis=1), 0)
+
+    @classmethod
+    def from_array(cls, byte_array, columns=DEFAULT_COLUMNS):
+        '''
+        :param byte_array: numpy uint8 array
+        :param columns: the maximum number of columns, files smaller than that get a column per byte
+        :return: ByteSummary
+        '''
+        if columns < 1:
+            raise ValueError("Number of columns must be at least 1!")
+
+        size = byte_array.size
+        columns = max(1, min(columns, size))
+        column_bounds = numpy.arange(columns + 1, dtype=numpy.int64) * size // columns
+        histograms = numpy.zeros((columns, 0x100), dtype=numpy.uint32)
+
+        # one column at a time, only its pages of a mapped file are touched
+        for i in range(columns):
+            histograms[i] = numpy.bincount(byte_array[column_bounds[i]:column_bounds[i + 1]], minlength=0x100)
+
+        return cls(column_bounds, histograms)
+
+    @classmethod
+    def from_file(cls, file_name, start=0, end=0, columns=DEFAULT_COLUMNS):
+        '''
+        :param file_name: the file path
+        :param start: start offset
+        :param end: end offset (exclusive), 0 for the end of the file
+        :param columns: the maximum number of columns
+        :return: ByteSummary of the bytes [start, end)
+        '''
+        return cls.from_array(file_utils.map_bytes(file_name, start, end), columns)
+
+    def resample(self, columns):
+        '''
+        Merge neighbouring columns, column bounds stay exact.
+
+        :param columns: the maximum number of columns
+        :return: ByteSummary with at most columns columns, self if it has not more already
+        '''
+        if columns < 1:
+            raise ValueError("Number of columns must be at least 1!")
+        if columns >= self.columns:
+            return self
+
+        firsts = numpy.arange(columns + 1, dtype=numpy.int64) * self.columns // columns
+        histograms = numpy.add.reduceat(self.histograms, firsts[:-1], axis=0, dtype=numpy.uint32)
+
+        return ByteSummary(self.column_bounds[firsts], histograms)
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        numpy.savez_compressed(buffer, column_bounds=self.column_bounds, histograms=self.histograms)
+
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with numpy.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(arrays['column_bounds'], arrays['histograms'])
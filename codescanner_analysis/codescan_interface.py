@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 import os
+from itertools import islice
+from operator import itemgetter
 
 from codescanner_analysis import libcodescanpy
+from codescanner_analysis.utils.file_utils import MemoryFile
 
 CS_REGION_CODE = "Code"
 CS_REGION_DATA = "Data"
@@ -11,13 +14,27 @@ CS_REGION_ZERO = "Zero"
 
 class CodescanInterface(object):
     BLOCK_SIZE = 0x200
+    # windows are not split any further on ERROR_OUT_OF_MEMORY below this size
+    MIN_RETRY_WINDOW_SIZE = 0x10000
+    # scans reaching beyond libcodescanpy.MAX_SCAN_OFFSET are done in windows of this size
+    LARGE_FILE_WINDOW_SIZE = 0x40000000
+    # libcodescan does not classify windows smaller than this, they are not scanned on their own
+    MIN_WINDOW_SIZE = 0x800
+    # streaming mode defaults, see run_windowed()
+    DEFAULT_WINDOW_SIZE = 0x4000000
+    DEFAULT_WINDOW_OVERLAP = 0x20000
+    # smaller windows lose code regions next to their boundaries, see run_windowed()
+    MIN_STREAMING_WINDOW_SIZE = 0x100000
+    MIN_STREAMING_OVERLAP = 0x10000
 
     def __init__(self):
         self._file_name = ""
+        self._data_size = None
         self.start = 0
         self.end = 0
-        
-        libcodescanpy.init()
+        # number of regions before and after the last merge, see sanitize_regions()
+        self.region_counts = (0, 0)
+        # libcodescan is loaded lazily, once per process, by libcodescanpy.scan()
 
     def __del__(self):
         self._file_name = None
@@ -33,27 +50,205 @@ class CodescanInterface(object):
         :param end: end offset of the codescanner (e= parameter)
         :param aggressive: affects code region search (a= parameter)
         :return: result dict
+        :raises CodescanError: if libcodescan fails
         '''
 
         self._file_name = filename
+        self._data_size = None
         self.start = start
         self.end = end
         self.aggressive = aggressive
 
-        r = libcodescanpy.scan(filename, start, end, aggressive, libcodescanpy.RESULT_LIST)
+        r = self._scan(filename, start, end, aggressive)
 
         return r
 
-    def sanitize_regions(self, regions):
+    def scan_buffer(self, buffer, start=0, end=0, aggressive=0):
+        '''
+        Runs libcodescan on an in-memory buffer
+
+        :param buffer: bytes, bytearray, memoryview or numpy array
+        :param start: start offset of the codescanner (s= parameter)
+        :param end: end offset of the codescanner (e= parameter)
+        :param aggressive: affects code region search (a= parameter)
+        :return: result dict
+        :raises CodescanError: if libcodescan fails
+        '''
+
+        self._file_name = None
+        self._data_size = memoryview(buffer).nbytes
+        self.start = start
+        self.end = end
+        self.aggressive = aggressive
+
+        with MemoryFile(buffer) as memory_file:
+            if memory_file.size < 1:
+                raise libcodescanpy.CodescanFileError("(scan_buffer:) Buffer is NULL sized!")
+
+            r = self._scan(memory_file.name, start, end, aggressive)
+
+        return r
+
+    def run_windowed(self, filename, start=0, end=0, aggressive=0, window_size=DEFAULT_WINDOW_SIZE,
+                     overlap=DEFAULT_WINDOW_OVERLAP):
+        '''
+        Runs libcodescan in streaming mode: the file is walked in windows of window_size bytes,
+        so the memory used by the core is bounded by the window size, not by the file size.
+
+        libcodescan needs context before a region to classify it, so each window starts overlap bytes
+        before the part of the file it is responsible for. A region cut by the end of a window is left
+        to the next window, which is responsible from the beginning of this region on.
+        The window results are joined to one result like the one of run(), it is only identical to the one
+        of run() if the range fits in a single window. The core classifies each window on its own, so regions
+        next to window boundaries differ from a single-shot scan: with windows of MIN_STREAMING_WINDOW_SIZE
+        the code size of testfile-med differs by a few percent, with 256 KiB windows or less whole code regions
+        are lost and the decision may change. Hence window_size and overlap have lower bounds
+        MIN_STREAMING_WINDOW_SIZE and MIN_STREAMING_OVERLAP.
+
+        :param filename: the file path
+        :param start: start offset of the codescanner (s= parameter)
+        :param end: end offset of the codescanner (e= parameter)
+        :param aggressive: affects code region search (a= parameter)
+        :param window_size: size of the windows, rounded up to BLOCK_SIZE, at least MIN_STREAMING_WINDOW_SIZE
+        :param overlap: context before each window, rounded up to BLOCK_SIZE, at least MIN_STREAMING_OVERLAP
+                        and less than window_size
+        :return: result dict
+        :raises CodescanError: if libcodescan fails
+        :raises ValueError: if window_size or overlap is out of bounds
+        '''
+        window_size = self._align_to_block(window_size)
+        overlap = self._align_to_block(overlap)
+
+        if window_size < self.MIN_STREAMING_WINDOW_SIZE:
+            raise ValueError("Window size must be at least 0x%x!" % self.MIN_STREAMING_WINDOW_SIZE)
+        if overlap < self.MIN_STREAMING_OVERLAP or overlap >= window_size:
+            raise ValueError("Overlap must be at least 0x%x and less than the window size!"
+                             % self.MIN_STREAMING_OVERLAP)
+
+        self._file_name = filename
+        self._data_size = None
+        self.start = start
+        self.end = end
+        self.aggressive = aggressive
+
+        scan_end = end or os.path.getsize(filename)
+        if end == 0:
+            self._data_size = scan_end
+        if scan_end - start <= window_size:
+            return self._scan(filename, start, end, aggressive)
+
+        return self._scan_windows(filename, start, scan_end, aggressive, window_size, overlap)
+
+    def _scan_windows(self, filename, start, end, aggressive, window_size, overlap):
+        regions = {}
+        # the window is responsible for [own_start, next_own_start)
+        own_start = start
+
+        while own_start < end:
+            window_start = max(start, min(own_start - overlap, end - self.MIN_WINDOW_SIZE))
+            window_end = min(end, window_start + window_size)
+            if end - window_end < self.MIN_WINDOW_SIZE:
+                window_end = end
+
+            window = self._scan(filename, window_start, window_end, aggressive)
+
+            next_own_start = window_end
+            if window_end < end:
+                cut = [r for k in window for r in window[k] if window_start + r[1] == window_end]
+                if cut and window_start + cut[0][0] > own_start:
+                    next_own_start = window_start + cut[0][0]
+
+            for k in window:
+                for r in window[k]:
+                    region_start = max(window_start + r[0], own_start)
+                    region_end = min(window_start + r[1], next_own_start)
+                    if region_start < region_end:
+                        if k not in regions:
+                            regions[k] = []
+                        regions[k].append([region_start - start, region_end - start] + list(r[2:]))
+
+            own_start = next_own_start
+
+        return regions
+
+    def _align_to_block(self, size):
+        return -(-size // self.BLOCK_SIZE) * self.BLOCK_SIZE
+
+    def _scan(self, filename, start, end, aggressive):
+        '''
+        Scan a window. If libcodescan runs out of memory, the window is split into two halves,
+        which are scanned on their own and joined again.
+        The result offsets are relative to start, like for a single scan.
+        '''
+        if end > libcodescanpy.MAX_SCAN_OFFSET or \
+                (end == 0 and os.path.getsize(filename) > libcodescanpy.MAX_SCAN_OFFSET):
+            return self._scan_large(filename, start, end or os.path.getsize(filename), aggressive)
+
+        try:
+            return libcodescanpy.scan(filename, start, end, aggressive, libcodescanpy.RESULT_LIST)
+        except libcodescanpy.CodescanOutOfMemoryError:
+            if end == 0:
+                end = os.path.getsize(filename)
+
+            size = end - start
+            if size < 2 * self.MIN_RETRY_WINDOW_SIZE:
+                raise
+
+            middle = start + (size // 2) // self.BLOCK_SIZE * self.BLOCK_SIZE
+
+            regions = self._scan(filename, start, middle, aggressive)
+            upper_regions = self._scan(filename, middle, end, aggressive)
+            self._join_regions(regions, upper_regions, middle - start)
+
+            return regions
+
+    def _scan_large(self, filename, start, end, aggressive):
+        '''
+        Scan a window reaching beyond the 32-bit offsets of libcodescan in LARGE_FILE_WINDOW_SIZE windows.
+        Windows beyond MAX_SCAN_OFFSET are copied into a memory file and scanned from there,
+        their results are moved back to the 64-bit offsets.
+        '''
+        regions = {}
+        window_start = start
+
+        while window_start < end:
+            window_end = min(end, window_start + self.LARGE_FILE_WINDOW_SIZE)
+            if end - window_end < self.MIN_WINDOW_SIZE:
+                window_end = end
+
+            if window_end <= libcodescanpy.MAX_SCAN_OFFSET:
+                window = self._scan(filename, window_start, window_end, aggressive)
+            else:
+                with MemoryFile.from_file(filename, window_start, window_end) as memory_file:
+                    window = self._scan(memory_file.name, 0, 0, aggressive)
+
+            self._join_regions(regions, window, window_start - start)
+            window_start = window_end
+
+        return regions
+
+    def _join_regions(self, regions, other, shift):
+        '''
+        Append the regions of other to regions, moving them by shift.
+        '''
+        for k in other:
+            if k not in regions:
+                regions[k] = []
+            for r in other[k]:
+                regions[k].append([r[0] + shift, r[1] + shift] + list(r[2:]))
+
+    def sanitize_regions(self, regions, data_size=None):
         '''
         Sanitize regions dict resulting from the libcodescan.so
+        The number of regions before and after merging is stored in region_counts.
 
         :param regions: the data dict
+        :param data_size: size of the scanned file, if already known by the caller
         :return: regions dictionary
         '''
 
-        self._merge_regions(regions)
-        self._pad_regions(regions)
+        self.region_counts = self._merge_regions(regions)
+        self._pad_regions(regions, data_size)
 
         return dict(regions)
 
@@ -79,48 +274,54 @@ class CodescanInterface(object):
     def _merge_regions(self, regions):
         '''
         Merge regions, with no space between them.
+        Each region list is replaced by a new list, built in a single pass over the sorted regions.
+        A merged Code region keeps the architecture of its last part.
+
+        :return: number of regions before and after merging
         '''
+        before = 0
+        after = 0
+
         for k in regions:
             ln = len(regions[k])
+            before += ln
 
             # nothing merge
-            if ln == 1:
+            if ln < 2:
+                after += ln
                 continue
 
-            # sort region k by its 'start' value
-            regions[k].sort(key=lambda tup: tup[0])
-
-            i = ln - 1
-
-            while i > 0:
-                j = i
-
-                # while prev end == act start
-                # decrement j to find farest mergeable region
-                while j > 0 and regions[k][j - 1][1] == regions[k][j][0]:
-                    j -= 1
-
-                # if there are mergeable regions, merge them
-                # i.e. (1,2), (2,3), (3,4)
-                #      j[0] = 1       i[1]=4
-                # =>   (1,4)
-                if j < i:
-                    # => regions[k](1,4[,cpu,bitness,endianess])
-                    if k == 'Code':
-                        # t = regions[k][j][0]
-                        regions[k][j][1:] = regions[k][i][1:]
-                        # regions[k][j][0] = t
-                    else:
-                        regions[k][j] = [regions[k][j][0], regions[k][i][1]]
-                    # delete merged regions, to i exclusive => i+1
-                    del regions[k][j + 1:i + 1]
-                    # update i to continue in next iteration
-                    i = j - 1
-                else:
-                    # decrement i by 1 to continue in next iteration, because nothing has been merged
-                    i -= 1
-
-    def _pad_regions(self, regions):
+            # sort region k by its 'start' value, linear for the already sorted lists of libcodescan
+            ordered = sorted(regions[k], key=itemgetter(0))
+            merged = []
+            first = last = ordered[0]
+
+            for r in islice(ordered, 1, None):
+                # prev end == act start
+                if r[0] == last[1]:
+                    last = r
+                    continue
+                merged.append(self._join_region(k, first, last))
+                first = last = r
+
+            merged.append(self._join_region(k, first, last))
+            regions[k] = merged
+            after += len(merged)
+
+        return before, after
+
+    @staticmethod
+    def _join_region(k, first, last):
+        '''
+        (1,2), (2,3), (3,4) => (1,4[,cpu,bitness,endianess])
+        '''
+        if first is last:
+            return first
+        if k == CS_REGION_CODE:
+            return [first[0]] + list(last[1:])
+        return [first[0], last[1]]
+
+    def _pad_regions(self, regions, data_size=None):
         '''
         Pad regions with generic data if the filesize does not divide 512 without remainder.
         Because this bytes are unclassified by codescanner.
@@ -129,10 +330,14 @@ class CodescanInterface(object):
         if regions is None or len(regions) == 0:
             return
 
-        if self.end == 0:
-            file_size = os.path.getsize(self._file_name)
-        else:
+        if self.end != 0:
             file_size = self.end - self.start
+        elif data_size is not None:
+            file_size = data_size
+        elif self._data_size is not None:
+            file_size = self._data_size
+        else:
+            file_size = os.path.getsize(self._file_name)
 
         remainder = file_size % self.BLOCK_SIZE
         
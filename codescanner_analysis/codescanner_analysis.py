@@ -1,12 +1,32 @@
 # -*- coding: utf-8 -*-
+import multiprocessing
 import os
+from collections import namedtuple
 
 from codescanner_analysis.utils import file_utils
+from codescanner_analysis.utils.file_utils import MemoryFile
 from codescanner_analysis.codescan_interface import CodescanInterface
 from codescanner_analysis.color_map import ColorMap
-from codescanner_analysis.extended_analysis import make_decision
+from codescanner_analysis.extended_analysis import DecisionResult, make_decision, make_decision_detail
 from codescanner_analysis.file_header_parser import FileHeaderParser
 from codescanner_analysis.byte_plot import BytePlot
+from codescanner_analysis.byte_summary import ByteSummary
+from codescanner_analysis.entropy_plot import EntropyPlot
+from codescanner_analysis.entropy_trace import EntropyTrace
+from codescanner_analysis.lod_byte_plot import LodBytePlot
+from codescanner_analysis.raster_byte_plot import RasterBytePlot
+
+# marks lazily computed attributes, which are not computed yet (None is a valid file_header)
+_NOT_COMPUTED = object()
+
+# one image of CodescannerAnalysisData.render_all():
+# size None plots with the fixed figure size, a (width, height) tuple like plot_to_dynamic_size_buffer();
+# file_name None returns the image bytes, otherwise the image is written to that file;
+# image_format and compression like plot_to_buffer(), image_format None is png or the extension of file_name;
+# entropy_trace draws the entropy_trace() over the plot
+RenderSpec = namedtuple('RenderSpec', ['plot_type', 'dpi', 'size', 'file_name', 'image_format', 'compression',
+                                       'entropy_trace'])
+RenderSpec.__new__.__defaults__ = (None, None, None, None, False)
 
 
 class CodescannerAnalysisData(object):
@@ -17,12 +37,15 @@ class CodescannerAnalysisData(object):
     * tbc..
     '''
 
-    # PIL.Image.MAX_IMAGE_PIXELS
+    # PIL.Image.MAX_IMAGE_PIXELS, byteplots of more bytes are rendered from a ByteSummary
     MAX_PLOT_FILE_SIZE = 5 * 1024 * 1024
     BYTE_PLOT = 1
     COLOR_MAP = 2
+    RASTER_BYTE_PLOT = 3
+    ENTROPY_PLOT = 4
 
-    def __init__(self, file_src, start=0, end=0, aggressive=0):
+    def __init__(self, file_src, start=0, end=0, aggressive=0, window_size=0,
+                 overlap=CodescanInterface.DEFAULT_WINDOW_OVERLAP, cache=None):
         '''
         Will analyse the referenced file, extract regions and provide additional methods.
 
@@ -30,8 +53,45 @@ class CodescannerAnalysisData(object):
         :param start: start offset of the codescanner (s= parameter)
         :param end: end offset of the codescanner (e= parameter)
         :aggressive: bool aggressive (a= parameter, affects code region search)
+        :param window_size: if set, the file is scanned in streaming mode with windows of this size,
+                            see CodescanInterface.run_windowed()
+        :param overlap: context before each window in streaming mode
+        :param cache: optional ResultCache, consulted before the file is analysed
         '''
-        
+        self._prepare(file_src, start, end, aggressive, window_size, overlap)
+
+        cache_key = None
+        self._cache = cache
+        if cache is not None:
+            options = (window_size, overlap) if window_size else ()
+            cache_key = cache.key(self.file_path, *(self._scan_options + options))
+            result = cache.get(cache_key)
+            if result is not None:
+                self._codescanner.start, self._codescanner.end = self._scan_options[:2]
+                for field in cache.FIELDS:
+                    setattr(self, '_' + field, result[field])
+                if self._decision_detail is not None:
+                    self._decision_detail = DecisionResult(*self._decision_detail)
+                return
+
+        self._analyze_file(*self._scan_options)
+
+        if cache_key is not None:
+            cache.put(cache_key, {field: getattr(self, field) for field in cache.FIELDS})
+
+    def _prepare(self, file_src, start=0, end=0, aggressive=0, window_size=0,
+                 overlap=CodescanInterface.DEFAULT_WINDOW_OVERLAP):
+        self._memory_file = None
+        self._cache = None
+        self._byte_summaries = {}
+        self._entropy_traces = {}
+        self._regions = _NOT_COMPUTED
+        self._sizes = _NOT_COMPUTED
+        self._decision = _NOT_COMPUTED
+        self._decision_detail = _NOT_COMPUTED
+        self._architecture = _NOT_COMPUTED
+        self._file_header = _NOT_COMPUTED
+
         self.file_path = file_utils.sanitize_file_name(file_src)
         self.file_size = os.path.getsize(self.file_path)
 
@@ -42,18 +102,194 @@ class CodescannerAnalysisData(object):
         else:
             aggressive = 0
 
-        self.file_header = FileHeaderParser.get_file_header(self.file_path)
+        self._scan_options = (start, end, aggressive)
+        self._window_size = window_size
+        self._window_overlap = overlap
         self._codescanner = CodescanInterface()
-        self._analyze_file(start, end, aggressive)
+
+    @classmethod
+    def header_only(cls, file_src, start=0, end=0, aggressive=0):
+        '''
+        Fast path for triage: only the file header is parsed, the file is not scanned.
+        regions and the attributes depending on them (sizes, decision, decision_detail, architecture) are
+        computed on first access.
+
+        :param file_src: the source path of the file to analyse
+        :param start: start offset of the codescanner (s= parameter), used on first access of regions
+        :param end: end offset of the codescanner (e= parameter), used on first access of regions
+        :aggressive: bool aggressive (a= parameter, affects code region search)
+        :return: CodescannerAnalysisData
+        '''
+        cad = cls.__new__(cls)
+        cad._prepare(file_src, start, end, aggressive)
+        # parsing the header is cheap, do it now to fail early on broken files
+        cad.file_header
+
+        return cad
+
+    @property
+    def regions(self):
+        if self._regions is _NOT_COMPUTED:
+            self._analyze_file(*self._scan_options)
+        return self._regions
+
+    @regions.setter
+    def regions(self, value):
+        self._regions = value
+
+    @property
+    def sizes(self):
+        if self._sizes is _NOT_COMPUTED:
+            self._sizes = self._codescanner.calculate_sizes(self.regions)
+        return self._sizes
+
+    @sizes.setter
+    def sizes(self, value):
+        self._sizes = value
+
+    @property
+    def decision(self):
+        if self._decision is _NOT_COMPUTED:
+            self._decision = make_decision(self.sizes, self.file_header)
+        return self._decision
+
+    @decision.setter
+    def decision(self, value):
+        self._decision = value
+
+    @property
+    def decision_detail(self):
+        '''
+        The decision with its evidence: PackedCertainty and the rules, which hold for this file.
+        Packed files can be ranked by decision_detail.certainty.
+
+        :return: extended_analysis.DecisionResult
+        '''
+        if self._decision_detail is _NOT_COMPUTED:
+            self._decision_detail = make_decision_detail(self.sizes, self.file_header)
+        return self._decision_detail
+
+    @property
+    def architecture(self):
+        if self._architecture is _NOT_COMPUTED:
+            self._architecture = self._codescanner.extract_architectures(self.regions)
+        return self._architecture
+
+    @architecture.setter
+    def architecture(self, value):
+        self._architecture = value
+
+    @property
+    def file_header(self):
+        if self._file_header is _NOT_COMPUTED:
+            self._file_header = FileHeaderParser.get_file_header(self.file_path)
+        return self._file_header
+
+    @file_header.setter
+    def file_header(self, value):
+        self._file_header = value
+
+    def byte_summary(self, columns=ByteSummary.DEFAULT_COLUMNS):
+        '''
+        Level of detail summary of the analysed bytes (start to end offset), see ByteSummary.
+        Stored in the ResultCache of this object, if there is one.
+
+        :param columns: the maximum number of columns
+        :return: ByteSummary
+        '''
+        return self._cached_result(self._byte_summaries, ('byte_summary', columns), ByteSummary,
+                                   lambda start, end: ByteSummary.from_file(self.file_path, start, end, columns))
+
+    def entropy_trace(self, window=EntropyTrace.DEFAULT_WINDOW, step=None):
+        '''
+        Sliding window entropy of the analysed bytes (start to end offset), see EntropyTrace.
+        Computed in linear time, stored per window and step in the ResultCache of this object, if there is one.
+
+        :param window: bytes per window
+        :param step: distance of the window starts, EntropyTrace.default_step() if None
+        :return: EntropyTrace
+        '''
+        if step is None:
+            step = EntropyTrace.default_step(window)
+
+        return self._cached_result(self._entropy_traces, ('entropy_trace', window, step), EntropyTrace,
+                                   lambda start, end: EntropyTrace.from_file(self.file_path, start, end, window, step))
+
+    def _cached_result(self, results, options, result_class, build):
+        '''
+        A result of this object, kept in results and in the ResultCache, if there is one.
+
+        :param results: dictionary of the results of this object, keyed by options
+        :param options: the options of the result, part of the cache key
+        :param result_class: class of the result, providing to_bytes() and from_bytes()
+        :param build: function of the start and end offset, computing the result
+        :return: the result
+        '''
+        result = results.get(options)
+        if result is not None:
+            return result
+
+        start, end = self._scan_options[:2]
+        key = None
+        if self._cache is not None:
+            key = self._cache.key(self.file_path, start, end, 0, *options)
+            data = self._cache.get_bytes(key)
+            if data is not None:
+                result = result_class.from_bytes(data)
+
+        if result is None:
+            result = build(start, end)
+            if key is not None:
+                self._cache.put_bytes(key, result.to_bytes())
+
+        results[options] = result
+
+        return result
+
+    @classmethod
+    def scan_buffer(cls, buffer, start=0, end=0, aggressive=0, cache=None):
+        '''
+        Will analyse an in-memory buffer (bytes, bytearray, memoryview or numpy array) instead of a file.
+        The buffer is kept in an anonymous memory file as long as the returned object lives,
+        so file_path, the header and all plot methods work like for a file.
+
+        :param buffer: the bytes to analyse
+        :param start: start offset of the codescanner (s= parameter)
+        :param end: end offset of the codescanner (e= parameter)
+        :aggressive: bool aggressive (a= parameter, affects code region search)
+        :param cache: optional ResultCache, consulted before the buffer is analysed
+        :return: CodescannerAnalysisData
+        '''
+        memory_file = MemoryFile(buffer)
+        if memory_file.size < 1:
+            memory_file.close()
+            raise IOError("The buffer is NULL sized.")
+
+        try:
+            cad = cls(memory_file.name, start, end, aggressive, cache=cache)
+        except Exception:
+            memory_file.close()
+            raise
+
+        cad._memory_file = memory_file
+
+        return cad
 
     def __del__(self):
+        if self._memory_file is not None:
+            self._memory_file.close()
+            self._memory_file = None
+        self._cache = None
+        self._byte_summaries = None
+        self._entropy_traces = None
         self.file_path = None
-        self.file_header = None
+        self._file_header = None
         self._codescanner = None
-        self.regions = None
-        self.sizes = None
-        self.decision = None
-        self.architecture = None
+        self._regions = None
+        self._sizes = None
+        self._decision = None
+        self._decision_detail = None
+        self._architecture = None
 
     def _sanitize_offset_numbers(self, start, end):
         '''
@@ -71,8 +307,8 @@ class CodescannerAnalysisData(object):
             raise ValueError("Start offset '%d' is >= end offset %d." % (start, end))
         if start < 0:
             raise ValueError("Start offset '%d' is < 0." % start)
-        if start >= os.path.getsize(self.file_path):
-            raise ValueError("Start offset '%d' is >= the file size %d." % (start, os.path.getsize(self.file_path)))
+        if start >= self.file_size:
+            raise ValueError("Start offset '%d' is >= the file size %d." % (start, self.file_size))
 
         return start, end
 
@@ -91,104 +327,232 @@ class CodescannerAnalysisData(object):
 
         The resulting analysis contains
         regions containing a listing of found region types (e.g. Code, ASCII) with start-end offsets.
+        sizes, decision and architecture are derived from the regions on first access.
         '''
-        self.regions = self._codescanner.run(self.file_path, start, end, aggressive)
-        self.regions = self._codescanner.sanitize_regions(self.regions)
-
-        self.sizes = self._codescanner.calculate_sizes(self.regions)
-        self.decision = make_decision(self.sizes, self.file_header)
-        self.architecture = self._codescanner.extract_architectures(self.regions)
+        if self._window_size:
+            regions = self._codescanner.run_windowed(self.file_path, start, end, aggressive,
+                                                     self._window_size, self._window_overlap)
+        else:
+            regions = self._codescanner.run(self.file_path, start, end, aggressive)
+        self._regions = self._codescanner.sanitize_regions(regions, self.file_size)
 
-    def plot_to_buffer(self, dpi, plot_type=BYTE_PLOT):
+    def plot_to_buffer(self, dpi, plot_type=BYTE_PLOT, image_format='png', compression=None, entropy_trace=False):
         '''
         Will plot the analysis to a image data buffer.
-        If the analysed binary file exceeds the MAX_PLOT_FILE_SIZE, a color bar will be used instead of the image.
-        The color bar plot can also be forced.
+        If the analysed bytes exceed the MAX_PLOT_FILE_SIZE, a BYTE_PLOT is rendered from a summary of the bytes
+        (see byte_summary() and LodBytePlot) instead of plotting every byte.
+        A color bar plot can be forced with COLOR_MAP.
 
         :param dpi: dpi/size of the image. dpi * FIG_SIZE gives the resulting size
-        :param plot_type: either BYTE_PLOT (1) or COLOR_MAP (2)
-        :return: the bytes of the png image
+        :param plot_type: either BYTE_PLOT (1), COLOR_MAP (2), RASTER_BYTE_PLOT (3) or ENTROPY_PLOT (4)
+        :param image_format: one of PlotBase.IMAGE_FORMATS (png, webp, svg, rgba)
+        :param compression: optional compression level: zlib level (0-9) of png, encoder effort (0-6) of webp
+        :param entropy_trace: draw the entropy_trace() over the plot
+        :return: the bytes of the image, a numpy uint8 array of shape (height, width, 4) for rgba
         '''
         
         if (self.file_size < 0x100):
             raise IOError("The file is too small for visualization." )
         
-        plotter = self._init_plotter(plot_type)
-        image_bytes = plotter.plot_to_buffer(dpi)
+        plotter = self._init_plotter(plot_type, entropy_trace=entropy_trace)
+        image_bytes = plotter.plot_to_buffer(dpi, None, image_format, compression)
 
         return image_bytes
 
-    def plot_to_file(self, file_name, dpi, plot_type=BYTE_PLOT):
+    def plot_to_file(self, file_name, dpi, plot_type=BYTE_PLOT, image_format=None, compression=None,
+                     entropy_trace=False):
         '''
         Will plot the analysis to an image file.
-        If the analysed binary file exceeds the MAX_PLOT_FILE_SIZE, a color bar will be used instead of the image.
-        The color bar plot can also be forced.
+        If the analysed bytes exceed the MAX_PLOT_FILE_SIZE, a BYTE_PLOT is rendered from a summary of the bytes
+        (see byte_summary() and LodBytePlot) instead of plotting every byte.
+        A color bar plot can be forced with COLOR_MAP.
 
         :param file_name: the image file source path
         :param dpi: dpi/size of the image. dpi * FIG_SIZE gives the resulting size
-        :param plot_type: either BYTE_PLOT (1) or COLOR_MAP (2)
+        :param plot_type: either BYTE_PLOT (1), COLOR_MAP (2), RASTER_BYTE_PLOT (3) or ENTROPY_PLOT (4)
+        :param image_format: one of PlotBase.IMAGE_FORMATS, by default the extension of file_name or png
+        :param compression: optional compression level: zlib level (0-9) of png, encoder effort (0-6) of webp
+        :param entropy_trace: draw the entropy_trace() over the plot
         '''
         
         if (self.file_size < 0x100):
             raise IOError("The file is too small for visualization." )
         
-        plotter = self._init_plotter(plot_type)
-        plotter.plot_to_file(file_name, dpi)
+        plotter = self._init_plotter(plot_type, entropy_trace=entropy_trace)
+        plotter.plot_to_file(file_name, dpi, None, image_format, compression)
 
-    def plot_to_dynamic_size_buffer(self, dpi, width, height, plot_type=BYTE_PLOT):
+    def plot_to_dynamic_size_buffer(self, dpi, width, height, plot_type=BYTE_PLOT, image_format='png',
+                                    compression=None, entropy_trace=False):
         '''
         Will plot the analysis to a image data buffer.
         The width will depend on the size of the analysed file.
         Where a dpi of 72 will result in a width equal to the file size in kb.
-        If the analysed binary file exceeds the MAX_PLOT_FILE_SIZE, a color bar will be used instead of the image.
-        The color bar plot can also be forced.
+        If the analysed bytes exceed the MAX_PLOT_FILE_SIZE, a BYTE_PLOT is rendered from a summary of the bytes
+        (see byte_summary() and LodBytePlot) instead of plotting every byte.
+        A color bar plot can be forced with COLOR_MAP.
 
         :param dpi: dpi/size of the image. dpi * FIG_SIZE gives the resulting size
         :param width: The desired width of the image
         :param height: The desired height of the image.
-        :param plot_type: either BYTE_PLOT (1) or COLOR_MAP (2)
-        :return: the bytes of the png image
+        :param plot_type: either BYTE_PLOT (1), COLOR_MAP (2), RASTER_BYTE_PLOT (3) or ENTROPY_PLOT (4)
+        :param image_format: one of PlotBase.IMAGE_FORMATS (png, webp, svg, rgba)
+        :param compression: optional compression level: zlib level (0-9) of png, encoder effort (0-6) of webp
+        :param entropy_trace: draw the entropy_trace() over the plot
+        :return: the bytes of the image, a numpy uint8 array of shape (height, width, 4) for rgba
         '''
         
         if (self.file_size < 0x100):
             raise IOError("The file is too small for visualization." )
 
-        plotter = self._init_plotter(plot_type)
-        image_bytes = plotter.plot_to_dynamic_size_buffer(dpi, width, height)
+        plotter = self._init_plotter(plot_type, entropy_trace=entropy_trace)
+        image_bytes = plotter.plot_to_dynamic_size_buffer(dpi, width, height, image_format, compression)
 
         return image_bytes
 
-    def plot_to_dynamic_size_file(self, file_name, dpi, width, height, plot_type=BYTE_PLOT):
+    def plot_to_dynamic_size_file(self, file_name, dpi, width, height, plot_type=BYTE_PLOT, image_format=None,
+                                  compression=None, entropy_trace=False):
         '''
         Will plot the analysis to an image file.
         The width will depend on the size of the analysed file.
         Where a dpi of 72 will result in a width equal to the file size in kb.
-        If the analysed binary file exceeds the MAX_PLOT_FILE_SIZE, a color bar will be used instead of the image.
-        The color bar plot can also be forced.
+        If the analysed bytes exceed the MAX_PLOT_FILE_SIZE, a BYTE_PLOT is rendered from a summary of the bytes
+        (see byte_summary() and LodBytePlot) instead of plotting every byte.
+        A color bar plot can be forced with COLOR_MAP.
 
         :param file_name: the image file source path
         :param dpi: dpi/size of the image. dpi * FIG_SIZE gives the resulting size
         :param width: The desired width of the image.
         :param height: The desired height of the image.
-        :param plot_type: either BYTE_PLOT (1) or COLOR_MAP (2)
+        :param plot_type: either BYTE_PLOT (1), COLOR_MAP (2), RASTER_BYTE_PLOT (3) or ENTROPY_PLOT (4)
+        :param image_format: one of PlotBase.IMAGE_FORMATS, by default the extension of file_name or png
+        :param compression: optional compression level: zlib level (0-9) of png, encoder effort (0-6) of webp
+        :param entropy_trace: draw the entropy_trace() over the plot
         '''
         
         if (self.file_size < 0x100):
             raise IOError("The file is too small for visualization." )
 
-        plotter = self._init_plotter(plot_type)
-        plotter.plot_to_dynamic_size_file(file_name, dpi, width, height)
+        plotter = self._init_plotter(plot_type, entropy_trace=entropy_trace)
+        plotter.plot_to_dynamic_size_file(file_name, dpi, width, height, image_format, compression)
 
-    def _init_plotter(self, plot_type):
-        if plot_type == self.BYTE_PLOT:
-            plotter = BytePlot(self.file_path, self.regions)
+    def render_all(self, specs, processes=1, mp_context=None):
+        '''
+        Will plot several images of the analysis at once.
+        The regions are copied and flattened once for all images, every plot type gets one plotter,
+        which is reused by all of its images.
+
+        :param specs: iterable of RenderSpec or (plot_type, dpi, size, file_name, image_format, compression,
+                      entropy_trace) tuples, all but plot_type and dpi are optional
+        :param processes: number of worker processes the images are distributed to
+        :param mp_context: multiprocessing context of the workers, by default multiprocessing.get_context()
+        :return: list with an entry per spec, the image (see plot_to_buffer()) or None, if written to a file
+        '''
+        specs = [RenderSpec(*spec) for spec in specs]
+
+        if (self.file_size < 0x100):
+            raise IOError("The file is too small for visualization." )
+        if processes < 1:
+            raise ValueError("Number of processes must be at least 1!")
+
+        processes = min(processes, len(specs))
+        if processes <= 1:
+            return self._render_specs(specs)
+
+        # compute everything the plotters need once, workers get it with the pickled object
+        self.sizes
+        if any(s.plot_type == self.BYTE_PLOT for s in specs) and self._plot_size() > self.MAX_PLOT_FILE_SIZE:
+            self.byte_summary()
+        if any(s.plot_type == self.ENTROPY_PLOT or s.entropy_trace for s in specs):
+            self.entropy_trace()
+
+        chunks = [specs[i::processes] for i in range(processes)]
+        if mp_context is None:
+            mp_context = multiprocessing.get_context()
+        with mp_context.Pool(processes) as pool:
+            results = pool.map(_render_specs, [(self, chunk) for chunk in chunks])
+
+        images = [None] * len(specs)
+        for i, chunk_images in enumerate(results):
+            images[i::processes] = chunk_images
+
+        return images
+
+    def _render_specs(self, specs):
+        plotters = {}
+        images = []
+
+        for spec in specs:
+            plotter = plotters.get((spec.plot_type, spec.entropy_trace))
+            if plotter is None:
+                # later plotters share the regions of the first one
+                first = next(iter(plotters.values()), None)
+                plotter = self._init_plotter(spec.plot_type, first, spec.entropy_trace)
+                plotters[(spec.plot_type, spec.entropy_trace)] = plotter
+
+            images.append(plotter.render(spec.dpi, spec.size, spec.file_name, spec.image_format,
+                                         spec.compression))
+
+        return images
+
+    def __getstate__(self):
+        # the memory file only exists in this process, the copy gets the bytes of the buffer in a new one
+        state = {k: v for k, v in self.__dict__.items() if v is not _NOT_COMPUTED}
+        if self._memory_file is not None:
+            with open(self._memory_file.name, 'rb') as f:
+                state['_memory_file'] = f.read()
+
+        return state
+
+    def __setstate__(self, state):
+        for field in ('_regions', '_sizes', '_decision', '_decision_detail', '_architecture', '_file_header'):
+            setattr(self, field, _NOT_COMPUTED)
+        self.__dict__.update(state)
+        if self._memory_file is not None:
+            self._memory_file = MemoryFile(self._memory_file)
+            self.file_path = self._memory_file.name
+
+    def _init_plotter(self, plot_type, shared=None, entropy_trace=False):
+        '''
+        :param plot_type: the plot type
+        :param shared: optional plotter of this object, whose regions are used instead of a copy
+        :param entropy_trace: draw the entropy_trace() over the plot
+        '''
+        regions = self.regions if shared is None else {}
+
+        if plot_type == self.BYTE_PLOT and self._plot_size() > self.MAX_PLOT_FILE_SIZE:
+            plotter = LodBytePlot(self.file_path, regions, self.byte_summary())
+        elif plot_type == self.BYTE_PLOT:
+            plotter = BytePlot(self.file_path, regions)
         elif plot_type == self.COLOR_MAP:
-            plotter = ColorMap(self.file_path, self.regions)
+            plotter = ColorMap(self.file_path, regions)
+        elif plot_type == self.RASTER_BYTE_PLOT:
+            plotter = RasterBytePlot(self.file_path, regions)
+        elif plot_type == self.ENTROPY_PLOT:
+            plotter = EntropyPlot(self.file_path, regions, self.entropy_trace())
         else:
             raise ValueError("Not supported plot type!")
 
+        if shared is not None:
+            plotter._share_regions(shared)
+
         plotter._offsets = (self._codescanner.start, self._codescanner.end)
         plotter._file_size = self.sizes['FileSize']
         plotter.update_code_spec_label(self.regions.get("Code"))
+        if entropy_trace and plot_type != self.ENTROPY_PLOT:
+            plotter.set_entropy_trace(self.entropy_trace())
 
         return plotter
+
+    def _plot_size(self):
+        start, end = self._scan_options[:2]
+
+        return (end or self.file_size) - start
+
+
+def _render_specs(task):
+    '''
+    Worker process part of CodescannerAnalysisData.render_all().
+    '''
+    cad, specs = task
+
+    return cad._render_specs(specs)
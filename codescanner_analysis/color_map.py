@@ -1,10 +1,9 @@
 import os
 import matplotlib as mpl
-
-mpl.use('agg')
-
 import matplotlib.patches as mpatches
-import matplotlib.pyplot as plt
+import numpy
+from matplotlib.artist import setp
+from matplotlib.colors import to_rgba
 
 from codescanner_analysis.plot_base import PlotBase
 
@@ -25,26 +24,28 @@ class ColorMap(PlotBase):
     def __del__(self):
         pass
 
-    def plot_to_buffer(self, dpi, fig_size=None):
+    def plot_to_buffer(self, dpi, fig_size=None, image_format='png', compression=None):
         
         if (self.filesize < MIN_FILE_SIZE):
             raise IOError("File is too small to even have a proper x-axis!")
         
         if (dpi < PlotBase.MIN_DPI):
             raise ValueError("DPI must be at mimimum %d!" % PlotBase.MIN_DPI)
+        self._check_image_format(image_format, compression)
 
         if (fig_size is None):
             fig_size = self.FIG_SIZE
         
-        return self._plot_to_buffer(dpi, fig_size)
+        return self._plot_to_buffer(dpi, fig_size, image_format, compression)
 
-    def plot_to_dynamic_size_buffer(self, dpi, width, height):
+    def plot_to_dynamic_size_buffer(self, dpi, width, height, image_format='png', compression=None):
         
         if (self.filesize < MIN_FILE_SIZE):
             raise IOError("File is too small to even have a proper x-axis!")
         
         if (dpi < PlotBase.MIN_DPI):
             raise ValueError("DPI must be at mimimum %d!" % PlotBase.MIN_DPI)
+        self._check_image_format(image_format, compression)
             
         if (width == 0):
             raise ValueError("Width must not be zero!")
@@ -61,9 +62,9 @@ class ColorMap(PlotBase):
         # if height * dpi > PlotBase.MAX_PLOT_AXIS_SIZE:
         #     raise ValueError("Height to big!")
 
-        return self._plot_to_buffer(dpi, fig_size)
+        return self._plot_to_buffer(dpi, fig_size, image_format, compression)
 
-    def _plot_to_buffer(self, dpi, fig_size):
+    def _plot_to_buffer(self, dpi, fig_size, image_format='png', compression=None):
         
         if (self.filesize < MIN_FILE_SIZE):
             raise IOError("File is too small to even have a proper x-axis!")
@@ -71,114 +72,79 @@ class ColorMap(PlotBase):
         if len(self._regions) == 0:
             return ''
 
-        plot = self._create_plot(fig_size)
+        plot = self._create_plot(fig_size, dpi)
 
-        return self._save_plot_to_buffer(plot, dpi)
+        return self._save_plot_to_buffer(plot, dpi, image_format, compression)
 
-    def _create_plot(self, fig_size):
-        ax, plot = self._init_plot(fig_size)
-        cb, ticks = self._create_bar(ax)
-        self._add_labels(cb, ticks)
+    def _create_plot(self, fig_size, dpi=PlotBase.DEFAULT_DPI):
+        ax, plot = self._init_plot(fig_size, dpi)
+        ticks = self._create_bar(ax)
+        self._add_labels(ax, ticks)
+        self._plot_entropy_overlay(ax)
 
         return plot
 
-    def _init_plot(self, fig_size):
-        plot = plt.figure(figsize=fig_size)
-        _, ax = plt.subplots(figsize=fig_size)
-        # plt.subplots_adjust(left=0.05, right=0.98, top=.80, bottom=0.35, hspace=0.1)
-        # plot.tight_layout()
+    def _init_plot(self, fig_size, dpi=PlotBase.DEFAULT_DPI):
+        plot = self._new_figure(fig_size)
+        plot.set_dpi(dpi)
+        ax = plot.add_subplot(111)
+        # plot.subplots_adjust(left=0.05, right=0.98, top=.80, bottom=0.35, hspace=0.1)
         pad = 4.2 + self._file_size.bit_length() / 30.0
-        plt.tight_layout(pad=pad, w_pad=0.0, h_pad=0.0)
+        plot.tight_layout(pad=pad, w_pad=0.0, h_pad=0.0)
         return ax, plot
 
     def _create_bar(self, ax):
-        area_list = self._convert_dict_to_list_of_areas()
-        area_list = self._pad_area_list(area_list)
-        cmap = self._create_color_map(area_list)
-        bounds = self._create_bounds(area_list)
-        ticks = self._create_ticks()
+        '''
+        Draw the bar as an image with one pixel per column of the axes, see _rasterize_bar().
 
-        norm = mpl.colors.BoundaryNorm(bounds, cmap.N)
-        cb = mpl.colorbar.ColorbarBase(ax,
-                                       cmap=cmap,
-                                       norm=norm,
-                                       boundaries=bounds,
-                                       ticks=ticks,
-                                       spacing='proportional',
-                                       orientation='horizontal')
+        :return: the ticks
+        '''
+        size = self._bar_size()
+        # the size of the axes in pixels is known after the layout
+        width = max(1, int(round(ax.get_window_extent().width)))
+
+        ax.imshow(self._rasterize_bar(size, width), extent=(0, size, 0, 1), aspect='auto',
+                  interpolation='nearest')
+        ax.set_xlim(0, size)
+        ax.set_ylim(0, 1)
+        ax.set_yticks([])
 
-        return cb, ticks
+        ticks = self._create_ticks()
+        ax.set_xticks(ticks)
 
-    def _convert_dict_to_list_of_areas(self):
+        return ticks
+
+    def _bar_size(self):
         '''
-        The regions dictionary will be converted into a list of ascending region tuples.
-        The tuples contain the region tuple (start, end) and the area label.
+        The bar covers the file, or all regions, if they reach beyond it.
         '''
-        areas = []
+        bounds = self._region_runs()[0]
+
+        return max(self._file_size, int(bounds[-2]))
 
-        for idx in self._regions:
-            for r in self._regions[idx]:
-                areas.append((r, idx))
+    def _rasterize_bar(self, size, width):
+        '''
+        Every pixel column gets the color of the area spec covering most of its bytes,
+        gaps between regions are colored like PAD_AREA_ID.
 
-        areas.sort(key=lambda tup: tup[0][0])
+        :param size: number of bytes of the bar
+        :param width: the maximum number of pixel columns
+        :return: RGBA image, numpy uint8 array of shape (1, columns, 4)
+        '''
+        columns = max(1, min(width, size))
+        column_bounds = numpy.arange(columns + 1, dtype=numpy.int64) * size // columns
+        labels = numpy.argmax(self._label_coverage(column_bounds), axis=0)
 
-        return areas
+        return self._bar_palette()[labels][numpy.newaxis]
 
-    def _pad_area_list(self, areas):
+    def _bar_palette(self):
         '''
-        Fill up area gaps with PAD_AREA_ID.
+        :return: numpy uint8 array of RGBA colors, 0 is the PAD_AREA_ID color, i + 1 the color of area spec i
         '''
-        self._pad_first_area(areas)
-        self._pad_last_area(areas)
-        self._pad_mid_areas(areas)
-
-        return areas
-
-    def _pad_first_area(self, areas):
-        first_el = areas[0]
-        if first_el[0][0] != 0:
-            pad_el = ((0, first_el[0][0]), self.PAD_AREA_ID)
-            areas.insert(0, pad_el)
-
-    def _pad_last_area(self, areas):
-        last_el = areas[len(areas) - 1]
-        if last_el[0][1] < self._file_size:
-            pad_el = ((last_el[0][1], self._file_size), self.PAD_AREA_ID)
-            areas.append(pad_el)
-
-    def _pad_mid_areas(self, areas):
-        paddings = []
-        for i in range(len(areas) - 1):
-            act_el = areas[i]
-            next_el = areas[i + 1]
-            if self._area_has_gap_to_next_area(act_el, next_el):
-                pad = ((act_el[0][1], next_el[0][0]), self.PAD_AREA_ID)
-                paddings.append(pad)
-        areas.extend(paddings)
-        areas.sort(key=lambda tup: tup[0][0])
-
-    def _area_has_gap_to_next_area(self, act, next_el):
-        return act[0][1] != next_el[0][0]
-
-    def _create_color_map(self, area_list):
-        colors = []
-        for a in area_list:
-            a_id = a[1]
-            # maybe there is a better way to find the corresponding spec
-            spec = [s for s in self._area_specs if s.id == a_id]
-            colors.append(spec[0].dot_color)
-
-        return mpl.colors.ListedColormap(colors)
-
-    def _create_bounds(self, area_list):
-        bounds = []
-        for a in area_list:
-            bounds.append(a[0][0])
-
-        # the end position of the last region
-        bounds.append(area_list[len(area_list) - 1][0][1])
-
-        return bounds
+        pad_color = {s.id: s.dot_color for s in self._area_specs}[self.PAD_AREA_ID]
+        colors = [pad_color] + [s.dot_color for s in self._area_specs]
+
+        return (numpy.array([to_rgba(c) for c in colors]) * 0xff).round().astype(numpy.uint8)
 
     def _create_ticks(self):
         '''
@@ -189,11 +155,11 @@ class ColorMap(PlotBase):
 
         return ticks
 
-    def _add_labels(self, cb, ticks):
-        cb.set_label('Byte location')
-        cb.ax.set_title('{} ({} kB)'.format(self._short_filename, self._get_printable_file_size()))
-        self._set_tick_format(cb.ax, ticks)
-        self._add_legend()
+    def _add_labels(self, ax, ticks):
+        ax.set_xlabel('Byte location')
+        ax.set_title('{} ({} kB)'.format(self._short_filename, self._get_printable_file_size()))
+        self._set_tick_format(ax, ticks)
+        self._add_legend(ax)
 
     def _get_printable_file_size(self):
         return round(1.0 * (self._file_size / 1024))
@@ -206,15 +172,15 @@ class ColorMap(PlotBase):
         ax.xaxis.set_tick_params(rotation=-60)
         ax.xaxis.set_tick_params(labelsize=10)
 
-        plt.setp(ax.xaxis.get_majorticklabels(), ha="left", rotation_mode="anchor")
+        setp(ax.xaxis.get_majorticklabels(), ha="left", rotation_mode="anchor")
 
-    def _add_legend(self):
+    def _add_legend(self, ax):
         handles = []
         for s in self._area_specs:
             if self._spec_is_in_regions(s.id):
                 handles.append(mpatches.Patch(color=s.dot_color, label=s.label))
 
-        plt.legend(handles=handles, loc='upper right')
+        ax.legend(handles=handles, loc='upper right')
 
     def _spec_is_in_regions(self, id):
         if self._regions.get(id):
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import re
+import warnings
+
+import numpy
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from codescanner_analysis.extended_analysis import rule_mask
+
+# size columns of a sample, see CodescanInterface.calculate_sizes()
+SIZE_COLUMNS = (('Code', 'code'), ('Data', 'data'), ('HighEntropy', 'high_entropy'), ('Zero', 'zero'),
+                ('Ascii', 'ascii'), ('FileSize', 'file_size'))
+
+# string columns get the width of their longest value per chunk
+SAMPLE_COLUMNS = [('sample', numpy.int64), ('path', str)] + [(c, numpy.int64) for _, c in SIZE_COLUMNS] + \
+                 [('decision', str), ('certainty', numpy.float64), ('rules', numpy.uint16), ('file_header', str),
+                  ('architecture', str), ('error', str)]
+REGION_COLUMNS = [('sample', numpy.int64), ('type', str), ('start', numpy.int64), ('end', numpy.int64),
+                  ('arch', str), ('bitness', numpy.int16), ('endianess', numpy.int8)]
+
+_CHUNK_PATTERN = re.compile(r'^(?:chunk|samples)-(\d+)\.(?:npz|parquet)$')
+
+
+class ColumnarWriter(object):
+    '''
+    Appends analysis results to columnar chunk files, for vectorized queries over a whole corpus.
+
+    * two tables: one row per sample (SAMPLE_COLUMNS) and one row per region (REGION_COLUMNS),
+      joined by the sample column, which is (chunk index << 32) + row of the sample in its chunk
+    * every chunk_size samples a chunk is written: samples-<chunk>.parquet and regions-<chunk>.parquet
+      if pyarrow is installed, otherwise chunk-<chunk>.npz with both tables as numpy structured arrays
+    * chunks are written to a temporary name and renamed, readers never see partial chunks;
+      new chunks are numbered after the existing ones, a directory is written by one writer at a time
+    * read all chunks of a directory with read_columns()
+    * close() (or the with statement) writes the last chunk, samples not written on garbage collection are dropped
+    '''
+    DEFAULT_CHUNK_SIZE = 0x1000
+    PARQUET = 'parquet'
+    NPZ = 'npz'
+    FORMATS = (PARQUET, NPZ)
+
+    def __init__(self, directory, chunk_size=DEFAULT_CHUNK_SIZE, file_format=None):
+        '''
+        :param directory: the directory of the chunk files, created if it does not exist
+        :param chunk_size: samples per chunk
+        :param file_format: PARQUET or NPZ, by default PARQUET if pyarrow is installed
+        '''
+        self._samples = []
+        self._regions = []
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1!")
+        if file_format is None:
+            file_format = self.PARQUET if pyarrow is not None else self.NPZ
+        if file_format not in self.FORMATS:
+            raise ValueError("Not supported file format '%s'!" % file_format)
+        if file_format == self.PARQUET and pyarrow is None:
+            raise ValueError("Parquet files need pyarrow!")
+
+        self.directory = os.path.expanduser(directory)
+        self.chunk_size = chunk_size
+        self.file_format = file_format
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._chunk = max([-1] + _chunk_indices(self.directory)) + 1
+
+    def __del__(self):
+        # no files are written here, numpy or pyarrow may be gone already at interpreter shutdown
+        if self._samples:
+            warnings.warn("ColumnarWriter of '%s' dropped %d samples, which were not written by close()."
+                          % (self.directory, len(self._samples)), ResourceWarning)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, result, path=None):
+        '''
+        Append the result of a sample.
+
+        :param result: CodescannerAnalysisData or batch.BatchResult
+        :param path: the path stored for the sample, by default the path of the result
+        '''
+        if hasattr(result, 'error'):
+            values = (result.path, result.regions, result.sizes, result.decision_detail, result.architecture,
+                      result.file_header, result.error)
+        else:
+            values = (result.file_path, result.regions, result.sizes, result.decision_detail, result.architecture,
+                      result.file_header, None)
+
+        if path is not None:
+            values = (path,) + values[1:]
+
+        self.append_values(*values)
+
+    def append_values(self, path, regions, sizes, decision_detail, architecture, file_header, error=None):
+        '''
+        Append the result of a sample, attributes of failed samples may be None.
+
+        :param path: the path of the sample
+        :param regions: regions dictionary, see CodescannerAnalysisData.regions
+        :param sizes: sizes dictionary, see CodescannerAnalysisData.sizes
+        :param decision_detail: extended_analysis.DecisionResult
+        :param architecture: architecture dictionary, see CodescannerAnalysisData.architecture
+        :param file_header: the file header
+        :param error: error message of a failed sample
+        '''
+        sample = (self._chunk << 32) + len(self._samples)
+        sizes = sizes or {}
+        code, certainty, rules = decision_detail if decision_detail is not None else ('', 0.0, ())
+
+        self._samples.append((sample, path) + tuple(sizes.get(key, 0) for key, _ in SIZE_COLUMNS) +
+                             (code, certainty, rule_mask(rules), file_header or '',
+                              (architecture or {}).get('Full', ''), error or ''))
+
+        for region_type, type_regions in (regions or {}).items():
+            for r in type_regions:
+                if len(r) >= 5:
+                    self._regions.append((sample, region_type, r[0], r[1], r[2], r[3], r[4]))
+                else:
+                    self._regions.append((sample, region_type, r[0], r[1], '', 0, 0))
+
+        if len(self._samples) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Write the appended samples to a new chunk.
+        '''
+        if not self._samples:
+            return
+
+        samples = _structured_array(self._samples, SAMPLE_COLUMNS)
+        regions = _structured_array(self._regions, REGION_COLUMNS)
+
+        if self.file_format == self.PARQUET:
+            # chunks are found by their samples file, it is written last
+            self._write_table(regions, 'regions-%06d.parquet' % self._chunk)
+            self._write_table(samples, 'samples-%06d.parquet' % self._chunk)
+        else:
+            temp_name = os.path.join(self.directory, '.chunk-%06d.npz.tmp' % self._chunk)
+            with open(temp_name, 'wb') as f:
+                numpy.savez_compressed(f, samples=samples, regions=regions)
+            os.replace(temp_name, os.path.join(self.directory, 'chunk-%06d.npz' % self._chunk))
+
+        self._samples = []
+        self._regions = []
+        self._chunk += 1
+
+    def close(self):
+        '''
+        Write the remaining samples.
+        '''
+        if self._samples:
+            self.flush()
+
+    def _write_table(self, array, name):
+        table = pyarrow.table({column: array[column] for column in array.dtype.names})
+        temp_name = os.path.join(self.directory, '.%s.tmp' % name)
+        pyarrow.parquet.write_table(table, temp_name)
+        os.replace(temp_name, os.path.join(self.directory, name))
+
+
+def read_columns(directory):
+    '''
+    Read all chunks of a directory written by ColumnarWriter.
+
+    :param directory: the directory of the chunk files
+    :return: samples, regions: dictionaries of numpy arrays, one per column (SAMPLE_COLUMNS, REGION_COLUMNS)
+    '''
+    directory = os.path.expanduser(directory)
+    samples = []
+    regions = []
+
+    for chunk in sorted(_chunk_indices(directory)):
+        npz_name = os.path.join(directory, 'chunk-%06d.npz' % chunk)
+        if os.path.isfile(npz_name):
+            with numpy.load(npz_name, allow_pickle=False) as arrays:
+                samples.append(_columns_of(arrays['samples']))
+                regions.append(_columns_of(arrays['regions']))
+        else:
+            if pyarrow is None:
+                raise RuntimeError("Reading Parquet files needs pyarrow!")
+            samples.append(_read_table(os.path.join(directory, 'samples-%06d.parquet' % chunk), SAMPLE_COLUMNS))
+            regions.append(_read_table(os.path.join(directory, 'regions-%06d.parquet' % chunk), REGION_COLUMNS))
+
+    return _concatenate(samples, SAMPLE_COLUMNS), _concatenate(regions, REGION_COLUMNS)
+
+
+def _chunk_indices(directory):
+    matches = (_CHUNK_PATTERN.match(os.path.basename(name)) for name in glob.glob(os.path.join(directory, '*')))
+    return list({int(m.group(1)) for m in matches if m})
+
+
+def _structured_array(rows, columns):
+    '''
+    :param rows: list of tuples, a value per column
+    :param columns: (name, type) of the columns, str columns get the width of their longest value
+    :return: numpy structured array
+    '''
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    dtype = []
+    for (name, column_type), column in zip(columns, values):
+        if column_type is str:
+            column_type = 'U%d' % max([1] + [len(v) for v in column])
+        dtype.append((name, column_type))
+
+    array = numpy.zeros(len(rows), dtype=dtype)
+    for (name, _), column in zip(columns, values):
+        array[name] = column
+
+    return array
+
+
+def _columns_of(array):
+    return {name: array[name] for name in array.dtype.names}
+
+
+def _read_table(file_name, columns):
+    table = pyarrow.parquet.read_table(file_name)
+    result = {}
+    for name, column_type in columns:
+        column = table.column(name).to_numpy(zero_copy_only=False)
+        result[name] = column.astype(str) if column_type is str else column.astype(column_type)
+
+    return result
+
+
+def _concatenate(chunks, columns):
+    if not chunks:
+        return {name: numpy.zeros(0, dtype='U1' if column_type is str else column_type)
+                for name, column_type in columns}
+
+    return {name: numpy.concatenate([chunk[name] for chunk in chunks]) for name, _ in columns}
@@ -2,8 +2,8 @@ import os
 import subprocess
 from collections import defaultdict
 
-from codescanner_analysis import header_parser
-from codescanner_analysis.utils import file_utils, file_to_array as fta
+from codescanner_analysis.file_header_parser import get_header_info
+from codescanner_analysis.utils import file_utils, intervals
 from codescanner_analysis.codescanner_analysis import CodescannerAnalysisData
 from codescanner_analysis.overlay_plot import OverlayPlot
 
@@ -33,19 +33,8 @@ class ComparisonAnalysis(object):
         return cad.regions
 
     def _parse_x_regions_with_header_parser(self):
-        root_directory = os.path.dirname(os.path.realpath(__file__))
-        libheaderparser_src = os.path.join(root_directory, 'res/lib', 'libheaderparser.so')
-
-        header_parser.init(libheaderparser_src)
-        hp_result = header_parser.get_basic_info(self._file_path, 0, header_parser.FORCE_NONE)
-
-        cr = {}
-
-        for i in range(len(hp_result['regions'])):
-            t = hp_result['regions'][i]
-            cr[t[0]] = [[int(t[1]), int(t[2])]]
-
-        return cr
+        # the header is parsed once per process and file, see get_header_info()
+        return get_header_info(self._file_path).code_regions()
 
     def parse_x_regions_with_objdump(self):
         '''
@@ -117,15 +106,13 @@ class ComparisonAnalysis(object):
 
         file_size = os.path.getsize(self._file_path)
 
-        cs_code = [r[0:2] for r in self.cs_regions.get('Code')]
+        cs_code = intervals.intersection(self.cs_regions.get('Code'), [[0, file_size]])
         x_code = []
         for a in self.x_regions:
             x_code.extend(self.x_regions[a])
 
-        cs_regions_a = fta.Analog(cs_code, file_size)
-        alien_regions = fta.toDigital(fta.Analog(x_code, file_size, '-', cs_regions_a))
-        cs_regions_a = fta.Analog(cs_code, file_size)
-        code_regions = fta.toDigital(fta.Analog(x_code, file_size, '*', cs_regions_a))
+        alien_regions = intervals.difference(cs_code, x_code)
+        code_regions = intervals.intersection(cs_code, x_code)
 
         original_regions = self.cs_regions['Code']
 
@@ -134,21 +121,14 @@ class ComparisonAnalysis(object):
         self._restore_regions_architecture(original_regions)
 
     def _restore_regions_architecture(self, original_regions):
-        for r in original_regions:
-            for i, cr in enumerate(self.cs_regions['Code']):
-                if r[0] <= cr[0] and cr[1] <= r[1]:
-                    self.cs_regions['Code'][i] = cr[0:]
-            for i, acr in enumerate(self.cs_regions['AlienCode']):
-                if r[0] <= acr[0] and acr[1] <= r[1]:
-                    self.cs_regions['AlienCode'][i] = (acr[0], acr[1], r[2])
-            # i = 0
-            # cr = self.cs_regions['Code'][i]
-            # if r[0] <= cr[0] and cr[1] <= r[1]:
-            #     self.cs_regions['Code'][i] = (cr[0], cr[1], r[2])
-            # i = len(self.cs_regions['AlienCode']) - 1
-            # acr = self.cs_regions['AlienCode'][i]
-            # if r[0] <= acr[0] and acr[1] <= r[1]:
-            #     self.cs_regions['AlienCode'][i] = (acr[0], acr[1], r[2])
+        '''
+        Alien code regions within an original code region get its architecture.
+        '''
+        alien_regions = self.cs_regions['AlienCode']
+        for i, j in enumerate(intervals.containing(original_regions, alien_regions)):
+            if j >= 0:
+                acr = alien_regions[i]
+                alien_regions[i] = (acr[0], acr[1], original_regions[j][2])
 
     def _get_alien_architecture(self):
         if not self.cs_regions.get('AlienCode') or len(
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import numpy
+from matplotlib.colors import to_rgba
+from matplotlib.patches import Patch
+from matplotlib.ticker import MultipleLocator, FuncFormatter
+
+from codescanner_analysis.byte_plot import BytePlot
+from codescanner_analysis.entropy_trace import EntropyTrace
+
+
+class EntropyPlot(BytePlot):
+    '''
+    Sliding window entropy (byte offset vs. bits per byte) over the regions of the file.
+
+    * the regions are drawn as translucent bands in the colors of their area specs (PlotBase.AREAS)
+    * the curve is the mean entropy of the windows of every pixel column, the shaded range their minimum and maximum
+    * with a given EntropyTrace the file is not read at all
+    '''
+    FIG_SIZE = (16, 4)
+    # opacity of the region bands
+    REGION_ALPHA = 0.3
+
+    def __init__(self, file_name, regions, trace=None):
+        '''
+        :param file_name: the file path
+        :param regions: the regions of the file
+        :param trace: optional EntropyTrace of the plotted bytes, built from the file on demand otherwise
+        '''
+        super(EntropyPlot, self).__init__(file_name, regions)
+        self._entropy_trace = trace
+
+    def _plot_to_buffer(self, dpi, fig_size, image_format='png', compression=None):
+        plot = self._new_figure(fig_size)
+        plot.set_dpi(dpi)
+        subplot = plot.add_subplot(111)
+        self._prepare_axes(subplot)
+        self._add_labels(subplot)
+        plot.tight_layout()
+
+        # the size of the axes in pixels is known after the layout
+        width = max(1, int(subplot.get_window_extent().width))
+        if self._entropy_trace is None:
+            self._entropy_trace = EntropyTrace.from_file(self._file_name, self._offsets[0], self._offsets[1])
+
+        subplot.imshow(self._region_bands(width), extent=(0, self._file_size, 0, EntropyTrace.MAX_ENTROPY),
+                       aspect='auto', interpolation='nearest')
+        line = self._plot_entropy_trace(subplot, self._entropy_trace, width)
+        self._prepare_axes(subplot)
+
+        subplot.legend(handles=self._legend_handles() + [line], loc='upper right')
+
+        return self._save_plot_to_buffer(plot, dpi, image_format, compression)
+
+    def _region_bands(self, width):
+        '''
+        Every pixel column gets the color of the area spec covering most of its bytes,
+        columns mostly outside of regions stay transparent.
+
+        :param width: the maximum number of pixel columns
+        :return: RGBA image, numpy uint8 array of shape (1, columns, 4)
+        '''
+        size = self._file_size
+        columns = max(1, min(width, size))
+        column_bounds = numpy.arange(columns + 1, dtype=numpy.int64) * size // columns
+        labels = numpy.argmax(self._label_coverage(column_bounds), axis=0)
+
+        palette = numpy.array([(0, 0, 0, 0)] + [to_rgba(s.dot_color, self.REGION_ALPHA) for s in self._area_specs])
+
+        return (palette[labels][numpy.newaxis] * 0xff).round().astype(numpy.uint8)
+
+    def _prepare_axes(self, ax):
+        super(EntropyPlot, self)._prepare_axes(ax)
+
+        ax.set_ylim(0, EntropyTrace.MAX_ENTROPY)
+        ax.yaxis.set_major_locator(MultipleLocator(1))
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda y, _: '%d' % y))
+
+    def _add_labels(self, subplot):
+        super(EntropyPlot, self)._add_labels(subplot)
+
+        subplot.set_ylabel(self.ENTROPY_LABEL)
+
+    def _legend_handles(self):
+        return [Patch(facecolor=spec.dot_color, alpha=self.REGION_ALPHA, label=spec.label)
+                for spec in self._area_specs if self._regions.get(spec.id)]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import io
+
+import numpy
+
+import codescanner_analysis.utils.file_utils as file_utils
+import codescanner_analysis.utils.file_to_array as fta
+
+
+class EntropyTrace(object):
+    '''
+    Sliding window Shannon entropy (bits per byte) of a file: point i is the entropy of the bytes
+    [offsets[i], offsets[i] + window), the windows start every step bytes.
+
+    * computed in linear time over the read-only map of the file, see file_to_array.slidingStatistics()
+    * reduced to the pixel columns of a plot by envelope()
+    * serializable (to_bytes(), from_bytes()), see ResultCache.put_bytes()
+    '''
+    DEFAULT_WINDOW = 0x400
+    MAX_ENTROPY = 8.0
+
+    def __init__(self, offsets, entropy, window, step):
+        '''
+        :param offsets: numpy int64 array of the window starts
+        :param entropy: numpy float64 array of the entropy of every window
+        :param window: bytes per window
+        :param step: distance of the window starts
+        '''
+        if len(offsets) != len(entropy):
+            raise ValueError("Number of offsets does not match the number of entropy values!")
+
+        self.offsets = numpy.asarray(offsets, dtype=numpy.int64)
+        self.entropy = numpy.asarray(entropy, dtype=numpy.float64)
+        self.window = int(window)
+        self.step = int(step)
+
+    @classmethod
+    def default_step(cls, window):
+        return max(1, window // 4)
+
+    @classmethod
+    def from_array(cls, byte_array, window=DEFAULT_WINDOW, step=None, offset=0):
+        '''
+        :param byte_array: numpy uint8 array
+        :param window: bytes per window, a single window covers smaller arrays
+        :param step: distance of the window starts, default_step() if None
+        :param offset: offset of the first byte of byte_array
+        :return: EntropyTrace
+        '''
+        if step is None:
+            step = cls.default_step(window)
+
+        stats = fta.slidingStatistics(byte_array, window, step, offset)
+
+        return cls(stats.offsets, stats.entropy, window, step)
+
+    @classmethod
+    def from_file(cls, file_name, start=0, end=0, window=DEFAULT_WINDOW, step=None):
+        '''
+        :param file_name: the file path
+        :param start: start offset
+        :param end: end offset (exclusive), 0 for the end of the file
+        :param window: bytes per window
+        :param step: distance of the window starts, default_step() if None
+        :return: EntropyTrace of the bytes [start, end), the offsets are file offsets
+        '''
+        return cls.from_array(file_utils.map_bytes(file_name, start, end), window, step, start)
+
+    def envelope(self, columns):
+        '''
+        Reduce the trace to at most columns points, every column keeps the range and mean of its windows.
+
+        :param columns: the maximum number of points
+        :return: centers, minimum, mean, maximum numpy arrays; centers are the mean window centers
+        '''
+        if columns < 1:
+            raise ValueError("Number of columns must be at least 1!")
+
+        centers = self.offsets + self.window / 2.0
+        if len(self.entropy) <= columns:
+            return centers, self.entropy, self.entropy, self.entropy
+
+        firsts = numpy.arange(columns, dtype=numpy.int64) * len(self.entropy) // columns
+        counts = numpy.diff(numpy.append(firsts, len(self.entropy)))
+
+        return (numpy.add.reduceat(centers, firsts) / counts,
+                numpy.minimum.reduceat(self.entropy, firsts),
+                numpy.add.reduceat(self.entropy, firsts) / counts,
+                numpy.maximum.reduceat(self.entropy, firsts))
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        numpy.savez_compressed(buffer, offsets=self.offsets, entropy=self.entropy,
+                               parameters=numpy.array([self.window, self.step], dtype=numpy.int64))
+
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with numpy.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            window, step = arrays['parameters']
+            return cls(arrays['offsets'], arrays['entropy'], window, step)
@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+from collections import namedtuple
+
+import numpy
+
 
 # returns Ascii und Unicode Strings (getrennt)
 def extract_strings(self):
@@ -14,6 +18,41 @@ DecisionDict["(N)"] = "Normal"
 DecisionDict["(X)"] = "No evaluation possible"
 DecisionDict["(D)"] = "Data, for sure"
 
+# the rules of make_decision(), bit i of a rule mask is set, if DECISION_RULES[i] holds
+DECISION_RULES = ('header_present', 'is_small', 'is_tiny', 'code_exists', 'code_minimum', 'code_sufficient',
+                  'big_EBP_exists', 'too_many_zeros', 'corrupt', 'veto_I', 'veto_II', 'veto_III', 'packed_revoked')
+
+
+class DecisionResult(namedtuple('DecisionResult', ['code', 'certainty', 'rules'])):
+    '''
+    Detailed result of make_decision(), see make_decision_detail().
+
+    code: the decision, a DecisionDict key
+    certainty: PackedCertainty, 0 unless the decision is "(P)"
+    rules: names of the DECISION_RULES, which hold for the sample
+    '''
+    __slots__ = ()
+
+    @property
+    def rule_mask(self):
+        return rule_mask(self.rules)
+
+
+def rule_mask(rules):
+    '''
+    :param rules: names of DECISION_RULES
+    :return: int with bit i set for DECISION_RULES[i]
+    '''
+    return sum(1 << DECISION_RULES.index(rule) for rule in set(rules))
+
+
+def rule_names(mask):
+    '''
+    :param mask: rule mask, see rule_mask()
+    :return: tuple of the names of the DECISION_RULES set in mask
+    '''
+    return tuple(rule for i, rule in enumerate(DECISION_RULES) if int(mask) >> i & 1)
+
 
 # Gibt Decision als Kuerzel aus.
 def make_decision(sizes, header):
@@ -109,3 +148,112 @@ def make_decision(sizes, header):
         PackedCertainty = 0
 
     return decision
+
+
+def make_decision_detail(sizes, header):
+    '''
+    make_decision() with the evidence it is based on.
+
+    :param sizes: sizes of the sample, like make_decision()
+    :param header: the file header of the sample, None if there is none
+    :return: DecisionResult
+    '''
+    if sizes is None:
+        raise RuntimeError('RuntimeError raised in make_decision_detail: parameter sizes was None.')
+
+    columns = {name: [sizes[name]] for name in _SIZE_COLUMNS if sizes.get(name) is not None}
+    decisions, packed_certainty, rule_masks = make_decision_detail_batch(columns, header is not None)
+
+    return DecisionResult(str(decisions[0]), float(packed_certainty[0]), rule_names(rule_masks[0]))
+
+
+def make_decision_batch(sizes, header_present):
+    '''
+    make_decision() of many samples at once, the same rules evaluated on numpy arrays.
+
+    :param sizes: mapping (e.g. dict or numpy structured array) of the size columns
+                  Code, Data, HighEntropy, Zero and FileSize, arrays of equal length
+    :param header_present: bool array (or a single bool), whether a file header was found for the sample
+    :return: decisions (numpy array of DecisionDict keys), PackedCertainty (numpy float64 array, 0 unless "(P)")
+    '''
+    decisions, packed_certainty, _ = _evaluate_decision_rules(sizes, header_present)
+
+    return decisions, packed_certainty
+
+
+def make_decision_detail_batch(sizes, header_present):
+    '''
+    make_decision_batch() with the evidence of every sample.
+
+    :return: decisions, PackedCertainty, rule masks (numpy uint16 array, see rule_mask())
+    '''
+    decisions, packed_certainty, rules = _evaluate_decision_rules(sizes, header_present)
+
+    rule_masks = numpy.zeros(decisions.shape, dtype=numpy.uint16)
+    for i, rule in enumerate(DECISION_RULES):
+        rule_masks |= rules[rule].astype(numpy.uint16) << i
+
+    return decisions, packed_certainty, rule_masks
+
+
+_SIZE_COLUMNS = ("Code", "Data", "HighEntropy", "Zero", "FileSize")
+
+
+def _evaluate_decision_rules(sizes, header_present):
+    '''
+    :return: decisions, PackedCertainty, dict of a bool array per DECISION_RULES name
+    '''
+    if sizes is None:
+        raise RuntimeError('RuntimeError raised in make_decision_batch: parameter sizes was None.')
+
+    columns = {}
+    for name in _SIZE_COLUMNS:
+        try:
+            columns[name] = numpy.asarray(sizes[name], dtype=numpy.float64)
+        except (KeyError, ValueError, TypeError):
+            raise RuntimeError('RuntimeError raised in make_decision_batch: no %s in parameter sizes specified.' % name)
+
+    code, data, high_entropy, zero, file_size, header_present = numpy.broadcast_arrays(
+        columns["Code"], columns["Data"], columns["HighEntropy"], columns["Zero"], columns["FileSize"],
+        numpy.asarray(header_present, dtype=bool))
+    if not numpy.all(file_size):
+        raise RuntimeError('RuntimeError raised in make_decision_batch: FileSize of a sample is 0.')
+
+    rules = {'header_present': header_present}
+    rules['is_small'] = file_size < 50000
+    rules['is_tiny'] = file_size < 20000
+    rules['code_exists'] = code > (0.01 * file_size)
+    rules['code_minimum'] = code > (0.05 * file_size)
+    rules['code_sufficient'] = code > (0.2 * file_size)
+    rules['big_EBP_exists'] = high_entropy > (0.4 * file_size)
+    rules['too_many_zeros'] = 100.0 * (zero / file_size) > 25.0
+    rules['corrupt'] = code > (0.9 * file_size)
+
+    code_antithesis = numpy.minimum(high_entropy * 1.0 + data * 0.3, file_size)
+    rules['veto_I'] = code_antithesis > (0.2 * file_size)
+    rules['veto_II'] = code_antithesis > (0.3 * file_size)
+    rules['veto_III'] = code_antithesis > (0.4 * file_size)
+
+    code_or_header = rules['code_exists'] | header_present
+    packed = ((rules['is_tiny'] & rules['veto_III']) | (rules['is_small'] & rules['veto_II']) | rules['veto_I']) & \
+        code_or_header & ~rules['code_sufficient']
+    revoked = packed & (code > high_entropy) & rules['big_EBP_exists']
+    rules['packed_revoked'] = revoked
+    packed &= ~revoked
+
+    # the elif chain of make_decision() after the packed decision, the first matching rule wins
+    not_packed = ~(packed | revoked)
+    normal = not_packed & (rules['code_sufficient'] | (rules['code_minimum'] & rules['is_tiny']) |
+                           (rules['code_minimum'] & (high_entropy < (0.1 * file_size))))
+    data_file = not_packed & ~normal & ~code_or_header
+    corrupt = not_packed & ~normal & ~data_file & rules['corrupt']
+
+    decisions = numpy.full(file_size.shape, "(U)", dtype='<U3')
+    decisions[corrupt] = "(C)"
+    decisions[data_file] = "(D)"
+    decisions[normal | revoked] = "(N)"
+    decisions[packed] = "(P)"
+
+    packed_certainty = numpy.where(packed, code_antithesis / (file_size * 0.5), 0.0)
+
+    return decisions, packed_certainty, rules
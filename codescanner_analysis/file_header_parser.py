@@ -1,7 +1,18 @@
 import os
+import threading
+from collections import OrderedDict
 
+from codescanner_analysis import header_parser
 import codescanner_analysis.utils.file_utils as file_utils
 
+# marks parts of a HeaderInfo, which are not parsed yet (None is a valid file_header)
+_NOT_PARSED = object()
+
+# header infos of the most recently used files, see get_header_info()
+MAX_CACHED_HEADERS = 0x400
+_header_infos = OrderedDict()
+_header_infos_lock = threading.Lock()
+
 
 class FileHeaderParser(object):
     MAGIC_ELF_FILE_BYTES = bytearray(b'\x7F\x45\x4C\x46')
@@ -9,8 +20,14 @@ class FileHeaderParser(object):
 
     @staticmethod
     def get_file_header(file_src):
-        file_src = file_utils.sanitize_file_name(file_src)
+        return get_header_info(file_src).file_header
 
+    @staticmethod
+    def parse_magic(file_src):
+        '''
+        :param file_src: the (sanitized) source path of the file
+        :return: 'ELF', 'PE' or None
+        '''
         if os.path.getsize(file_src) < 4:
             return None
 
@@ -23,3 +40,80 @@ class FileHeaderParser(object):
             return 'PE'
         else:
             return None
+
+
+class HeaderInfo(object):
+    '''
+    Parsed header of a file, shared per process by CodescannerAnalysisData, ComparisonAnalysis and OverlayPlot,
+    see get_header_info().
+    Every part is parsed on first access only, and only once.
+    '''
+
+    def __init__(self, file_src):
+        '''
+        :param file_src: the (sanitized) source path of the file
+        '''
+        self.file_src = file_src
+        self._file_header = _NOT_PARSED
+        self._basic_info = None
+        self._lock = threading.Lock()
+
+    @property
+    def file_header(self):
+        '''
+        :return: 'ELF', 'PE' or None, see FileHeaderParser
+        '''
+        with self._lock:
+            if self._file_header is _NOT_PARSED:
+                self._file_header = FileHeaderParser.parse_magic(self.file_src)
+            return self._file_header
+
+    @property
+    def basic_info(self):
+        '''
+        :return: the libheaderparser result, see header_parser.get_basic_info()
+        '''
+        with self._lock:
+            if self._basic_info is None:
+                self._basic_info = header_parser.get_basic_info(self.file_src, 0, header_parser.FORCE_NONE)
+            return self._basic_info
+
+    def code_regions(self):
+        '''
+        :return: new dictionary of the executable regions of the header {name: [[start, end]]}
+        '''
+        regions = {}
+        for name, start, end in self.basic_info['regions']:
+            regions[name] = [[int(start), int(end)]]
+
+        return regions
+
+
+def get_header_info(file_src):
+    '''
+    HeaderInfo of a file, cached per process by file identity (device, inode, size, mtime),
+    a changed file gets a new HeaderInfo.
+
+    :param file_src: the source path of the file
+    :return: HeaderInfo
+    '''
+    file_src = file_utils.sanitize_file_name(file_src)
+    stat = os.stat(file_src)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    with _header_infos_lock:
+        info = _header_infos.get(key)
+        if info is None:
+            info = HeaderInfo(file_src)
+            _header_infos[key] = info
+            if len(_header_infos) > MAX_CACHED_HEADERS:
+                _header_infos.popitem(last=False)
+        else:
+            _header_infos.move_to_end(key)
+
+    return info
+
+
+def clear_header_infos():
+    with _header_infos_lock:
+        _header_infos.clear()
@@ -1,4 +1,6 @@
 import ctypes
+import os
+import threading
 
 HEADER_UNSUPPORTED = "unsupported"
 
@@ -26,38 +28,71 @@ class HeaderData(ctypes.Structure):
                 ]
 
 
+# process-wide handle of the library, loaded once by init() or on first use, see library()
 lib_header_parser = None
 lib_header_parser_src = None
+_init_lock = threading.Lock()
+
+
+def default_library_src():
+    """
+    :return: the path of the bundled libheaderparser.so
+    """
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'res/lib', 'libheaderparser.so')
+
+
+def library():
+    """
+    The process-wide headerparser library handle, the bundled library is loaded on first use.
+
+    :return: the ctypes library
+    """
+    lib = lib_header_parser
+    if lib is None:
+        lib = init(default_library_src())
+    return lib
 
 
 def init(src):
     """
-    Init the headerparser library
+    Init the headerparser library.
+    The library is loaded once per process, calling init again with the same source is a no-op.
 
     :param src: the source, where the lib is expected
-    :return:
+    :return: the ctypes library
     """
     global lib_header_parser
     global lib_header_parser_src
 
-    lib_header_parser_src = src
-    lib_header_parser = ctypes.CDLL(lib_header_parser_src)
+    with _init_lock:
+        if lib_header_parser is not None and lib_header_parser_src == src:
+            return lib_header_parser
+
+        lib = ctypes.CDLL(src)
+        _register_functions(lib)
+
+        lib_header_parser_src = src
+        lib_header_parser = lib
+
+    return lib
+
 
+def _register_functions(lib):
     # used in get_basic_info, no need to call it on its own
-    lib_header_parser.getBasicHeaderParserInfo.argtypes = [ctypes.c_char_p, ctypes.c_uint64, ctypes.c_uint8]
-    lib_header_parser.getBasicHeaderParserInfo.restype = ctypes.POINTER(HeaderData)
+    lib.getBasicHeaderParserInfo.argtypes = [ctypes.c_char_p, ctypes.c_uint64, ctypes.c_uint8]
+    lib.getBasicHeaderParserInfo.restype = ctypes.POINTER(HeaderData)
 
     # may be used to convert the data architecture/cpu id into a readable string
-    lib_header_parser.getHeaderDataArchitecture.argtypes = [ctypes.c_uint8]
-    lib_header_parser.getHeaderDataArchitecture.restype = ctypes.c_char_p
+    lib.getHeaderDataArchitecture.argtypes = [ctypes.c_uint8]
+    lib.getHeaderDataArchitecture.restype = ctypes.c_char_p
 
     # may be used to convert the header data id into a readable string
-    lib_header_parser.getHeaderDataHeaderType.argtypes = [ctypes.c_uint8]
-    lib_header_parser.getHeaderDataHeaderType.restype = ctypes.c_char_p
+    lib.getHeaderDataHeaderType.argtypes = [ctypes.c_uint8]
+    lib.getHeaderDataHeaderType.restype = ctypes.c_char_p
 
     # automatically called in get_basic_info
-    lib_header_parser.freeHeaderData.argtypes = [ctypes.POINTER(HeaderData)]
-    lib_header_parser.freeHeaderData.restype = None
+    lib.freeHeaderData.argtypes = [ctypes.POINTER(HeaderData)]
+    lib.freeHeaderData.restype = None
 
 
 def get_basic_info(file_src, start=0, force=0):
@@ -69,8 +104,9 @@ def get_basic_info(file_src, start=0, force=0):
     :param force: option force paramter, supporting FORCE_PE
     :return:
     """
+    lib = library()
     c_file_src = ctypes.c_char_p(file_src.encode("utf-8"))
-    raw_result = lib_header_parser.getBasicHeaderParserInfo(c_file_src, start, force)
+    raw_result = lib.getBasicHeaderParserInfo(c_file_src, start, force)
     if not raw_result:
         return get_initialized_hpd()
 
@@ -90,7 +126,7 @@ def get_basic_info(file_src, start=0, force=0):
         'regions_size': raw_result.contents.regions_size
     }
 
-    lib_header_parser.freeHeaderData(raw_result)
+    lib.freeHeaderData(raw_result)
 
     return result
 
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
-import sys,os
+import os
 import ctypes
+import hashlib
+import threading
+
+import numpy
+
+from codescanner_analysis.utils.file_utils import MemoryFile
 
 LITTLE_ENDIAN = 1
 BIG_ENDIAN = 2
 
 RESULT_DICT = 1
 RESULT_LIST = 2
+RESULT_NUMPY = 3
+
+# FromTo mirrors the 32-bit offsets of the core, greater offsets can not be passed to a single scan.
+# CodescanInterface scans larger files in windows.
+MAX_SCAN_OFFSET = 0xFFFFFFFF
 
 STATUS = {
             0: "STATUS_SUCCESS", 
@@ -18,6 +29,61 @@ STATUS = {
             6: "ERROR_UNSUPPORTED_OPERATION"
          }
 
+
+class CodescanError(Exception):
+    '''
+    Base class of all libcodescan errors. status is the core STATUS code, if any.
+    '''
+    status = None
+
+
+class CodescanLibraryError(CodescanError):
+    '''
+    libcodescan.so or its language files could not be loaded.
+    '''
+
+
+class CodescanFileError(CodescanError, IOError):
+    status = 1
+
+
+class CodescanEngineError(CodescanError):
+    status = 2
+
+
+class CodescanPathError(CodescanError):
+    status = 3
+
+
+class CodescanInputError(CodescanError, ValueError):
+    status = 4
+
+
+class CodescanOutOfMemoryError(CodescanError, MemoryError):
+    status = 5
+
+
+class CodescanUnsupportedOperationError(CodescanError):
+    status = 6
+
+
+STATUS_ERRORS = {
+            1: CodescanFileError,
+            2: CodescanEngineError,
+            3: CodescanPathError,
+            4: CodescanInputError,
+            5: CodescanOutOfMemoryError,
+            6: CodescanUnsupportedOperationError
+         }
+
+
+def _raise_for_status(status, message):
+    error_class = STATUS_ERRORS.get(status, CodescanError)
+    error = error_class("Core error '%s': %s" % (STATUS.get(status, status), message))
+    error.status = status
+    raise error
+
+
 class FromTo(ctypes.Structure):
     _fields_ = [("start", ctypes.c_uint32),  # from changed to start, cause it's a keyword in python
                 ("end", ctypes.c_uint32),  # to changed to end for convenience
@@ -27,6 +93,24 @@ class FromTo(ctypes.Structure):
                 ]
 
 
+# numpy view of the FromTo struct, used to read a whole result vector at once
+_FROM_TO_DTYPE = numpy.dtype({
+    'names': ['start', 'end', 'bitness', 'endianess', 'architecture'],
+    'formats': [numpy.uint32, numpy.uint32, numpy.uint32, numpy.uint32, numpy.uintp],
+    'offsets': [FromTo.start.offset, FromTo.end.offset, FromTo.bitness.offset, FromTo.endianess.offset,
+                FromTo.architecture.offset],
+    'itemsize': ctypes.sizeof(FromTo)
+})
+
+# RESULT_NUMPY region record. 'arch' indexes the interned architecture names (-1 = none), see architecture_name()
+REGION_DTYPE = numpy.dtype([('start', numpy.uint64),
+                            ('end', numpy.uint64),
+                            ('bitness', numpy.uint32),
+                            ('endianess', numpy.uint32),
+                            ('arch', numpy.int16)
+                            ])
+
+
 class CppStdVector(ctypes.Structure):
     _fields_ = [("data", ctypes.POINTER(FromTo)),
                 ("size", ctypes.c_size_t)
@@ -41,48 +125,127 @@ class CodescanOutput(ctypes.Structure):
                 ("coderegions", CppStdVector)
                 ]
 
+# interned architecture strings, the 'arch' field of REGION_DTYPE is an index into this list
+_architectures = []
+_architecture_ids = {}
+_architectures_lock = threading.Lock()
+
 # THE ansi c library (libcodescan.so)
+# Loaded once per process, see init()/reload()
 libcodescan = None
+_libcodescan_lock = threading.Lock()
+_library_version = None
+
 
 def init():
-    
+    '''
+    Load libcodescan.so and its language files, if not done yet in this process.
+    Thread-safe, further calls are cheap no-ops.
+    '''
+    if libcodescan is not None:
+        return
+
+    with _libcodescan_lock:
+        if libcodescan is None:
+            _load()
+
+
+def reload():
+    '''
+    Force loading libcodescan.so and its language files again, e.g. after the language files changed.
+    '''
+    global _library_version
+    with _libcodescan_lock:
+        _library_version = None
+        _load()
+
+
+def library_version():
+    '''
+    Digest of libcodescan.so and its language files.
+    It changes whenever an update of the core may change the scan results, e.g. to invalidate cached results.
+    Computed once per process (and again after reload()).
+    '''
+    global _library_version
+    if _library_version is not None:
+        return _library_version
+
+    lib_path = _library_directory()
+    lang_path = os.path.join(lib_path, 'languages')
+    paths = [os.path.join(lib_path, 'libcodescan.so')]
+    if os.path.isdir(lang_path):
+        paths += [os.path.join(lang_path, name) for name in sorted(os.listdir(lang_path))]
+
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    _library_version = digest.hexdigest()
+
+    return _library_version
+
+
+def _library_directory():
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'res/lib')
+
+
+def is_initialized():
+    return libcodescan is not None
+
+
+def _load():
     global libcodescan
-    selfDirectory = os.path.dirname(os.path.realpath(__file__))
-    libcodescan_path = os.path.join(selfDirectory, 'res/lib', 'libcodescan.so')
-    lang_path = os.path.join(selfDirectory, 'res/lib')
+    lang_path = _library_directory()
+    libcodescan_path = os.path.join(lang_path, 'libcodescan.so')
     
     try:
-        libcodescan = ctypes.CDLL(libcodescan_path)
-    except:
-        print("Loading libcodescan.so failed! Expected path: %s." % (libcodescan_path))
-        sys.exit()
+        lib = ctypes.CDLL(libcodescan_path)
+    except OSError as e:
+        raise CodescanLibraryError("Loading libcodescan.so failed! Expected path: %s. (%s)" % (libcodescan_path, e))
 
-    libcodescan.setLangPath.argtypes = [ctypes.c_char_p]
-    libcodescan.setLangPath.restype = ctypes.c_int
+    lib.setLangPath.argtypes = [ctypes.c_char_p]
+    lib.setLangPath.restype = ctypes.c_int
 
-    libcodescan.free_CodescanOutput.argtypes = [ctypes.c_void_p]
-    libcodescan.free_CodescanOutput.restype = None
+    lib.free_CodescanOutput.argtypes = [ctypes.c_void_p]
+    lib.free_CodescanOutput.restype = None
     
-    libcodescan.new_CodescanOutput.argtypes = [ctypes.c_char_p, ctypes.POINTER(FromTo), ctypes.c_void_p, ctypes.POINTER(CodescanOutput), ctypes.c_uint8]
-    libcodescan.new_CodescanOutput.restype = ctypes.c_int
+    lib.new_CodescanOutput.argtypes = [ctypes.c_char_p, ctypes.POINTER(FromTo), ctypes.c_void_p, ctypes.POINTER(CodescanOutput), ctypes.c_uint8]
+    lib.new_CodescanOutput.restype = ctypes.c_int
 
     c_lang_path = ctypes.c_char_p(lang_path.encode("utf-8"))
-    status = libcodescan.setLangPath(c_lang_path)
+    status = lib.setLangPath(c_lang_path)
     
     if (status != 0):
-        print("Core error %d (fatal): loading language files failed! Expected path: %s." % (status,lang_path))
-        sys.exit()
+        error = CodescanLibraryError("Core error %d: loading language files failed! Expected path: %s." % (status, lang_path))
+        error.status = status
+        raise error
+
+    # publish the handle only once it is completely set up
+    libcodescan = lib
 
 
 def scan(file_src, start=0, end=0, bool_aggressive=0, r_type=RESULT_DICT):
     
     if not (os.path.isfile(file_src)):
-        raise IOError("(scan:) File '%s' is not existent!" % (file_src) )
+        raise CodescanFileError("(scan:) File '%s' is not existent!" % (file_src) )
         
-    if ((os.path.getsize(file_src)) < 1):
-        raise IOError("(scan:) File '%s' is a NULL sized file!" % (file_src) )
+    file_size = os.path.getsize(file_src)
+    if (file_size < 1):
+        raise CodescanFileError("(scan:) File '%s' is a NULL sized file!" % (file_src) )
+
+    if start < 0 or end < 0 or start > MAX_SCAN_OFFSET or end > MAX_SCAN_OFFSET:
+        raise CodescanInputError("(scan:) Offsets 0x%x - 0x%x exceed the 32-bit range of a single scan!" % (start, end))
+
+    if end == 0 and file_size > MAX_SCAN_OFFSET:
+        raise CodescanInputError("(scan:) File '%s' exceeds the 32-bit range of a single scan!" % (file_src))
     
     # print("scan(%s, %d, %d)" % (file_src, start, end))
+
+    init()
     
     c_file_src = ctypes.c_char_p(file_src.encode("utf-8"))
     c_start = ctypes.c_uint32(start)
@@ -105,8 +268,7 @@ def scan(file_src, start=0, end=0, bool_aggressive=0, r_type=RESULT_DICT):
     if (status != 0):
         # If there is an error any data that has been allocated has already been freed.
         # Do not try to free it.
-        print("Core error '%s' (fatal): Codescan failed!" % (STATUS[status]))
-        sys.exit()
+        _raise_for_status(status, "Codescan of '%s' failed!" % (file_src))
 
     # print("success")
     # print(" - ascii")
@@ -146,12 +308,37 @@ def scan(file_src, start=0, end=0, bool_aggressive=0, r_type=RESULT_DICT):
         if c_output.zeroblock.size > 0:
             result["Zero"] = _convert_to_list(c_output.zeroblock, False)
 
+    elif r_type == RESULT_NUMPY:
+        if c_output.ascii.size > 0:
+            result["Ascii"] = _convert_to_numpy(c_output.ascii)
+        if c_output.genericData.size > 0:
+            result["Data"] = _convert_to_numpy(c_output.genericData)
+        if c_output.highEntropy.size > 0:
+            result["HighEntropy"] = _convert_to_numpy(c_output.highEntropy)
+        if c_output.coderegions.size > 0:
+            result["Code"] = _convert_to_numpy(c_output.coderegions)
+        if c_output.zeroblock.size > 0:
+            result["Zero"] = _convert_to_numpy(c_output.zeroblock)
+
     if raw_data_ptr:
         libcodescan.free_CodescanOutput(raw_data_ptr)
 
     return result
 
 
+def scan_buffer(buffer, start=0, end=0, bool_aggressive=0, r_type=RESULT_DICT):
+    '''
+    Scan bytes that only exist in memory (bytes, bytearray, memoryview or numpy array).
+    The offsets are relative to the beginning of the buffer.
+    '''
+
+    with MemoryFile(buffer) as memory_file:
+        if memory_file.size < 1:
+            raise CodescanFileError("(scan_buffer:) Buffer is NULL sized!")
+
+        return scan(memory_file.name, start, end, bool_aggressive, r_type)
+
+
 def _convert_to_dict(cs_region, is_code):
     if cs_region.size == 0:
         return ()
@@ -184,3 +371,55 @@ def _convert_to_list(cs_region, is_code):
         regions.append(r)
 
     return regions
+
+
+def _convert_to_numpy(cs_region):
+    regions = numpy.zeros(cs_region.size, dtype=REGION_DTYPE)
+    if cs_region.size == 0:
+        return regions
+
+    # view the vector's memory as it is, without touching the single elements
+    raw_size = cs_region.size * ctypes.sizeof(FromTo)
+    raw = (ctypes.c_char * raw_size).from_address(ctypes.addressof(cs_region.data.contents))
+    raw = numpy.frombuffer(raw, dtype=_FROM_TO_DTYPE)
+
+    regions['start'] = raw['start']
+    regions['end'] = raw['end']
+    regions['bitness'] = raw['bitness']
+    regions['endianess'] = raw['endianess']
+
+    # only one decode per distinct architecture string
+    pointers, inverse = numpy.unique(raw['architecture'], return_inverse=True)
+    arch_ids = numpy.array([_intern_architecture(p) for p in pointers], dtype=numpy.int16)
+    regions['arch'] = arch_ids[inverse]
+
+    return regions
+
+
+def _intern_architecture(pointer):
+    if not pointer:
+        return -1
+
+    name = ctypes.string_at(int(pointer)).decode("utf-8")
+
+    with _architectures_lock:
+        arch_id = _architecture_ids.get(name)
+        if arch_id is None:
+            arch_id = len(_architectures)
+            _architectures.append(name)
+            _architecture_ids[name] = arch_id
+
+    return arch_id
+
+
+def architecture_name(arch_id):
+    '''
+    Get the architecture string of a RESULT_NUMPY 'arch' id.
+
+    :param arch_id: the id
+    :return: the architecture string or None
+    '''
+    if arch_id < 0:
+        return None
+
+    return _architectures[arch_id]
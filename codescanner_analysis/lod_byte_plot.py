@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import numpy
+
+from codescanner_analysis.byte_summary import ByteSummary
+from codescanner_analysis.raster_byte_plot import RasterBytePlot
+
+
+class LodBytePlot(RasterBytePlot):
+    '''
+    Level of detail byteplot for large files, rendered from a ByteSummary instead of the bytes.
+
+    * every pixel column shows the byte value histogram of its bytes, the density is drawn as opacity
+    * a column gets the color of the area spec (PlotBase.AREAS) covering most of its bytes,
+      BASE_COLOR if most of its bytes are outside of regions
+    * rendering time and memory depend on the number of columns only, not on the file size;
+      with a given summary the file is not read at all
+    '''
+
+    def __init__(self, file_name, regions, summary=None):
+        '''
+        :param file_name: the file path
+        :param regions: the regions of the file
+        :param summary: optional ByteSummary of the plotted bytes, built from the file on demand otherwise
+        '''
+        super(LodBytePlot, self).__init__(file_name, regions)
+        self._summary = summary
+
+    def __del__(self):
+        self._summary = None
+        super(LodBytePlot, self).__del__()
+
+    def _render_image(self, width):
+        if self._summary is None:
+            self._summary = ByteSummary.from_file(self._file_name, self._offsets[0], self._offsets[1])
+
+        summary = self._summary.resample(width)
+
+        return summary.size, self._summary_image(summary)
+
+    def _summary_image(self, summary):
+        '''
+        :param summary: ByteSummary of the plotted bytes
+        :return: RGBA image, numpy uint8 array of shape (0x100, columns, 4), row 0 is byte value 0
+        '''
+        coverage = self._label_coverage(summary.column_bounds)
+        column_labels = numpy.argmax(coverage, axis=0)
+        density = summary.histograms.T
+
+        return self._colorize(numpy.broadcast_to(column_labels, density.shape), density)
@@ -1,17 +1,12 @@
 # -*- coding: utf-8 -*-
-import matplotlib
 import numpy
 import os
 from collections import namedtuple, defaultdict
 from matplotlib import patches
-
-matplotlib.use('agg')
-
-from matplotlib.pyplot import legend
 from matplotlib.ticker import MultipleLocator, FuncFormatter
-from pylab import xticks, figure, GridSpec
 
 from codescanner_analysis.byte_plot import BytePlot
+from codescanner_analysis.file_header_parser import get_header_info
 
 
 class OverlayPlot(BytePlot):
@@ -21,15 +16,17 @@ class OverlayPlot(BytePlot):
 
     FIG_SIZE = (16, 8)
 
-    def __init__(self, file_name, cs_regions, x_regions):
+    def __init__(self, file_name, cs_regions, x_regions=None):
         '''
         Plot codescan parsed cs_regions and underlay the plot with headerParser parsed executable x_regions.
 
         :param file_name: the binary file's name
         :param cs_regions: the codescanner regions
-        :param x_regions: the headerParser regions
+        :param x_regions: the headerParser regions, taken from the shared HeaderInfo of the file if None
         '''
         super(OverlayPlot, self).__init__(file_name, cs_regions)
+        if x_regions is None:
+            x_regions = get_header_info(file_name).code_regions()
         self._x_regions = x_regions
         self._x_area_specs = []
         self._fill_up_x_area_specs()
@@ -75,35 +72,36 @@ class OverlayPlot(BytePlot):
         for key in delete_keys:
             del self._x_regions[key]
 
-    def plot_to_buffer(self, dpi, fig_size=None):
+    def plot_to_buffer(self, dpi, fig_size=None, image_format='png', compression=None):
+        self._check_image_format(image_format, compression)
         if fig_size is None:
             fig_size = self.FIG_SIZE
 
-        return self._plot_to_buffer(dpi, fig_size)
+        return self._plot_to_buffer(dpi, fig_size, image_format, compression)
 
-    def _plot_to_buffer(self, dpi, fig_size):
+    def _plot_to_buffer(self, dpi, fig_size, image_format='png', compression=None):
         byte_array = self._get_byte_array()
-        byte_indices = numpy.arange(0, byte_array.size, dtype=numpy.uint32)
+        byte_indices = numpy.arange(0, byte_array.size, dtype=numpy.int64)
 
         byte_plot_row_span = self._calculate_byte_plot_row_span()
 
-        plot = figure(figsize=fig_size)
-        grid = GridSpec(3, 1, hspace=0.3, wspace=0.0)
+        plot = self._new_figure(fig_size)
+        grid = plot.add_gridspec(3, 1, hspace=0.3, wspace=0.0)
 
         byte_plot = plot.add_subplot(grid[0:byte_plot_row_span, :])
         self._generate_plot(byte_array, byte_indices, byte_plot)
 
-        legend(loc='upper right')
+        byte_plot.legend(loc='upper right')
 
         if byte_plot_row_span == 2:
             extending_x_plot = plot.add_subplot(grid[2:3, :])
             self._generate_extended_plot(extending_x_plot)
 
-            legend(loc='upper right')
+            extending_x_plot.legend(loc='upper right')
 
         plot.subplots_adjust(left=0.05, right=0.98, top=0.95, bottom=0.11, hspace=0.0)
 
-        return self._save_plot_to_buffer(plot, dpi)
+        return self._save_plot_to_buffer(plot, dpi, image_format, compression)
 
     def _calculate_byte_plot_row_span(self):
         if self._extending_x_regions:
@@ -114,8 +112,9 @@ class OverlayPlot(BytePlot):
         self._prepare_axes(subplot)
 
         subplot.plot(byte_indices, byte_array, '.', markerfacecolor='y', markeredgecolor='#323300')
-        for spec in self._area_specs:
-            self._plot_byte_regions(subplot, byte_array, byte_indices, spec)
+        byte_labels = self._region_labels(0, byte_array.size)
+        for label, spec in enumerate(self._area_specs):
+            self._plot_byte_regions(subplot, byte_array, byte_labels, label, spec)
 
         i = 0
         for spec in self._x_area_specs:
@@ -204,7 +203,7 @@ class OverlayPlot(BytePlot):
         subplot.set_xlabel('Byte location')
         subplot.set_ylabel('Byte value')
         # subplot.set_title('{} ({} kB)'.format(self._short_filename, round(1.0 * (self._file_size / 1024))))
-        xticks(rotation=315)
+        subplot.tick_params(axis='x', labelrotation=315)
 
     # def _add_labels(self, subplot):
     #     subplot.set_xlabel('Byte location')
@@ -2,20 +2,16 @@
 import copy
 import io
 import os
-import time
 import warnings
 from collections import namedtuple
 
-import matplotlib
+import numpy
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 import codescanner_analysis.utils.file_utils as file_utils
 from codescanner_analysis.codescan_interface import CodescanInterface
 
-matplotlib.use('agg')
-
-from matplotlib.pyplot import clf
-from pylab import savefig, close
-
 
 class PlotBase(object):
     # less than 2¹⁶ in each direction = 0x10000 * 0x10000 = 0x100000000
@@ -23,6 +19,15 @@ class PlotBase(object):
     DEFAULT_DPI = 72
     MIN_DPI = 10
 
+    # image formats of the plot methods, RGBA returns the pixels as numpy uint8 array of shape (height, width, 4)
+    RGBA = 'rgba'
+    IMAGE_FORMATS = ('png', 'webp', 'svg', RGBA)
+    # compression parameter of the encoders, see _save_plot_to_buffer()
+    COMPRESSION_OPTIONS = {'png': ('compress_level', 0, 9), 'webp': ('method', 0, 6)}
+    # entropy trace drawn over the plot, see set_entropy_trace()
+    ENTROPY_COLOR = '#d62728'
+    ENTROPY_LABEL = 'Entropy (bits per byte)'
+
     AreaSpec = namedtuple('AreaSpec', ['id', 'label', 'dot_color', 'line_color'])
     AREAS = [
         AreaSpec(id='Code', label='Code', dot_color='#00bfbf', line_color='#0022cc'),
@@ -38,12 +43,24 @@ class PlotBase(object):
         self._regions = copy.deepcopy(regions)
         self._area_specs = PlotBase.AREAS
         self._offsets = (0, 0)
+        self._figure = None
+        self._runs = None
+        self._entropy_trace = None
 
     def __del__(self):
+        self.close()
         self._regions = None
+        self._runs = None
+        self._entropy_trace = None
         self._area_specs = None
         self._offsets = None
 
+    def close(self):
+        '''
+        Release the figure of this plotter.
+        '''
+        self._figure = None
+
     def _set_file_attributes(self, file_name):
         file_name = file_utils.sanitize_file_name(file_name)
         self._file_size = os.path.getsize(file_name)
@@ -83,22 +100,159 @@ class PlotBase(object):
 
         self._area_specs[idx] = self._area_specs[idx]._replace(label=value)
 
-    def plot_to_file(self, file_name, dpi, fig_size=None):
+    def set_entropy_trace(self, trace):
+        '''
+        Draw a sliding window entropy curve over the plot, on a second y axis.
+
+        :param trace: EntropyTrace of the plotted bytes, None to draw no curve
+        '''
+        self._entropy_trace = trace
+
+    def _plot_entropy_trace(self, ax, trace, columns):
+        '''
+        Draw the envelope (range of the windows of a pixel column) and the mean entropy of a trace.
+
+        :param ax: the axes to draw into, its y axis has to span 0 to EntropyTrace.MAX_ENTROPY
+        :param trace: the EntropyTrace, offsets are relative to the start offset of the plot
+        :param columns: the maximum number of points, usually the width of the axes in pixels
+        :return: the line of the mean entropy
+        '''
+        centers, minimum, mean, maximum = trace.envelope(max(1, int(columns)))
+        centers = centers - self._offsets[0]
+
+        ax.fill_between(centers, minimum, maximum, color=self.ENTROPY_COLOR, alpha=0.3, linewidth=0)
+        line, = ax.plot(centers, mean, color=self.ENTROPY_COLOR, linewidth=1.0, label='Entropy')
+
+        return line
+
+    def _plot_entropy_overlay(self, ax):
+        '''
+        Draw the trace of set_entropy_trace() on a twin axes of ax, if there is one.
+        '''
+        if self._entropy_trace is None:
+            return
+
+        trace_ax = ax.twinx()
+        trace_ax.set_ylim(0, self._entropy_trace.MAX_ENTROPY)
+        trace_ax.set_ylabel(self.ENTROPY_LABEL)
+        self._plot_entropy_trace(trace_ax, self._entropy_trace, ax.get_window_extent().width)
+
+    def _region_runs(self):
+        '''
+        Flatten the regions to runs of area spec indices (index into _area_specs), ordered by offset.
+        Gaps between regions, as well as regions without area spec, are runs of -1.
+        The last run reaches to the maximum offset.
+
+        :return: (bounds, labels) numpy arrays, run i is [bounds[i], bounds[i + 1])
+        '''
+        if self._runs is None:
+            self._runs = self._build_region_runs()
+
+        return self._runs
+
+    def _build_region_runs(self):
+        spec_ids = {spec.id: i for i, spec in enumerate(self._area_specs)}
+        keys = [k for k in self._regions if k in spec_ids and self._regions[k]]
+
+        starts = numpy.array([r[0] for k in keys for r in self._regions[k]], dtype=numpy.int64)
+        ends = numpy.array([r[1] for k in keys for r in self._regions[k]], dtype=numpy.int64)
+        labels = numpy.repeat(numpy.array([spec_ids[k] for k in keys], dtype=numpy.int8),
+                              [len(self._regions[k]) for k in keys])
+
+        order = numpy.lexsort((labels, ends, starts))
+        starts, ends, labels = starts[order], ends[order], labels[order]
+
+        # overlapping regions: the first one wins, it is clipped to the end of all regions before
+        # (empty regions are skipped and do not count)
+        previous_ends = numpy.maximum.accumulate(numpy.concatenate(([0], numpy.where(ends > starts, ends, 0))))
+        starts = numpy.maximum(starts, previous_ends[:-1])
+        kept = ends > starts
+        starts, ends, labels, previous_ends = starts[kept], ends[kept], labels[kept], previous_ends[:-1][kept]
+
+        # every region is preceded by a gap run (-1), which is dropped, if it is empty
+        run_starts = numpy.empty(2 * len(starts), dtype=numpy.int64)
+        run_starts[0::2] = previous_ends
+        run_starts[1::2] = starts
+        run_labels = numpy.empty(2 * len(starts), dtype=numpy.int8)
+        run_labels[0::2] = -1
+        run_labels[1::2] = labels
+        non_empty = numpy.ones(2 * len(starts), dtype=bool)
+        non_empty[0::2] = starts > previous_ends
+
+        last_end = ends[-1] if len(ends) else 0
+        bounds = numpy.concatenate((run_starts[non_empty], [last_end, numpy.iinfo(numpy.int64).max]))
+        labels = numpy.concatenate((run_labels[non_empty], [-1])).astype(numpy.int8)
+
+        return bounds, labels
+
+    def _label_coverage(self, column_bounds):
+        '''
+        Number of bytes of every label in every column, label 0 is outside of regions, label i + 1 the area spec i.
+
+        :param column_bounds: numpy int64 array of columns + 1 offsets
+        :return: numpy int64 array of shape (labels, columns)
+        '''
+        bounds, labels = self._region_runs()
+        n_labels = len(self._area_specs) + 1
+        labels = labels.astype(numpy.intp) + 1
+
+        # covered[l, r]: bytes of label l before run r
+        lengths = numpy.zeros((n_labels, len(labels)), dtype=numpy.int64)
+        lengths[labels, numpy.arange(len(labels))] = numpy.diff(bounds)
+        covered = numpy.zeros((n_labels, len(labels) + 1), dtype=numpy.int64)
+        numpy.cumsum(lengths[:, :-1], axis=1, out=covered[:, 1:-1])
+
+        # bytes of label l before offset x: covered[l, r] + (x - bounds[r]) if run r holds x and has label l
+        runs = numpy.searchsorted(bounds, column_bounds, 'right') - 1
+        before = covered[:, runs]
+        before[labels[runs], numpy.arange(len(runs))] += column_bounds - bounds[runs]
+
+        return numpy.diff(before, axis=1)
+
+    def _share_regions(self, plotter):
+        '''
+        Use the regions and region runs of another plotter of the same file, instead of copying them again.
+        Plotters do not modify their regions.
+
+        :param plotter: the other plotter
+        '''
+        self._regions = plotter._regions
+        self._runs = plotter._region_runs()
+
+    def _region_labels(self, start, stop, runs=None):
+        '''
+        Area spec index of every byte offset in [start, stop), -1 outside of regions.
+        Built in linear time by repeating the run labels, see _region_runs().
+
+        :param start: first offset
+        :param stop: end offset, exclusive
+        :param runs: the result of _region_runs(), if already known
+        :return: numpy int8 array of size stop - start
+        '''
+        bounds, labels = runs if runs is not None else self._region_runs()
+
+        return numpy.repeat(labels, numpy.diff(numpy.clip(bounds, start, stop)))
+
+    def plot_to_file(self, file_name, dpi, fig_size=None, image_format=None, compression=None):
         '''
         Plot to a file.
 
         :param file_name: the image file name
         :param dpi: the desired dpi resolution
         :param fig_size: fig_size ratio
+        :param image_format: one of IMAGE_FORMATS, by default the extension of file_name (.npy for RGBA) or png
+        :param compression: optional compression level, see _save_plot_to_buffer()
         :return:
         '''
         file_name = file_utils.sanitize_file_name(file_name, False)
+        if image_format is None:
+            image_format = self._image_format_of(file_name)
 
-        b = self.plot_to_buffer(dpi, fig_size)
-        if b != '':
+        b = self.plot_to_buffer(dpi, fig_size, image_format, compression)
+        if not isinstance(b, str):  # '': nothing to plot
             self._write_image(b, file_name)
 
-    def plot_to_dynamic_size_file(self, file_name, dpi, width, height):
+    def plot_to_dynamic_size_file(self, file_name, dpi, width, height, image_format=None, compression=None):
         '''
         Plot to a file with dynamic width and height
 
@@ -106,47 +260,141 @@ class PlotBase(object):
         :param dpi: the desired dpi resolution
         :param width: the desired width
         :param height: the desired height
+        :param image_format: one of IMAGE_FORMATS, by default the extension of file_name (.npy for RGBA) or png
+        :param compression: optional compression level, see _save_plot_to_buffer()
         :return:
         '''
 
         file_name = file_utils.sanitize_file_name(file_name, False)
+        if image_format is None:
+            image_format = self._image_format_of(file_name)
 
-        b = self.plot_to_dynamic_size_buffer(dpi, width, height)
-        if b != '':
+        b = self.plot_to_dynamic_size_buffer(dpi, width, height, image_format, compression)
+        if not isinstance(b, str):  # '': nothing to plot
             self._write_image(b, file_name)
 
+    def render(self, dpi, size=None, file_name=None, image_format=None, compression=None):
+        '''
+        Plot one image, see CodescannerAnalysisData.render_all().
+
+        :param dpi: the desired dpi resolution
+        :param size: None for the fixed figure size, otherwise the (width, height) of plot_to_dynamic_size_buffer()
+        :param file_name: None to return the image, otherwise the image is written to that file
+        :param image_format: one of IMAGE_FORMATS, by default the extension of file_name (.npy for RGBA) or png
+        :param compression: optional compression level, see _save_plot_to_buffer()
+        :return: the image (see plot_to_buffer()), None if written to a file
+        '''
+        if file_name is not None:
+            file_name = file_utils.sanitize_file_name(file_name, False)
+        if image_format is None:
+            image_format = 'png' if file_name is None else self._image_format_of(file_name)
+
+        if size is None:
+            image = self.plot_to_buffer(dpi, None, image_format, compression)
+        else:
+            image = self.plot_to_dynamic_size_buffer(dpi, size[0], size[1], image_format, compression)
+
+        if file_name is None:
+            return image
+
+        if not isinstance(image, str):  # '': nothing to plot
+            self._write_image(image, file_name)
+
+    @classmethod
+    def _image_format_of(cls, file_name):
+        extension = os.path.splitext(file_name)[1][1:].lower()
+        if extension == 'npy':
+            return cls.RGBA
+
+        return extension if extension in cls.IMAGE_FORMATS else 'png'
+
+    @classmethod
+    def _check_image_format(cls, image_format, compression=None):
+        if image_format not in cls.IMAGE_FORMATS:
+            raise ValueError("Not supported image format '%s'!" % image_format)
+        if compression is None:
+            return
+
+        option = cls.COMPRESSION_OPTIONS.get(image_format)
+        if option is None:
+            raise ValueError("Image format '%s' has no compression level!" % image_format)
+        if not option[1] <= compression <= option[2]:
+            raise ValueError("Compression level of %s must be in [%d, %d]!" % (image_format, option[1], option[2]))
+
     def _determine_resolution(self, filesize):
-        tik = filesize
-        resolution = 0x100
-        if filesize > 0x100:
-            while tik > 50:
-                tik = filesize / resolution
-                resolution += 0x100
+        '''
+        Tick step: the smallest multiple of 0x100 giving at most 50 ticks, plus 0x100.
+        (Closed form, so multi-gigabyte files do not loop for every 0x100 step.)
+        '''
+        if filesize <= 0x100:
+            return 0x100
+
+        steps = max(1, -(-filesize // (50 * 0x100)))
 
-        return resolution
+        return (steps + 1) * 0x100
+
+    def _new_figure(self, fig_size):
+        '''
+        Get an empty figure for the next plot.
+        Each plotter owns one figure with its own Agg canvas, independent of the global pyplot state.
+        Both are created once and reused by further plots.
+
+        :param fig_size: the size of the figure in inches
+        :return: the figure
+        '''
+        if self._figure is None:
+            self._figure = Figure(figsize=fig_size)
+            FigureCanvasAgg(self._figure)
+        else:
+            self._figure.clear()
+            self._figure.set_size_inches(fig_size)
 
-    def _save_plot_to_buffer(self, plot, dpi):
+        return self._figure
+
+    def _save_plot_to_buffer(self, plot, dpi, image_format='png', compression=None):
+        '''
+        Encode the figure, only the requested encoding is done.
+
+        :param plot: the figure
+        :param dpi: the dpi resolution
+        :param image_format: one of IMAGE_FORMATS
+        :param compression: optional compression level: zlib level (0-9) of png, encoder effort (0-6) of webp
+        :return: the image bytes, a numpy uint8 array of shape (height, width, 4) for RGBA
+        '''
         warnings.filterwarnings('ignore', module='matplotlib')
-        output_buffer = io.BytesIO()
-        savefig(output_buffer, dpi=dpi, format='png')
 
-        raw_output = output_buffer.getvalue()
-        output_buffer.close()
+        if image_format == self.RGBA:
+            plot.set_dpi(dpi)
+            plot.canvas.draw()
+            raw_output = numpy.array(plot.canvas.buffer_rgba())
+        else:
+            kwargs = {}
+            if compression is not None:
+                kwargs['pil_kwargs'] = {self.COMPRESSION_OPTIONS[image_format][0]: compression}
 
-        clf()
-        close(plot)
+            output_buffer = io.BytesIO()
+            plot.savefig(output_buffer, dpi=dpi, format=image_format, **kwargs)
 
-        time.sleep(0.5)
+            raw_output = output_buffer.getvalue()
+            output_buffer.close()
+
+        # release all artists now, the figure and its canvas are kept for the next plot
+        plot.clear()
 
         return raw_output
 
     def _write_image(self, image_bytes, file_name):
         '''
-        Write raw image bytes to a file.
+        Write raw image bytes to a file, RGBA arrays are saved as .npy.
 
         :param image_bytes: the image bytes
         :param file_name: the full file path of the resulting image
         '''
+        if isinstance(image_bytes, numpy.ndarray):
+            with open(file_name, 'wb') as f:
+                numpy.save(f, image_bytes, allow_pickle=False)
+            return
+
         f = open(file_name, 'wb')
         f.write(image_bytes)
         f.close()
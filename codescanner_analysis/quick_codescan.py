@@ -71,7 +71,7 @@ if __name__=="__main__":
     pngname1 = "%s_byteplot.png" % (finame_template)
     pngname2 = "%s_colormap.png" % (finame_template)
         
-    cad.plot_to_file(os.path.join(RESULTFOLDER,pngname1), 150, 1)
-    cad.plot_to_file(os.path.join(RESULTFOLDER,pngname2), 150, 2)
+    cad.render_all([(cad.BYTE_PLOT, 150, None, os.path.join(RESULTFOLDER,pngname1)),
+                    (cad.COLOR_MAP, 150, None, os.path.join(RESULTFOLDER,pngname2))])
     
     sys.exit()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import numpy
+from matplotlib.colors import to_rgba
+from matplotlib.lines import Line2D
+
+from codescanner_analysis.byte_plot import BytePlot
+
+
+class RasterBytePlot(BytePlot):
+    '''
+    Byteplot (byte offset vs. byte value), rendered straight into a numpy RGBA image
+    instead of one matplotlib marker per byte.
+
+    * bytes are binned into the pixel columns of the axes, each column is counted on its own,
+      so memory does not grow with the file size
+    * every pixel gets the color of the area spec (PlotBase.AREAS) of its bytes,
+      BASE_COLOR outside of regions; if a pixel holds bytes of several areas, the later spec wins,
+      like the drawing order of BytePlot
+    * the number of bytes per pixel (density) is drawn as opacity
+    * matplotlib only draws the axes, region bounds, labels and legend
+    '''
+    BASE_COLOR = 'y'
+    BASE_LINE_COLOR = '#323300'
+    # opacity of a pixel holding a single byte, the densest pixel is opaque
+    MIN_ALPHA = 0.35
+    # columns holding more regions are labelled byte by byte instead of counted region by region
+    MAX_RUNS_PER_COLUMN = 8
+    # minimum distance of code region labels in pixels
+    MIN_LABEL_DISTANCE = 80
+
+    def _plot_to_buffer(self, dpi, fig_size, image_format='png', compression=None):
+        plot = self._new_figure(fig_size)
+        plot.set_dpi(dpi)
+        subplot = plot.add_subplot(111)
+        self._prepare_axes(subplot)
+        self._add_labels(subplot)
+        self._plot_entropy_overlay(subplot)
+        plot.tight_layout()
+
+        # the size of the axes in pixels is known after the layout
+        width = max(1, int(subplot.get_window_extent().width))
+        size, image = self._render_image(width)
+
+        subplot.imshow(image, extent=(0, size, 0, 0x100), origin='lower', aspect='auto',
+                       interpolation='nearest')
+        self._prepare_axes(subplot)
+        for spec in self._area_specs:
+            self._plot_region_bounds(subplot, spec)
+
+        # large files may have thousands of code regions, labels closer than MIN_LABEL_DISTANCE pixels are skipped
+        label_distance = self.MIN_LABEL_DISTANCE * size / float(width)
+        last_label = -label_distance
+        for cr in self._regions.get("Code") or []:
+            if cr[0] - last_label >= label_distance:
+                self._plot_cr_label(subplot, cr)
+                last_label = cr[0]
+
+        subplot.legend(handles=self._legend_handles(), loc='upper right')
+
+        return self._save_plot_to_buffer(plot, dpi, image_format, compression)
+
+    def _render_image(self, width):
+        '''
+        :param width: the maximum number of pixel columns
+        :return: number of plotted bytes, RGBA image (see _rasterize())
+        '''
+        byte_array = self._get_byte_array()
+
+        return byte_array.size, self._rasterize(byte_array, width)
+
+    def _rasterize(self, byte_array, width):
+        '''
+        Bin the bytes into an image of 0x100 rows (byte values) and at most width columns.
+        Every pixel column holds a contiguous range of bytes, which is counted by one bincount.
+        A column with few regions is counted region by region,
+        only columns with many regions need a label per byte.
+
+        :param byte_array: the bytes to plot
+        :param width: the maximum number of pixel columns
+        :return: RGBA image, numpy uint8 array of shape (0x100, columns, 4), row 0 is byte value 0
+        '''
+        size = byte_array.size
+        columns = max(1, min(width, size))
+        n_labels = len(self._area_specs) + 1
+
+        # bytes [column_bounds[i], column_bounds[i + 1]) are binned into column i
+        column_bounds = numpy.arange(columns + 1, dtype=numpy.int64) * size // columns
+        runs = self._region_runs()
+        bounds, labels = runs
+        first_runs = numpy.searchsorted(bounds, column_bounds[:-1], 'right') - 1
+        last_runs = numpy.searchsorted(bounds, column_bounds[1:], 'left') - 1
+
+        # label 0 is the base color, label i + 1 the area spec i
+        counts = numpy.zeros((columns, n_labels, 0x100), dtype=numpy.int64)
+
+        for i in range(columns):
+            start = column_bounds[i]
+            stop = column_bounds[i + 1]
+            if last_runs[i] - first_runs[i] < self.MAX_RUNS_PER_COLUMN:
+                for r in range(first_runs[i], last_runs[i] + 1):
+                    piece = byte_array[max(start, bounds[r]):min(stop, bounds[r + 1])]
+                    counts[i, labels[r] + 1] += numpy.bincount(piece, minlength=0x100)
+            else:
+                label = self._region_labels(start, stop, runs).astype(numpy.intp) + 1
+                counts[i] = numpy.bincount(label * 0x100 + byte_array[start:stop],
+                                           minlength=n_labels * 0x100).reshape(n_labels, 0x100)
+
+        counts = counts.transpose(1, 2, 0)
+        density = counts.sum(axis=0)
+        top_label = n_labels - 1 - numpy.argmax(counts[::-1] > 0, axis=0)
+
+        return self._colorize(top_label, density)
+
+    def _colorize(self, labels, density):
+        '''
+        :param labels: label of every pixel, 0 is the base color, i + 1 the area spec i
+        :param density: number of bytes of every pixel
+        :return: RGBA image, numpy uint8 array
+        '''
+        colors = [self.BASE_COLOR] + [spec.dot_color for spec in self._area_specs]
+        palette = numpy.array([to_rgba(c) for c in colors], dtype=numpy.float64)
+        image = palette[labels]
+
+        alpha = numpy.log1p(density) / numpy.log1p(max(1, density.max()))
+        image[..., 3] = numpy.where(density > 0, self.MIN_ALPHA + (1 - self.MIN_ALPHA) * alpha, 0)
+
+        return (image * 0xff).round().astype(numpy.uint8)
+
+    def _legend_handles(self):
+        handles = [Line2D([], [], linestyle='none', marker='.', markerfacecolor=spec.dot_color,
+                          markeredgecolor=spec.line_color, label=spec.label)
+                   for spec in self._area_specs if self._regions.get(spec.id)]
+
+        return handles
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import marshal
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from codescanner_analysis import header_parser, libcodescanpy
+from codescanner_analysis.utils import file_utils
+
+
+class ResultCache(object):
+    '''
+    Persistent cache of analysis results, keyed by the content of the file and the scan options.
+
+    * the same binary under different names is scanned once
+    * stored in a single SQLite file, the results are marshalled and compressed
+    * size-bounded, least recently used results are evicted first
+    * keys contain the versions of libcodescan.so, its language files and libheaderparser.so,
+      so updating the core invalidates older results
+    * arbitrary bytes derived from a file can be stored next to its results, see put_bytes()
+    * safe to share between processes; a ResultCache can be pickled, it reconnects lazily
+    '''
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+    # bump, if the layout of the stored results or the decision logic changes
+    FORMAT_VERSION = 2
+
+    # decision_detail is stored as plain tuple, see extended_analysis.DecisionResult
+    FIELDS = ('regions', 'sizes', 'decision', 'architecture', 'file_header', 'decision_detail')
+
+    _header_parser_version = None
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        '''
+        :param path: path of the SQLite database file, created if it does not exist
+        :param max_size: maximum size of all stored results in bytes
+        '''
+        self._connection = None
+        if max_size < 1:
+            raise ValueError("Maximum cache size must be at least 1!")
+
+        self.path = os.path.expanduser(path)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'path': self.path, 'max_size': self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['max_size'])
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def key(self, file_name, start=0, end=0, aggressive=0, *options):
+        '''
+        Build the cache key of a file.
+
+        :param file_name: the file path, its content is hashed
+        :param start: start offset of the codescanner (s= parameter)
+        :param end: end offset of the codescanner (e= parameter)
+        :param aggressive: affects code region search (a= parameter)
+        :param options: further options affecting the results
+        :return: key string
+        '''
+        parameters = (self.FORMAT_VERSION, self._library_versions(), file_utils.file_digest(file_name),
+                      start, end, aggressive) + options
+
+        return hashlib.sha256(repr(parameters).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        '''
+        :param key: see key()
+        :return: dict with the FIELDS, or None if not cached
+        '''
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+
+        return dict(zip(self.FIELDS, marshal.loads(zlib.decompress(data))))
+
+    def put(self, key, result):
+        '''
+        Store a result and evict least recently used results exceeding max_size.
+
+        :param key: see key()
+        :param result: dict with the FIELDS
+        '''
+        # marshal does not take namedtuples
+        values = tuple(tuple(v) if isinstance(v, tuple) else v for v in (result[field] for field in self.FIELDS))
+        self.put_bytes(key, zlib.compress(marshal.dumps(values)))
+
+    def get_bytes(self, key):
+        '''
+        :param key: see key()
+        :return: the stored bytes, or None if not cached
+        '''
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+
+        return bytes(row[0])
+
+    def put_bytes(self, key, data):
+        '''
+        Store arbitrary bytes next to the results (e.g. a ByteSummary), they are evicted like results.
+
+        :param key: see key(), derived keys should add an option naming the kind of data
+        :param data: bytes
+        '''
+        if len(data) > self.max_size:
+            return
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO results (key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                               (key, sqlite3.Binary(data), len(data), time.time()))
+            self._evict(connection)
+            connection.commit()
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM results")
+            connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results "
+                               "(key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            connection.commit()
+            self._connection = connection
+
+        return self._connection
+
+    def _evict(self, connection):
+        excess = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0] - self.max_size
+        if excess <= 0:
+            return
+
+        evicted = []
+        for key, size in connection.execute("SELECT key, size FROM results ORDER BY last_used"):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+        connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    @classmethod
+    def _library_versions(cls):
+        if cls._header_parser_version is None:
+            path = header_parser.default_library_src()
+            cls._header_parser_version = file_utils.file_digest(path) if os.path.isfile(path) else ''
+
+        return libcodescanpy.library_version(), cls._header_parser_version
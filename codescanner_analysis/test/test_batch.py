@@ -0,0 +1,119 @@
+import functools
+import multiprocessing
+import os
+import time
+import unittest
+from tempfile import TemporaryDirectory
+
+from _pytest.monkeypatch import MonkeyPatch
+
+from codescanner_analysis import batch
+from codescanner_analysis import CodescannerAnalysisData
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self.test_file = os.path.join(self.test_file_dir, 'testfile')
+        self.test_medium_binary_src = os.path.join(self.test_file_dir, 'testfile-med')
+
+    def test_iter_files(self):
+        with TemporaryDirectory() as temp_dir:
+            deep_dir = os.path.join(temp_dir, 'a', 'b', 'c', 'd', 'e', 'f')
+            os.makedirs(deep_dir)
+            deep_file = os.path.join(deep_dir, 'deep.bin')
+            top_file = os.path.join(temp_dir, 'top.bin')
+            for f in [deep_file, top_file]:
+                with open(f, 'wb') as fp:
+                    fp.write(b'\x00')
+
+            assert sorted(batch.iter_files(temp_dir)) == sorted([deep_file, top_file])
+            assert list(batch.iter_files(top_file)) == [top_file]
+            assert list(batch.iter_files([top_file, deep_file])) == [top_file, deep_file]
+
+    def test_analyze_directory(self):
+        results = {r.path: r for r in batch.analyze(self.test_file_dir, processes=2)}
+
+        assert sorted(results) == [self.test_file, self.test_medium_binary_src]
+
+        for path in results:
+            cad = CodescannerAnalysisData(path)
+            assert results[path].error is None
+            assert results[path].regions == cad.regions
+            assert results[path].sizes == cad.sizes
+            assert results[path].decision == cad.decision
+            assert results[path].decision_detail == cad.decision_detail
+            assert results[path].file_header == cad.file_header
+
+    def test_failure_isolation(self):
+        paths = [self.test_file, 'not.existi.ng', self.test_medium_binary_src]
+        results = {r.path: r for r in batch.analyze(paths, processes=1)}
+
+        assert sorted(results) == sorted(paths)
+        assert results['not.existi.ng'].error.startswith('OSError')
+        assert results['not.existi.ng'].regions is None
+        assert results[self.test_file].error is None
+        assert results[self.test_medium_binary_src].error is None
+
+    def test_timeout(self):
+        analyze_file = batch._analyze_file
+
+        def hanging_analyze_file(path, *args):
+            if path == self.test_medium_binary_src:
+                time.sleep(60)
+            return analyze_file(path, *args)
+
+        monkeypatch = MonkeyPatch()
+        # forked workers inherit the patched module
+        monkeypatch.setattr(batch, '_analyze_file', hanging_analyze_file)
+        try:
+            analyzer = batch.BatchAnalyzer(processes=1, timeout=1)
+            analyzer._context = multiprocessing.get_context('fork')
+
+            started = time.monotonic()
+            results = list(analyzer.run([self.test_medium_binary_src, self.test_file]))
+        finally:
+            monkeypatch.undo()
+
+        # the hanging worker is replaced, the next file is analysed by its successor
+        assert [r.path for r in results] == [self.test_medium_binary_src, self.test_file]
+        assert results[0].error.startswith('TimeoutError')
+        assert results[0].decision is None
+        assert results[1].error is None
+        assert results[1].decision == CodescannerAnalysisData(self.test_file).decision
+        assert time.monotonic() - started < 30
+
+    def test_max_size(self):
+        results = {r.path: r for r in batch.analyze([self.test_file, self.test_medium_binary_src], processes=1,
+                                                    max_size=0x10000)}
+
+        # only the bigger file is clamped
+        assert results[self.test_file].sizes == CodescannerAnalysisData(self.test_file).sizes
+        assert results[self.test_medium_binary_src].sizes['FileSize'] == 0x10000
+        assert results[self.test_medium_binary_src].regions == \
+            CodescannerAnalysisData(self.test_medium_binary_src, 0, 0x10000).regions
+
+    def test_file_callback(self):
+        with TemporaryDirectory() as temp_dir:
+            callback = functools.partial(_write_decision, temp_dir)
+            results = {r.path: r for r in batch.analyze([self.test_file, 'not.existi.ng'], processes=1,
+                                                        file_callback=callback)}
+
+            assert results[self.test_file].error is None
+            assert results['not.existi.ng'].error.startswith('OSError')
+            assert os.listdir(temp_dir) == ['testfile']
+            with open(os.path.join(temp_dir, 'testfile')) as f:
+                assert f.read() == results[self.test_file].decision
+
+            results = list(batch.analyze(self.test_file, processes=1, file_callback=_fail))
+            assert results[0].error == 'RuntimeError: callback failed'
+
+
+def _write_decision(directory, cad):
+    with open(os.path.join(directory, os.path.basename(cad.file_path)), 'w') as f:
+        f.write(cad.decision)
+
+
+def _fail(cad):
+    raise RuntimeError('callback failed')
@@ -6,9 +6,12 @@ import unittest
 from collections import defaultdict
 from collections import namedtuple
 
+import numpy
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
+from matplotlib.figure import Figure
 
+import codescanner_analysis.utils.file_utils as file_utils
 from codescanner_analysis.byte_plot import BytePlot
 from codescanner_analysis.plot_base import PlotBase
 from codescanner_analysis.test import helper
@@ -63,7 +66,7 @@ class BytePlotTest(unittest.TestCase):
 
     def test_plot_to_buffer_with_numpy_exception(self):
         monkeypatch = MonkeyPatch()
-        monkeypatch.setattr('numpy.fromfile', lambda filepath, dtype: None)
+        monkeypatch.setattr(file_utils, 'map_bytes', lambda *args: None)
 
         regions = self._extract_test_binary_regions()
         byte_plot = BytePlot(self._test_binary_src, regions)
@@ -98,6 +101,26 @@ class BytePlotTest(unittest.TestCase):
 
         os.remove(bin_src)
 
+    def test_plot_byte_regions_per_area(self):
+        size = 0x4000
+        dense_regions = helper.create_dense_regions(size)
+        byte_array = numpy.frombuffer(numpy.random.bytes(size), dtype=numpy.uint8)
+        byte_plot = BytePlot(self._test_binary_src, dense_regions)
+        byte_plot._area_specs = self._specs
+        subplot = Figure().add_subplot(111)
+
+        byte_plot._generate_plot(byte_array, numpy.arange(size), subplot)
+
+        # the bytes and one plot per area, the bounds of an area are one LineCollection
+        assert len(subplot.lines) == 1 + len(self._specs)
+        assert len(subplot.collections) == len(self._specs)
+        for spec, line in zip(self._specs, subplot.lines[1:]):
+            x = line.get_xdata()
+            expected = [i for r in dense_regions[spec.id] for i in range(r[0], r[1])]
+            assert line.get_label() == spec.label
+            assert x.tolist() == expected
+            assert line.get_ydata().tolist() == byte_array[x].tolist()
+
     def test_plot_small_file(self):
         temp_dir = tempfile.gettempdir()
         bin_src = os.path.join(temp_dir, 'IPT-test_plot_small_file.bin')
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+
+import numpy
+import pytest
+
+from codescanner_analysis import ByteSummary
+
+
+class ByteSummaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self._test_binary_src = os.path.join(self._test_file_dir, 'testfile')
+
+    def test_from_array(self):
+        byte_array = numpy.zeros(0x300, dtype=numpy.uint8)
+        byte_array[0x100:0x200] = numpy.arange(0x100)
+        byte_array[0x280] = 0x42
+
+        summary = ByteSummary.from_array(byte_array, 3)
+
+        assert summary.size == 0x300
+        assert summary.column_bounds.tolist() == [0, 0x100, 0x200, 0x300]
+        assert summary.histograms[0, 0] == 0x100
+        assert (summary.histograms[1] == 1).all()
+        assert summary.histograms[2, 0x42] == 1
+        assert summary.minimum.tolist() == [0, 0, 0]
+        assert summary.maximum.tolist() == [0, 0xff, 0x42]
+
+        # fewer bytes than columns: a column per byte
+        assert ByteSummary.from_array(byte_array[:5], 10).columns == 5
+
+        with pytest.raises(ValueError):
+            ByteSummary.from_array(byte_array, 0)
+
+    def test_from_file(self):
+        expected = numpy.fromfile(self._test_binary_src, dtype=numpy.uint8)[0x100:0x4100]
+
+        summary = ByteSummary.from_file(self._test_binary_src, 0x100, 0x4100, 0x40)
+
+        assert summary.size == 0x4000
+        assert summary.columns == 0x40
+        assert summary.histograms.sum() == 0x4000
+        assert summary.histograms[7].tolist() == numpy.bincount(expected[0x700:0x800], minlength=0x100).tolist()
+
+    def test_resample(self):
+        byte_array = numpy.frombuffer(numpy.random.bytes(0x1000), dtype=numpy.uint8)
+        summary = ByteSummary.from_array(byte_array, 0x100)
+
+        resampled = summary.resample(10)
+
+        assert resampled.columns == 10
+        assert resampled.column_bounds[0] == 0 and resampled.column_bounds[-1] == 0x1000
+        for i in range(10):
+            start, stop = resampled.column_bounds[i:i + 2]
+            assert resampled.histograms[i].tolist() == numpy.bincount(byte_array[start:stop], minlength=0x100).tolist()
+
+        assert summary.resample(0x200) is summary
+
+    def test_serialization(self):
+        summary = ByteSummary.from_file(self._test_binary_src, columns=0x80)
+
+        restored = ByteSummary.from_bytes(summary.to_bytes())
+
+        assert (restored.column_bounds == summary.column_bounds).all()
+        assert (restored.histograms == summary.histograms).all()
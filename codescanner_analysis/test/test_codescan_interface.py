@@ -2,7 +2,11 @@ import collections
 import os
 import unittest
 
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
 from codescanner_analysis import CodescanInterface
+from codescanner_analysis import libcodescanpy
 
 
 class CodescanInterfaceTest(unittest.TestCase):
@@ -32,6 +36,127 @@ class CodescanInterfaceTest(unittest.TestCase):
 
         assert regions == expected
 
+    def test_scan_buffer(self):
+        with open(self.test_binary, 'rb') as f:
+            data = f.read()
+
+        expected = self.codescanner.sanitize_regions(self.codescanner.run(self.test_binary))
+        regions = self.codescanner.sanitize_regions(self.codescanner.scan_buffer(data))
+
+        assert regions == expected
+
+    def test_retry_out_of_memory(self):
+        test_medium_binary = os.path.join(self.test_file_dir, 'testfile-med')
+        file_size = os.path.getsize(test_medium_binary)
+        scan = libcodescanpy.scan
+        windows = []
+
+        def scan_small_windows(file_src, start=0, end=0, bool_aggressive=0, r_type=libcodescanpy.RESULT_DICT):
+            if end == 0 or end - start > 0x40000:
+                libcodescanpy._raise_for_status(5, 'test')
+            windows.append((start, end))
+            return scan(file_src, start, end, bool_aggressive, r_type)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(libcodescanpy, 'scan', scan_small_windows)
+        try:
+            codescanner = CodescanInterface()
+            regions = codescanner.sanitize_regions(codescanner.run(test_medium_binary))
+            sizes = codescanner.calculate_sizes(regions)
+
+            assert windows[0][0] == 0
+            assert windows[-1][1] == file_size
+            assert all(windows[i][1] == windows[i + 1][0] for i in range(len(windows) - 1))
+            assert sizes['FileSize'] == file_size
+            assert regions.get('Code')
+
+            codescanner.MIN_RETRY_WINDOW_SIZE = 0x100000
+            with pytest.raises(libcodescanpy.CodescanOutOfMemoryError):
+                codescanner.run(test_medium_binary)
+        finally:
+            monkeypatch.undo()
+
+    def test_run_beyond_32_bit_offsets(self):
+        test_medium_binary = os.path.join(self.test_file_dir, 'testfile-med')
+        file_size = os.path.getsize(test_medium_binary)
+        window_size = 0x40000
+
+        codescanner = CodescanInterface()
+        codescanner.LARGE_FILE_WINDOW_SIZE = window_size
+
+        with open(test_medium_binary, 'rb') as f:
+            data = f.read()
+
+        # the same windows: scanned with offsets below the patched limit, scanned as buffers beyond it
+        expected = {}
+        for start in range(0, file_size, window_size):
+            end = min(start + window_size, file_size)
+            if end <= 0x80000:
+                window = codescanner.run(test_medium_binary, start, end)
+            else:
+                window = codescanner.scan_buffer(data[start:end])
+            codescanner._join_regions(expected, window, start)
+
+        with pytest.raises(libcodescanpy.CodescanInputError):
+            libcodescanpy.scan(test_medium_binary, 0, libcodescanpy.MAX_SCAN_OFFSET + 1)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(libcodescanpy, 'MAX_SCAN_OFFSET', 0x80000)
+        try:
+            with pytest.raises(libcodescanpy.CodescanInputError):
+                libcodescanpy.scan(test_medium_binary, 0, 0)
+
+            regions = codescanner.run(test_medium_binary)
+        finally:
+            monkeypatch.undo()
+
+        assert regions == expected
+        assert codescanner.sanitize_regions(regions)['Zero'][-1][1] <= file_size
+
+    def test_run_windowed(self):
+        test_medium_binary = os.path.join(self.test_file_dir, 'testfile-med')
+        file_size = os.path.getsize(test_medium_binary)
+        scan = libcodescanpy.scan
+        windows = []
+
+        def scan_spy(file_src, start=0, end=0, bool_aggressive=0, r_type=libcodescanpy.RESULT_DICT):
+            windows.append((start, end))
+            return scan(file_src, start, end, bool_aggressive, r_type)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(libcodescanpy, 'scan', scan_spy)
+        try:
+            codescanner = CodescanInterface()
+            regions = codescanner.sanitize_regions(codescanner.run_windowed(test_medium_binary, window_size=0x100000,
+                                                                            overlap=0x10000))
+        finally:
+            monkeypatch.undo()
+
+        sizes = codescanner.calculate_sizes(regions)
+        expected_sizes = codescanner.calculate_sizes(codescanner.sanitize_regions(codescanner.run(test_medium_binary)))
+
+        assert len(windows) > 1
+        assert all(end - start <= 0x100000 and start % codescanner.BLOCK_SIZE == 0 for start, end in windows)
+        assert windows[-1][1] == file_size
+        assert sizes['FileSize'] == file_size
+        # the core classifies every window on its own, boundaries shift by a few percent of the code size
+        assert abs(sizes['Code'] - expected_sizes['Code']) < 0.05 * expected_sizes['Code']
+
+    def test_run_windowed_single_window(self):
+        expected = self.codescanner.run(self.test_binary, 0x800, 0x4000)
+        regions = self.codescanner.run_windowed(self.test_binary, 0x800, 0x4000,
+                                                window_size=CodescanInterface.MIN_STREAMING_WINDOW_SIZE,
+                                                overlap=CodescanInterface.MIN_STREAMING_OVERLAP)
+
+        assert regions == expected
+
+        with pytest.raises(ValueError):
+            self.codescanner.run_windowed(self.test_binary, window_size=0x40000, overlap=0x10000)
+        with pytest.raises(ValueError):
+            self.codescanner.run_windowed(self.test_binary, window_size=0x100000, overlap=0x4000)
+        with pytest.raises(ValueError):
+            self.codescanner.run_windowed(self.test_binary, window_size=0x100000, overlap=0x100000)
+
     def test_extract_architecture(self):
         regions = {'Code': [(0, 0, 'Intel', 64, 1)]}
         architecture = dict(self.codescanner.extract_architectures(regions))
@@ -102,6 +227,25 @@ class CodescanInterfaceTest(unittest.TestCase):
         assert expected == regions
         assert expected_sizes == sizes
 
+    def test_merge_regions_counts(self):
+        # pairs of adjacent blocks with gaps in between, unsorted
+        regions = {'Data': [[i * 0x200, (i + 1) * 0x200] for i in range(100000) if i % 3 != 2][::-1],
+                   'Code': [[0, 0x200, u'ARM', 32, 1], [0x200, 0x400, u'Intel', 64, 1]],
+                   'Zero': [(0x400, 0x600)]}
+
+        counts = self.codescanner._merge_regions(regions)
+
+        assert counts == (66670, 33336)
+        assert len(regions['Data']) == 33334
+        assert regions['Data'][0] == [0, 0x400]
+        assert regions['Data'][-1] == [99999 * 0x200, 100000 * 0x200]
+        assert regions['Code'] == [[0, 0x400, u'Intel', 64, 1]]
+        assert regions['Zero'] == [(0x400, 0x600)]
+
+        regions = self.codescanner.sanitize_regions(self.codescanner.run(self.test_binary))
+        assert self.codescanner.region_counts[0] >= self.codescanner.region_counts[1] == \
+            sum(len(regions[k]) for k in regions) - 1
+
     def test_merge_regions_fanny(self):
         regions = {
             u'HighEntropy': [[94720, 102912], [108032, 136704], [138240, 143872]],
@@ -1,9 +1,17 @@
+import collections
+import multiprocessing
 import os
 import pytest
 import tempfile
 import unittest
 
+from _pytest.monkeypatch import MonkeyPatch
+
+import codescanner_analysis.codescanner_analysis as codescanner_analysis_module
 from codescanner_analysis import CodescannerAnalysisData
+from codescanner_analysis import CodescanInterface
+from codescanner_analysis import RenderSpec
+from codescanner_analysis.file_header_parser import FileHeaderParser
 from codescanner_analysis import BytePlot
 from codescanner_analysis import ColorMap
 from codescanner_analysis import PlotBase
@@ -64,6 +72,159 @@ class CodescannerAnalysisDataTest(unittest.TestCase):
         assert expected_filesize == cad.sizes['FileSize']
         assert 'ELF' == cad.file_header
 
+    def test_scan_buffer(self):
+        with open(self.test_file, 'rb') as f:
+            data = f.read()
+
+        expected = CodescannerAnalysisData(self.test_file)
+        cad = CodescannerAnalysisData.scan_buffer(data)
+
+        assert expected.regions == cad.regions
+        assert expected.sizes == cad.sizes
+        assert expected.decision == cad.decision
+        assert 'ELF' == cad.file_header
+        assert cad.plot_to_buffer(100, cad.COLOR_MAP).startswith(helper.MAGIC_PNG_BYTES)
+
+        with pytest.raises(IOError):
+            CodescannerAnalysisData.scan_buffer(b'')
+
+    def test_lazy_attributes(self):
+        calls = collections.Counter()
+        make_decision = codescanner_analysis_module.make_decision
+        get_file_header = FileHeaderParser.get_file_header
+
+        def counted_make_decision(sizes, file_header):
+            calls['make_decision'] += 1
+            return make_decision(sizes, file_header)
+
+        def counted_get_file_header(file_src):
+            calls['get_file_header'] += 1
+            return get_file_header(file_src)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(codescanner_analysis_module, 'make_decision', counted_make_decision)
+        monkeypatch.setattr(FileHeaderParser, 'get_file_header', staticmethod(counted_get_file_header))
+        try:
+            cad = CodescannerAnalysisData(self.test_file)
+            assert cad.regions
+            assert not calls
+
+            assert cad.decision == cad.decision
+            assert 'ELF' == cad.file_header
+            assert calls == {'make_decision': 1, 'get_file_header': 1}
+        finally:
+            monkeypatch.undo()
+
+    def test_assign_attributes(self):
+        cad = CodescannerAnalysisData.header_only(self.test_file)
+        regions = {'Code': [[0, 0x100, 'Intel', 64, 1]], 'Zero': [[0x100, 0x200]]}
+
+        # assigned attributes are kept, attributes not computed yet are derived from them
+        cad.regions = regions
+        assert cad.regions is regions
+        assert cad.sizes['Code'] == 0x100
+        assert cad.architecture['ISA'] == 'Intel'
+
+        cad.sizes = {'Code': 1}
+        cad.decision = '(C)'
+        cad.architecture = {}
+        cad.file_header = None
+        assert (cad.sizes, cad.decision, cad.architecture, cad.file_header) == ({'Code': 1}, '(C)', {}, None)
+
+    def test_decision_detail(self):
+        cad = CodescannerAnalysisData(self.test_file)
+
+        detail = cad.decision_detail
+
+        assert detail is cad.decision_detail
+        assert detail.code == cad.decision
+        assert detail.certainty == 0 or detail.code == '(P)'
+        assert 'header_present' in detail.rules
+
+    def test_header_only(self):
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(CodescanInterface, 'run', lambda *args: self.fail('scanned for the header only'))
+        try:
+            cad = CodescannerAnalysisData.header_only(self.test_file)
+            assert 'ELF' == cad.file_header
+        finally:
+            monkeypatch.undo()
+
+        expected = CodescannerAnalysisData(self.test_file)
+        assert expected.regions == cad.regions
+        assert expected.decision == cad.decision
+
+        with pytest.raises(IOError):
+            CodescannerAnalysisData.header_only('not.existi.ng')
+
+    def test_windowed_scan(self):
+        # results are only identical to a single-shot scan if the file fits in a window
+        expected = CodescannerAnalysisData(self.test_file)
+        cad = CodescannerAnalysisData(self.test_file, window_size=CodescanInterface.MIN_STREAMING_WINDOW_SIZE,
+                                      overlap=CodescanInterface.MIN_STREAMING_OVERLAP)
+
+        assert expected.regions == cad.regions
+        assert expected.sizes == cad.sizes
+        assert expected.decision == cad.decision
+
+        with pytest.raises(ValueError):
+            CodescannerAnalysisData(self.test_file, window_size=0x4000, overlap=0x1000)
+
+    def test_render_all(self):
+        img_path = os.path.join(tempfile.gettempdir(), 'CodescannerAnalysisDataTest-test_render_all.png')
+        cad = CodescannerAnalysisData(self.test_file)
+        specs = [(cad.BYTE_PLOT, 30), RenderSpec(cad.COLOR_MAP, 50), (cad.COLOR_MAP, 72, (800, 300)),
+                 RenderSpec(cad.RASTER_BYTE_PLOT, 30, file_name=img_path)]
+
+        images = cad.render_all(specs)
+
+        assert images[0] == cad.plot_to_buffer(30, cad.BYTE_PLOT)
+        assert images[1] == cad.plot_to_buffer(50, cad.COLOR_MAP)
+        assert images[2] == cad.plot_to_dynamic_size_buffer(72, 800, 300, cad.COLOR_MAP)
+        assert images[3] is None
+        helper.assert_image_size((30 * 16, 30 * 8), img_path)
+        os.remove(img_path)
+
+        # workers get the object pickled, attributes not computed yet stay lazy
+        cad = CodescannerAnalysisData.header_only(self.test_file)
+        assert cad.render_all(specs[:3], processes=2) == images[:3]
+
+        with pytest.raises(ValueError):
+            cad.render_all(specs, processes=0)
+
+    def test_render_all_buffer(self):
+        with open(self.test_file, 'rb') as f:
+            cad = CodescannerAnalysisData.scan_buffer(f.read())
+        specs = [RenderSpec(cad.BYTE_PLOT, 30, image_format=PlotBase.RGBA),
+                 RenderSpec(cad.COLOR_MAP, 30, image_format=PlotBase.RGBA)]
+
+        # spawned workers do not inherit the memory file of the buffer, they get its bytes
+        images = cad.render_all(specs, processes=2, mp_context=multiprocessing.get_context('spawn'))
+
+        # the titles show the name of the memory file, which differs per process
+        for image, expected in zip(images, cad.render_all(specs)):
+            assert image.shape == expected.shape
+            assert (image[image.shape[0] // 4:] == expected[expected.shape[0] // 4:]).all()
+
+    def test_entropy_plot(self):
+        cad = CodescannerAnalysisData(self.test_file)
+
+        image = cad.plot_to_buffer(30, cad.ENTROPY_PLOT, PlotBase.RGBA)
+        assert image.shape == (30 * 4, 30 * 16, 4)
+        assert cad.entropy_trace() is cad.entropy_trace(step=cad.entropy_trace().step)
+
+        # the entropy trace is drawn over the other plots on request
+        for plot_type in (cad.COLOR_MAP, cad.RASTER_BYTE_PLOT):
+            plain = cad.plot_to_buffer(30, plot_type, PlotBase.RGBA)
+            traced = cad.plot_to_buffer(30, plot_type, PlotBase.RGBA, entropy_trace=True)
+            assert plain.shape == traced.shape
+            assert (plain != traced).any()
+
+        images = cad.render_all([RenderSpec(cad.COLOR_MAP, 30, image_format=PlotBase.RGBA, entropy_trace=True),
+                                 RenderSpec(cad.COLOR_MAP, 30, image_format=PlotBase.RGBA)])
+        assert (images[0] == cad.plot_to_buffer(30, cad.COLOR_MAP, PlotBase.RGBA, entropy_trace=True)).all()
+        assert (images[1] == cad.plot_to_buffer(30, cad.COLOR_MAP, PlotBase.RGBA)).all()
+
     # def test_plot_small_file(self):
     #     temp_dir = tempfile.gettempdir()
     #     bin_src = os.path.join(temp_dir, 'test_plot_small_file.bin')
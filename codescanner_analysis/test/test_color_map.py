@@ -7,6 +7,8 @@ from _pytest.monkeypatch import MonkeyPatch
 from collections import defaultdict
 from collections import namedtuple
 
+from matplotlib.colors import to_rgba
+
 from codescanner_analysis.codescan_interface import CodescanInterface
 from codescanner_analysis import ColorMap
 from codescanner_analysis import PlotBase
@@ -49,46 +51,51 @@ class ColorMapTest(unittest.TestCase):
 
         monkeypatch.undo()
 
-    def test_convert_dict_to_list_of_areas(self):
-        expected = [
-            ((1, 2), 'A'),
-            ((2, 3), 'B'),
-            ((3, 5), 'C'),
-            ((5, 6), 'A'),
-            ((6, 8), 'B'),
-            ((8, 9), 'A'),
-            ((9, 12), 'C'),
-            ((12, self.greatest_test_region_value), 'B'),
-        ]
-
-        areas = self.color_map._convert_dict_to_list_of_areas()
-
-        assert areas == expected
-
-    def test_create_cmap(self):
+    def test_bar_colors(self):
         self.color_map._area_specs = self._specs
-        areas = self.color_map._convert_dict_to_list_of_areas()
-        cmap = self.color_map._create_color_map(areas)
+        self.color_map.PAD_AREA_ID = 'D'
+
+        # a pixel per byte, in ascending order of the regions
+        image = self.color_map._rasterize_bar(self.greatest_test_region_value, 100)
 
         expected = [self._specs[0].dot_color,
                     self._specs[1].dot_color,
-                    self._specs[2].dot_color,
+                    self._specs[2].dot_color, self._specs[2].dot_color,
                     self._specs[0].dot_color,
-                    self._specs[1].dot_color,
+                    self._specs[1].dot_color, self._specs[1].dot_color,
                     self._specs[0].dot_color,
-                    self._specs[2].dot_color,
-                    self._specs[1].dot_color,
+                    self._specs[2].dot_color, self._specs[2].dot_color, self._specs[2].dot_color,
+                    self._specs[1].dot_color, self._specs[1].dot_color, self._specs[1].dot_color,
                     ]
 
-        assert cmap.colors == expected
+        assert image[0, 1:].tolist() == [self._rgba(c) for c in expected]
 
-    def test_create_bounds(self):
-        areas = self.color_map._convert_dict_to_list_of_areas()
-        bounds = self.color_map._create_bounds(areas)
+    def test_bar_size(self):
+        self.color_map._area_specs = self._specs
+        assert self.color_map._bar_size() == self.greatest_test_region_value
+
+        # regions reaching beyond the file extend the bar
+        self.color_map._file_size = 10
+        assert self.color_map._bar_size() == self.greatest_test_region_value
 
-        expected = [1, 2, 3, 5, 6, 8, 9, 12, 15]
+        self.color_map._file_size = 0x100
+        assert self.color_map._bar_size() == 0x100
+
+    def test_rasterize_bar(self):
+        self.color_map._area_specs = self._specs
+        self.color_map.PAD_AREA_ID = 'D'
+        palette = self.color_map._bar_palette()
 
-        assert bounds == expected
+        # a pixel per byte: gap (padded), A, B, C, C, A, ...
+        image = self.color_map._rasterize_bar(self.greatest_test_region_value, 100)
+        labels = [0, 1, 2, 3, 3, 1, 2, 2, 1, 3, 3, 3, 2, 2, 2]
+        assert image.shape == (1, self.greatest_test_region_value, 4)
+        assert image[0].tolist() == palette[labels].tolist()
+        assert tuple(palette[0]) == tuple(palette[4]) == (0xe0, 0x40, 0x00, 0xff)
+
+        # 3 bytes per pixel: the area spec covering most of them wins, ties go to the padding and earlier specs
+        image = self.color_map._rasterize_bar(self.greatest_test_region_value, 5)
+        assert image[0].tolist() == palette[[0, 3, 2, 3, 2]].tolist()
 
     def test_create_ticks(self):
         self.color_map._file_size = 0x1000
@@ -98,22 +105,29 @@ class ColorMapTest(unittest.TestCase):
 
         assert ticks == expected
 
-    def test_area_list_is_padded(self):
-        area_list = [((1, 2), 'Code'), ((5, 10), 'Code')]
-        area_list = self.color_map._pad_area_list(area_list)
+    def test_bar_is_padded(self):
+        color_map = ColorMap(self.test_binary_src, {'Code': [(1, 2), (5, 10)]})
+        color_map._file_size = self.greatest_test_region_value
+        colors = {s.id: self._rgba(s.dot_color) for s in color_map._area_specs}
+
+        image = color_map._rasterize_bar(color_map._bar_size(), 100)
+
+        expected = [colors['Data']] + [colors['Code']] + [colors['Data']] * 3 + [colors['Code']] * 5 + \
+                   [colors['Data']] * 5
 
-        expected = [((0, 1), 'Data'), ((1, 2), 'Code'), ((2, 5), 'Data'), ((5, 10), 'Code'), ((10, 15), 'Data')]
+        assert image[0].tolist() == expected
 
-        assert area_list == expected
+    def test_bar_is_not_padded(self):
+        color_map = ColorMap(self.test_binary_src, {'Code': [(0, 5)], 'Zero': [(5, 15)]})
+        color_map._file_size = self.greatest_test_region_value
+        colors = {s.id: self._rgba(s.dot_color) for s in color_map._area_specs}
 
-    def test_area_list_is_not_padded(self):
-        area_list = self.color_map._convert_dict_to_list_of_areas()
-        last_el_before_padding = area_list[len(area_list) - 1]
+        image = color_map._rasterize_bar(color_map._bar_size(), 100)
 
-        area_list = self.color_map._pad_area_list(area_list)
-        last_el_after_padding = area_list[len(area_list) - 1]
+        assert image[0].tolist() == [colors['Code']] * 5 + [colors['Zero']] * 10
 
-        assert last_el_before_padding == last_el_after_padding
+    def _rgba(self, color):
+        return [int(round(c * 0xff)) for c in to_rgba(color)]
 
     def test_spec_is_in_dictionary(self):
         test_spec = self.AreaSpec(id='ddddddE', label='Region E', dot_color='#e04000', line_color='#601000')
@@ -0,0 +1,178 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from codescanner_analysis import CodescannerAnalysisData, batch, columnar_export
+from codescanner_analysis.columnar_export import ColumnarWriter, read_columns
+from codescanner_analysis.extended_analysis import DecisionResult, rule_names
+from codescanner_analysis.libcodescanpy import LITTLE_ENDIAN, BIG_ENDIAN
+
+
+class ColumnarExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self.test_file = os.path.join(self.test_file_dir, 'testfile')
+        self.test_medium_binary_src = os.path.join(self.test_file_dir, 'testfile-med')
+
+        self.sizes = {'Code': 0x30000, 'Data': 0x100, 'HighEntropy': 0, 'Zero': 0x10, 'Ascii': 0x20,
+                      'FileSize': 0x40000}
+        self.regions = {'Code': [[0, 0x20000, 'ARM', 32, LITTLE_ENDIAN], [0x20000, 0x28000, 'ARM', 32, BIG_ENDIAN],
+                                 [0x28000, 0x30000, 'Intel', 64, LITTLE_ENDIAN]],
+                        'Data': [[0x30000, 0x30100]]}
+        self.detail = DecisionResult('(C)', 0.0, ('code_exists', 'code_sufficient'))
+
+    def _append_sample(self, writer, path):
+        writer.append_values(path, self.regions, self.sizes, self.detail, {'Full': 'ARM-32-le'}, 'ELF')
+
+    def test_npz_roundtrip(self):
+        with TemporaryDirectory() as temp_dir:
+            with ColumnarWriter(temp_dir, chunk_size=2, file_format=ColumnarWriter.NPZ) as writer:
+                for i in range(3):
+                    self._append_sample(writer, 'sample-%d' % i)
+                writer.append_values('broken', None, None, None, None, None, 'timeout')
+
+            assert sorted(os.listdir(temp_dir)) == ['chunk-000000.npz', 'chunk-000001.npz']
+
+            samples, regions = read_columns(temp_dir)
+
+            assert list(samples['path']) == ['sample-0', 'sample-1', 'sample-2', 'broken']
+            assert list(samples['sample']) == [0, 1, 1 << 32, (1 << 32) + 1]
+            assert list(samples['code']) == [0x30000] * 3 + [0]
+            assert list(samples['file_size']) == [0x40000] * 3 + [0]
+            assert list(samples['decision']) == ['(C)'] * 3 + ['']
+            assert rule_names(samples['rules'][0]) == ('code_exists', 'code_sufficient')
+            assert list(samples['file_header']) == ['ELF'] * 3 + ['']
+            assert samples['architecture'][0] == 'ARM-32-le'
+            assert list(samples['error']) == [''] * 3 + ['timeout']
+
+            assert len(regions['sample']) == 3 * 4
+            assert list(regions['type'][:4]) == ['Code', 'Code', 'Code', 'Data']
+            assert list(regions['arch'][:4]) == ['ARM', 'ARM', 'Intel', '']
+            assert list(regions['bitness'][:4]) == [32, 32, 64, 0]
+            assert list(regions['endianess'][:4]) == [LITTLE_ENDIAN, BIG_ENDIAN, LITTLE_ENDIAN, 0]
+            assert list(regions['end'][:4]) == [0x20000, 0x28000, 0x30000, 0x30100]
+
+            # all ARM-le code regions over 64 KiB, with the paths of their samples
+            selected = (regions['type'] == 'Code') & (regions['arch'] == 'ARM') & \
+                       (regions['endianess'] == LITTLE_ENDIAN) & (regions['end'] - regions['start'] > 0x10000)
+            rows = numpy.searchsorted(samples['sample'], regions['sample'][selected])
+            assert list(samples['path'][rows]) == ['sample-0', 'sample-1', 'sample-2']
+
+    def test_append_to_directory(self):
+        with TemporaryDirectory() as temp_dir:
+            with ColumnarWriter(temp_dir, file_format=ColumnarWriter.NPZ) as writer:
+                self._append_sample(writer, 'first')
+            with ColumnarWriter(temp_dir, file_format=ColumnarWriter.NPZ) as writer:
+                self._append_sample(writer, 'a much longer path')
+
+            samples, regions = read_columns(temp_dir)
+
+            assert list(samples['path']) == ['first', 'a much longer path']
+            assert list(samples['sample']) == [0, 1 << 32]
+            assert len(numpy.unique(regions['sample'])) == 2
+
+    def test_empty_directory(self):
+        with TemporaryDirectory() as temp_dir:
+            ColumnarWriter(temp_dir, file_format=ColumnarWriter.NPZ).close()
+
+            samples, regions = read_columns(temp_dir)
+
+            assert os.listdir(temp_dir) == []
+            assert len(samples['path']) == 0
+            assert len(regions['start']) == 0
+
+    def test_not_closed(self):
+        with TemporaryDirectory() as temp_dir:
+            writer = ColumnarWriter(temp_dir, file_format=ColumnarWriter.NPZ)
+            self._append_sample(writer, 'dropped')
+
+            with pytest.warns(ResourceWarning):
+                writer.__del__()
+            assert os.listdir(temp_dir) == []
+
+            writer.close()
+            assert os.listdir(temp_dir) == ['chunk-000000.npz']
+
+    def test_invalid_arguments(self):
+        with TemporaryDirectory() as temp_dir:
+            with pytest.raises(ValueError):
+                ColumnarWriter(temp_dir, chunk_size=0)
+            with pytest.raises(ValueError):
+                ColumnarWriter(temp_dir, file_format='csv')
+
+    def test_append_results(self):
+        with TemporaryDirectory() as temp_dir:
+            cad = CodescannerAnalysisData(self.test_medium_binary_src)
+            with ColumnarWriter(temp_dir, file_format=ColumnarWriter.NPZ) as writer:
+                writer.append(cad)
+                for result in batch.analyze(self.test_file):
+                    writer.append(result)
+
+            samples, regions = read_columns(temp_dir)
+
+            assert list(samples['path']) == [cad.file_path, self.test_file]
+            assert samples['decision'][0] == cad.decision
+            assert samples['code'][0] == cad.sizes['Code']
+            assert samples['rules'][0] == cad.decision_detail.rule_mask
+            code = (regions['sample'] == 0) & (regions['type'] == 'Code')
+            assert [[s, e] for s, e in zip(regions['start'][code], regions['end'][code])] == \
+                   [r[:2] for r in cad.regions['Code']]
+
+    def test_parquet_chunks(self):
+        # the tables are stored as npz files in place of Parquet, to check the chunk handling without pyarrow
+        written = []
+
+        def write_table(writer, array, name):
+            written.append(name)
+            with open(os.path.join(writer.directory, name), 'wb') as f:
+                numpy.save(f, array, allow_pickle=False)
+
+        def read_table(file_name, columns):
+            with open(file_name, 'rb') as f:
+                return columnar_export._columns_of(numpy.load(f, allow_pickle=False))
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(columnar_export, 'pyarrow', object())
+        monkeypatch.setattr(ColumnarWriter, '_write_table', write_table)
+        monkeypatch.setattr(columnar_export, '_read_table', read_table)
+        try:
+            with TemporaryDirectory() as temp_dir:
+                with ColumnarWriter(temp_dir, chunk_size=2) as writer:
+                    assert writer.file_format == ColumnarWriter.PARQUET
+                    for i in range(3):
+                        self._append_sample(writer, 'sample-%d' % i)
+
+                # a chunk is found by its samples table, which is written after its regions table
+                assert written == ['regions-000000.parquet', 'samples-000000.parquet',
+                                   'regions-000001.parquet', 'samples-000001.parquet']
+
+                samples, regions = read_columns(temp_dir)
+
+                assert list(samples['path']) == ['sample-0', 'sample-1', 'sample-2']
+                assert list(samples['sample']) == [0, 1, 1 << 32]
+                assert len(regions['sample']) == 3 * 4
+                assert list(regions['arch'][:4]) == ['ARM', 'ARM', 'Intel', '']
+        finally:
+            monkeypatch.undo()
+
+    @unittest.skipIf(columnar_export.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_roundtrip(self):
+        with TemporaryDirectory() as temp_dir:
+            with ColumnarWriter(temp_dir, chunk_size=2, file_format=ColumnarWriter.PARQUET) as writer:
+                for i in range(3):
+                    self._append_sample(writer, 'sample-%d' % i)
+
+            assert sorted(os.listdir(temp_dir)) == ['regions-000000.parquet', 'regions-000001.parquet',
+                                                    'samples-000000.parquet', 'samples-000001.parquet']
+
+            samples, regions = read_columns(temp_dir)
+
+            assert list(samples['path']) == ['sample-0', 'sample-1', 'sample-2']
+            assert list(samples['sample']) == [0, 1, 1 << 32]
+            assert list(regions['arch'][:4]) == ['ARM', 'ARM', 'Intel', '']
+            assert list(regions['endianess'][:4]) == [LITTLE_ENDIAN, BIG_ENDIAN, LITTLE_ENDIAN, 0]
@@ -124,3 +124,14 @@ class ComparisonAnalysisTest(unittest.TestCase):
         ca._search_alien_code()
 
         assert ca.cs_regions.get("AlienCode")
+
+    def test_search_alien_code(self):
+        ca = ComparisonAnalysis(self.test_binary_src)
+        ca.cs_regions = {'Code': [[0x100, 0x200, 'Intel', 64, 1], [0x300, 0x400, 'ARM', 32, 1]]}
+        ca.x_regions = {'.text': [[0x180, 0x320]], '.init': [[0x80, 0x90]]}
+
+        ca._search_alien_code()
+
+        assert ca.cs_regions['Code'] == [[0x180, 0x200], [0x300, 0x320]]
+        assert ca.cs_regions['AlienCode'] == [(0x100, 0x180, 'Intel'), (0x320, 0x400, 'ARM')]
+        assert ca._get_alien_architecture() == 'ARM'
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+
+import numpy
+from _pytest.monkeypatch import MonkeyPatch
+
+from codescanner_analysis import EntropyPlot, EntropyTrace, PlotBase
+
+
+class EntropyPlotTest(unittest.TestCase):
+
+    def setUp(self):
+        self._test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self._test_binary_src = os.path.join(self._test_file_dir, 'testfile')
+        self._file_size = os.path.getsize(self._test_binary_src)
+
+    def test_region_bands(self):
+        regions = {'Code': [[0, self._file_size // 2, u'Intel', 64, 1]]}
+        plotter = EntropyPlot(self._test_binary_src, regions)
+
+        bands = plotter._region_bands(4)
+
+        assert bands.shape == (1, 4, 4)
+        assert tuple(bands[0, 0, :3]) == (0x00, 0xbf, 0xbf)
+        assert bands[0, 0, 3] == round(EntropyPlot.REGION_ALPHA * 0xff)
+        # outside of regions: transparent
+        assert bands[0, 3, 3] == 0
+
+    def test_plot_with_trace(self):
+        regions = {'Data': [[0, self._file_size]]}
+        trace = EntropyTrace.from_file(self._test_binary_src, window=0x200)
+        plotter = EntropyPlot(self._test_binary_src, regions, trace)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(EntropyTrace, 'from_file', lambda *args: self.fail('file read with a given trace'))
+        try:
+            image = plotter.plot_to_buffer(30, None, PlotBase.RGBA)
+        finally:
+            monkeypatch.undo()
+
+        assert image.shape == (30 * 4, 30 * 16, 4)
+
+    def test_plot_without_trace(self):
+        plotter = EntropyPlot(self._test_binary_src, {'Data': [[0, self._file_size]]})
+
+        image = plotter.plot_to_buffer(30)
+
+        assert image[:8] == b'\x89PNG\r\n\x1a\n'
+        assert numpy.array_equal(plotter._entropy_trace.offsets, EntropyTrace.from_file(self._test_binary_src).offsets)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+
+import numpy
+import pytest
+
+from codescanner_analysis import EntropyTrace
+
+
+class EntropyTraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self._test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self._test_binary_src = os.path.join(self._test_file_dir, 'testfile')
+
+    def test_from_array(self):
+        byte_array = numpy.zeros(0x300, dtype=numpy.uint8)
+        byte_array[0x100:0x200] = numpy.arange(0x100)
+
+        trace = EntropyTrace.from_array(byte_array, 0x100, 0x80, 0x10)
+
+        assert (trace.window, trace.step) == (0x100, 0x80)
+        assert trace.offsets.tolist() == [0x10, 0x90, 0x110, 0x190, 0x210]
+        assert numpy.allclose(trace.entropy[[0, 2, 4]], [0, 8, 0])
+        assert 0 < trace.entropy[1] < 8
+
+        assert EntropyTrace.from_array(byte_array, 0x100).step == EntropyTrace.default_step(0x100)
+
+    def test_from_file(self):
+        expected = numpy.fromfile(self._test_binary_src, dtype=numpy.uint8)[0x100:0x4100]
+
+        trace = EntropyTrace.from_file(self._test_binary_src, 0x100, 0x4100, 0x400, 0x100)
+
+        assert trace.offsets[0] == 0x100
+        assert numpy.array_equal(trace.entropy, EntropyTrace.from_array(expected, 0x400, 0x100).entropy)
+
+    def test_envelope(self):
+        trace = EntropyTrace(numpy.arange(5) * 0x10, [1, 3, 2, 8, 4], 0x20, 0x10)
+
+        centers, minimum, mean, maximum = trace.envelope(2)
+
+        assert centers.tolist() == [0x18, 0x40]
+        assert minimum.tolist() == [1, 2]
+        assert mean.tolist() == [2, 14 / 3.0]
+        assert maximum.tolist() == [3, 8]
+
+        # fewer points than columns: every point is kept
+        centers, minimum, mean, maximum = trace.envelope(10)
+        assert minimum.tolist() == mean.tolist() == maximum.tolist() == [1, 3, 2, 8, 4]
+
+        with pytest.raises(ValueError):
+            trace.envelope(0)
+
+    def test_serialization(self):
+        trace = EntropyTrace.from_file(self._test_binary_src, window=0x200)
+
+        restored = EntropyTrace.from_bytes(trace.to_bytes())
+
+        assert (restored.window, restored.step) == (trace.window, trace.step)
+        assert (restored.offsets == trace.offsets).all()
+        assert (restored.entropy == trace.entropy).all()
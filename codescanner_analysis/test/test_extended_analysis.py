@@ -1,9 +1,11 @@
 import os
+import numpy
 import pytest
 import unittest
 
 from codescanner_analysis.codescanner_analysis import CodescannerAnalysisData
-from codescanner_analysis.extended_analysis import make_decision
+from codescanner_analysis.extended_analysis import DECISION_RULES, DecisionResult, make_decision, \
+    make_decision_batch, make_decision_detail, make_decision_detail_batch, rule_mask, rule_names
 
 
 class FileHeaderParserTest(unittest.TestCase):
@@ -31,3 +33,88 @@ class FileHeaderParserTest(unittest.TestCase):
         result = cad.decision
 
         assert result is not None
+
+    def test_make_decision_batch(self):
+        n = 5000
+        file_size = numpy.random.choice([1000, 19999, 20000, 49999, 50000, 10 ** 6], n)
+        sizes = {'FileSize': file_size}
+        for name in ('Code', 'Data', 'HighEntropy', 'Zero'):
+            sizes[name] = (numpy.random.random(n) * file_size * numpy.random.choice([0.05, 0.3, 1.0], n)).astype(int)
+        # thresholds of the rules, and corrupt (only code) files
+        sizes['Code'][:100] = file_size[:100] // 5
+        sizes['HighEntropy'][100:200] = file_size[100:200] * 2 // 5
+        sizes['Code'][200:300] = file_size[200:300]
+        header_present = numpy.random.random(n) < 0.5
+
+        decisions, packed_certainty = make_decision_batch(sizes, header_present)
+
+        expected = [make_decision({k: int(v[i]) for k, v in sizes.items()}, 'ELF' if header_present[i] else None)
+                    for i in range(n)]
+        assert decisions.tolist() == expected
+        assert (packed_certainty[decisions != '(P)'] == 0).all()
+        assert (packed_certainty[decisions == '(P)'] > 0).all()
+
+    def test_make_decision_batch_packed_certainty(self):
+        sizes = numpy.array([(2000, 10000, 30000, 0, 100000), (30000, 0, 0, 0, 100000)],
+                            dtype=[('Code', int), ('Data', int), ('HighEntropy', int), ('Zero', int), ('FileSize', int)])
+
+        decisions, packed_certainty = make_decision_batch(sizes, True)
+
+        assert decisions.tolist() == ['(P)', '(N)']
+        # (HighEntropy + 0.3 * Data) / (0.5 * FileSize)
+        assert numpy.allclose(packed_certainty, [(30000 + 0.3 * 10000) / 50000.0, 0])
+
+    def test_make_decision_batch_missing_sizes(self):
+        sizes = {'Code': [0], 'Data': [0], 'HighEntropy': [0], 'Zero': [0]}
+
+        with pytest.raises(RuntimeError):
+            make_decision_batch(sizes, False)
+
+        with pytest.raises(RuntimeError):
+            make_decision_batch(None, False)
+
+        sizes['FileSize'] = [100, 0]
+
+        with pytest.raises(RuntimeError):
+            make_decision_batch(sizes, False)
+
+    def test_make_decision_detail(self):
+        packed = {'Code': 2000, 'Data': 10000, 'HighEntropy': 30000, 'Zero': 30000, 'FileSize': 100000}
+
+        result = make_decision_detail(packed, None)
+
+        assert isinstance(result, DecisionResult)
+        assert result.code == make_decision(packed, None) == '(P)'
+        assert result.certainty == (30000 + 0.3 * 10000) / 50000.0
+        assert set(result.rules) == {'code_exists', 'too_many_zeros', 'veto_I', 'veto_II'}
+        assert rule_names(result.rule_mask) == result.rules
+
+        normal = {'Code': 45000, 'Data': 0, 'HighEntropy': 41000, 'Zero': 0, 'FileSize': 100000}
+        result = make_decision_detail(normal, 'ELF')
+        assert (result.code, result.certainty) == ('(N)', 0)
+        assert {'header_present', 'code_sufficient', 'big_EBP_exists', 'veto_III'} <= set(result.rules)
+
+        with pytest.raises(RuntimeError):
+            make_decision_detail({'FileSize': 0}, None)
+
+    def test_make_decision_detail_batch(self):
+        n = 500
+        file_size = numpy.random.choice([1000, 30000, 10 ** 6], n)
+        sizes = {'FileSize': file_size}
+        for name in ('Code', 'Data', 'HighEntropy', 'Zero'):
+            sizes[name] = (numpy.random.random(n) * file_size * 0.5).astype(int)
+        header_present = numpy.random.random(n) < 0.5
+
+        decisions, packed_certainty, rule_masks = make_decision_detail_batch(sizes, header_present)
+
+        assert rule_masks.dtype == numpy.uint16
+        assert decisions.tolist() == make_decision_batch(sizes, header_present)[0].tolist()
+        for i in range(n):
+            result = make_decision_detail({k: int(v[i]) for k, v in sizes.items()}, 'PE' if header_present[i] else None)
+            assert result == (decisions[i], packed_certainty[i], rule_names(rule_masks[i]))
+            assert result.rule_mask == rule_masks[i]
+
+    def test_rule_mask(self):
+        assert rule_mask([]) == 0
+        assert rule_mask(['veto_I', 'header_present', 'veto_I']) == 1 | 1 << DECISION_RULES.index('veto_I')
+        assert rule_names(rule_mask(DECISION_RULES)) == DECISION_RULES
@@ -1,10 +1,15 @@
 import numpy
 import os
 import pytest
+from _pytest.monkeypatch import MonkeyPatch
 from tempfile import TemporaryDirectory
 import unittest
 
-from codescanner_analysis.file_header_parser import FileHeaderParser
+from codescanner_analysis import file_header_parser, header_parser
+from codescanner_analysis.codescanner_analysis import CodescannerAnalysisData
+from codescanner_analysis.comparison_analysis import ComparisonAnalysis
+from codescanner_analysis.file_header_parser import FileHeaderParser, get_header_info
+from codescanner_analysis.overlay_plot import OverlayPlot
 
 
 class FileHeaderParserTest(unittest.TestCase):
@@ -62,6 +67,53 @@ class FileHeaderParserTest(unittest.TestCase):
 
             assert header is None
 
+    def test_header_info_cache(self):
+        with TemporaryDirectory() as temp_dir:
+            bin_src = os.path.join(temp_dir, 'FileHeaderParserTest_test_header_info_cache.exe')
+            self._create_file(bin_src, 0x200, FileHeaderParser.MAGIC_PE_FILE_BYTES)
+
+            info = get_header_info(bin_src)
+            assert info is get_header_info(bin_src)
+            assert 'PE' == info.file_header
+
+            # a changed file gets a new HeaderInfo
+            self._create_file(bin_src, 0x300, FileHeaderParser.MAGIC_ELF_FILE_BYTES)
+
+            changed_info = get_header_info(bin_src)
+            assert changed_info is not info
+            assert 'ELF' == changed_info.file_header
+
+    def test_header_parsed_once(self):
+        monkeypatch = MonkeyPatch()
+        calls = {'parse_magic': 0, 'get_basic_info': 0}
+        parse_magic = FileHeaderParser.parse_magic
+        get_basic_info = header_parser.get_basic_info
+
+        def counted_parse_magic(file_src):
+            calls['parse_magic'] += 1
+            return parse_magic(file_src)
+
+        def counted_get_basic_info(file_src, start=0, force=0):
+            calls['get_basic_info'] += 1
+            return get_basic_info(file_src, start, force)
+
+        try:
+            file_header_parser.clear_header_infos()
+            monkeypatch.setattr(FileHeaderParser, 'parse_magic', staticmethod(counted_parse_magic))
+            monkeypatch.setattr(header_parser, 'get_basic_info', counted_get_basic_info)
+
+            ca = ComparisonAnalysis(self._test_binary_src)
+            plotter = OverlayPlot(self._test_binary_src, ca.cs_regions)
+            cad = CodescannerAnalysisData.header_only(self._test_binary_src)
+
+            assert ca.x_regions == plotter._x_regions
+            assert ca.x_regions is not plotter._x_regions
+            assert 'ELF' == cad.file_header
+            assert 'ELF' == FileHeaderParser.get_file_header(self._test_binary_src)
+            assert calls == {'parse_magic': 1, 'get_basic_info': 1}
+        finally:
+            monkeypatch.undo()
+
     def _create_file(self, name, size, magic):
         pe_bytes = numpy.random.bytes(size - 4)
         pe_bytes = magic + pe_bytes
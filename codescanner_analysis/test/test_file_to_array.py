@@ -1,4 +1,6 @@
 import numpy as np
+import os
+import tracemalloc
 import unittest
 
 import codescanner_analysis.utils.file_to_array as fta
@@ -11,6 +13,26 @@ class FileToArrayTest(unittest.TestCase):
         self._regions_0 = [[1, 3], [5, 6], [8, 10]]
         self._regions_1 = [[1, 3], [4, 5]]
 
+    def test_load(self):
+        test_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'testfile')
+        with open(test_file, 'rb') as f:
+            data = f.read()
+
+        assert fta.load(test_file).tobytes() == data
+        assert fta.load(test_file, 0x10, 0x20).tobytes() == data[0x10:0x20]
+        assert fta.load(test_file, 0x10).tobytes() == data[0x10:]
+        assert fta.loadInts(test_file).tolist() == np.frombuffer(data[:len(data) // 4 * 4], dtype=np.uint32).tolist()
+        assert fta.load('not.existi.ng').size == 0
+
+        # writable copies by default, read-only views of the map on request
+        data = fta.load(test_file)
+        data[0] = 0
+        assert fta.load(test_file)[0] == 0x7f
+        fta.loadInts(test_file)[0] = 0
+        assert not fta.load(test_file, copy=False).flags.writeable
+        assert not fta.loadInts(test_file, copy=False).flags.writeable
+        assert fta.load(test_file, 0x10, 0x20, copy=False).tobytes() == fta.load(test_file, 0x10, 0x20).tobytes()
+
     def test_analog_minus(self):
         self._regions_1 = [[1, 3], [4, 5]]
         B_regions = fta.Analog(self._regions_0, self._file_size)
@@ -68,3 +90,131 @@ class FileToArrayTest(unittest.TestCase):
 
         assert np.array_equal(expexted_01, regions_r_01)
         assert np.array_equal(expexted_02, regions_r_02)
+
+    def test_splitblocks(self):
+        blocks = fta.splitblocks(np.arange(10, dtype=np.uint8), 3)
+
+        assert blocks.tolist() == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+    def test_sort_per_frequencies(self):
+        block = np.array([0, 1, 1, 255, 7, 7, 7], dtype=np.uint8)
+
+        freqs = fta.sortPerFrequencies(block)
+        assert freqs.dtype == np.float32
+        assert freqs.shape == (0x100,)
+        assert (freqs[0], freqs[1], freqs[7], freqs[255], freqs.sum()) == (1, 2, 3, 1, 7)
+
+        assert fta.sortPerFrequencies(block, 1, 7).tolist() == [2, 0, 0, 0, 0, 0, 3]
+        assert fta.sortPerFrequencies(np.array([300, 2, 300], dtype=np.uint32), 2, 300)[[0, -1]].tolist() == [1, 2]
+        assert np.allclose(fta.sortPerFrequencies_Normalized(block)[[1, 7]], [2 / 7.0, 3 / 7.0])
+
+    def test_block_histograms(self):
+        block = np.random.randint(0, 0x100, 1000).astype(np.uint8)
+
+        histograms = fta.blockHistograms(block, 300)
+
+        assert histograms.shape == (4, 0x100)
+        for i in range(4):
+            assert np.array_equal(histograms[i], np.bincount(block[i * 300:(i + 1) * 300], minlength=0x100))
+
+    def test_block_statistics(self):
+        block = np.concatenate((np.zeros(0x100, dtype=np.uint8),
+                                np.arange(0x100, dtype=np.uint8),
+                                np.frombuffer(b'Hello\tWorld\n' * 0x20, dtype=np.uint8)[:0x100],
+                                np.array([0, 0x41], dtype=np.uint8)))
+
+        stats = fta.blockStatistics(block, 0x100, 0x10)
+
+        assert stats.offsets.tolist() == [0x10, 0x110, 0x210, 0x310]
+        assert stats.sizes.tolist() == [0x100, 0x100, 0x100, 2]
+        assert np.allclose(stats.entropy, [0, 8, stats.entropy[2], 1])
+        assert 0 < stats.entropy[2] < 4
+        assert np.allclose(stats.zero_ratio, [1, 1 / 256.0, 0, 0.5])
+        assert np.allclose(stats.ascii_ratio, [0, 98 / 256.0, 1, 0.5])
+
+    def test_block_statistics_chunks(self):
+        block = np.random.randint(0, 0x10, 0x3001).astype(np.uint8)
+        expected = fta.blockStatistics(block, 0x100)
+
+        saved_chunk_size = fta.BLOCK_CHUNK_SIZE
+        try:
+            fta.BLOCK_CHUNK_SIZE = 0x300
+            stats = fta.blockStatistics(block, 0x100)
+        finally:
+            fta.BLOCK_CHUNK_SIZE = saved_chunk_size
+
+        for expected_column, column in zip(expected, stats):
+            assert np.allclose(expected_column, column)
+
+    def test_sliding_statistics(self):
+        block = np.random.randint(0, 0x40, 0x1001).astype(np.uint8)
+
+        for window, step in [(0x100, 0x40), (0x100, 0x60), (0x40, 0x100)]:
+            stats = fta.slidingStatistics(block, window, step, 0x10)
+            starts = range(0, block.size - window + 1, step)
+            expected = [fta.blockStatistics(block[i:i + window], window) for i in starts]
+
+            assert stats.offsets.tolist() == [0x10 + i for i in starts]
+            assert (stats.sizes == window).all()
+            assert np.allclose(stats.entropy, [e.entropy[0] for e in expected])
+            assert np.allclose(stats.zero_ratio, [e.zero_ratio[0] for e in expected])
+
+        # a single window covers smaller blocks
+        stats = fta.slidingStatistics(block[:0x20], 0x100, 0x40)
+        assert stats.sizes.tolist() == [0x20]
+
+    def test_sliding_statistics_chunks(self):
+        block = np.random.randint(0, 0x10, 0x3001).astype(np.uint8)
+        expected = fta.slidingStatistics(block, 0x200, 0x80)
+
+        saved_chunk_size = fta.BLOCK_CHUNK_SIZE
+        try:
+            fta.BLOCK_CHUNK_SIZE = 0x300
+            stats = fta.slidingStatistics(block, 0x200, 0x80)
+        finally:
+            fta.BLOCK_CHUNK_SIZE = saved_chunk_size
+
+        for expected_column, column in zip(expected, stats):
+            assert np.allclose(expected_column, column)
+
+    def test_sliding_statistics_coprime_step(self):
+        block = np.random.randint(0, 0x100, 0x10000).astype(np.uint8)
+
+        def expected_statistics(window, step):
+            starts = range(0, block.size - window + 1, step)
+            return np.array([fta.blockStatistics(block[i:i + window], window).entropy[0] for i in starts])
+
+        # units of one byte: the windows are counted incrementally, without a histogram per byte
+        tracemalloc.start()
+        try:
+            stats = fta.slidingStatistics(block, 0x100, 0xff)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert peak < 0x400000
+        assert np.allclose(stats.entropy, expected_statistics(0x100, 0xff))
+
+        # the units of a chunk are bounded, windows of more units are counted incrementally
+        saved_chunk_units = fta.SLIDING_CHUNK_UNITS
+        try:
+            fta.SLIDING_CHUNK_UNITS = 0x10
+            for window, step in [(0x100, 0x40), (0x800, 0x40), (0x40, 0x101)]:
+                stats = fta.slidingStatistics(block, window, step, 0x10)
+                assert stats.offsets[-1] == 0x10 + (block.size - window) // step * step
+                assert (stats.sizes == window).all()
+                assert np.allclose(stats.entropy, expected_statistics(window, step))
+        finally:
+            fta.SLIDING_CHUNK_UNITS = saved_chunk_units
+
+    def test_file_block_statistics(self):
+        test_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'testfile')
+
+        stats = fta.fileBlockStatistics(test_file, 0x200, 0x100)
+        expected = fta.blockStatistics(fta.load(test_file, 0x100), 0x200, 0x100)
+
+        assert stats.offsets[0] == 0x100
+        assert stats.sizes.sum() == os.path.getsize(test_file) - 0x100
+        for expected_column, column in zip(expected, stats):
+            assert np.array_equal(expected_column, column)
+
+        assert fta.fileBlockStatistics('not.existi.ng').sizes.size == 0
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import unittest
 
 import pytest
@@ -26,3 +27,77 @@ class UtilsTest(unittest.TestCase):
 
         assert expected == received
         monkeypatch.undo()
+
+    def test_memory_file(self):
+        data = bytes(range(256)) * 16
+
+        with file_utils.MemoryFile(data) as memory_file:
+            assert memory_file.size == len(data)
+            with open(memory_file.name, 'rb') as f:
+                assert f.read() == data
+
+    def test_memory_file_from_file(self):
+        test_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'testfile')
+        with open(test_file, 'rb') as f:
+            data = f.read()
+
+        with file_utils.MemoryFile.from_file(test_file, 0x100, 0x900) as memory_file:
+            assert memory_file.size == 0x800
+            with open(memory_file.name, 'rb') as f:
+                assert f.read() == data[0x100:0x900]
+
+    def test_file_digest(self):
+        test_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'testfile')
+        digest = file_utils.file_digest(test_file, 0x100)
+
+        assert digest == file_utils.file_digest(test_file)
+        assert len(digest) == 64
+
+    def test_file_digest_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            test_file = os.path.join(temp_dir, 'digest.bin')
+            with open(test_file, 'wb') as f:
+                f.write(b'\x00' * 0x100)
+            digest = file_utils.file_digest(test_file)
+
+            # an unchanged file is not read again
+            monkeypatch = MonkeyPatch()
+            monkeypatch.setattr('builtins.open', None)
+            try:
+                assert file_utils.file_digest(test_file) == digest
+            finally:
+                monkeypatch.undo()
+
+            with open(test_file, 'wb') as f:
+                f.write(b'\x01' * 0x200)
+            assert file_utils.file_digest(test_file) != digest
+
+    def test_map_bytes(self):
+        test_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'testfile')
+        with open(test_file, 'rb') as f:
+            data = f.read()
+
+        window = file_utils.map_bytes(test_file, 0x100, 0x900)
+        rest = file_utils.map_bytes(test_file, 0x100)
+
+        assert window.tobytes() == data[0x100:0x900]
+        assert rest.tobytes() == data[0x100:]
+        assert file_utils.map_bytes(test_file).tobytes() == data
+        # one shared map
+        assert window.base is rest.base is file_utils.map_file(test_file)
+        assert not window.flags.writeable
+
+    def test_map_changed_file(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'\x01' * 0x100)
+            f.flush()
+            array = file_utils.map_file(f.name)
+            assert array.tolist() == [1] * 0x100
+
+            f.write(b'\x02' * 0x100)
+            f.flush()
+            assert file_utils.map_file(f.name) is not array
+            assert file_utils.map_bytes(f.name, 0xff, 0x101).tolist() == [1, 2]
+
+        with tempfile.NamedTemporaryFile() as f:
+            assert file_utils.map_file(f.name).size == 0
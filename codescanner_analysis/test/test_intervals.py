@@ -0,0 +1,51 @@
+import numpy as np
+import unittest
+
+import codescanner_analysis.utils.file_to_array as fta
+from codescanner_analysis.utils import intervals
+
+
+class IntervalsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._file_size = 15
+        self._regions_0 = [[1, 3], [5, 6], [8, 10]]
+        self._regions_1 = [[1, 3], [4, 5]]
+
+    def test_normalize(self):
+        regions = [[8, 10, u'Intel'], [1, 3], [2, 4], [4, 5], [6, 6], [9, 7], [0, 12]]
+
+        assert intervals.normalize(regions[:5]).tolist() == [[1, 5], [8, 10]]
+        assert intervals.normalize(regions).tolist() == [[0, 12]]
+        assert intervals.normalize([]).shape == (0, 2)
+        assert intervals.normalize(np.zeros(0)).shape == (0, 2)
+
+    def test_operations(self):
+        assert intervals.union(self._regions_0, self._regions_1).tolist() == [[1, 3], [4, 6], [8, 10]]
+        assert intervals.intersection(self._regions_0, self._regions_1).tolist() == [[1, 3]]
+        assert intervals.difference(self._regions_0, self._regions_1).tolist() == [[5, 6], [8, 10]]
+        assert intervals.difference(self._regions_1, self._regions_0).tolist() == [[4, 5]]
+        assert intervals.intersection(self._regions_0, []).tolist() == []
+        assert intervals.difference(self._regions_0, []).tolist() == self._regions_0
+
+    def test_operations_match_analog(self):
+        random = np.random.RandomState(0)
+
+        for _ in range(200):
+            a = [[s, s + random.randint(0, 6)] for s in random.randint(0, self._file_size, random.randint(1, 6))]
+            b = [[s, s + random.randint(0, 6)] for s in random.randint(0, self._file_size, random.randint(1, 6))]
+
+            expected_union = fta.toDigital(fta.Analog(b, self._file_size, '+', fta.Analog(a, self._file_size)))
+            expected_difference = fta.toDigital(fta.Analog(b, self._file_size, '-', fta.Analog(a, self._file_size)))
+            bounds = [[0, self._file_size]]
+
+            assert intervals.intersection(intervals.union(a, b), bounds).tolist() == expected_union.tolist()
+            assert intervals.intersection(intervals.difference(a, b), bounds).tolist() == expected_difference.tolist()
+
+    def test_containing(self):
+        regions = [[8, 10], [0, 3], [2, 12], [20, 30]]
+
+        result = intervals.containing(regions, [[1, 2], [8, 10], [9, 11], [12, 14], [25, 30], [-1, 0], [29, 31]])
+
+        assert result.tolist() == [1, 2, 2, -1, 3, -1, -1]
+        assert intervals.containing([], [[1, 2]]).tolist() == [-1]
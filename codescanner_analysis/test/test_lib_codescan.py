@@ -1,6 +1,7 @@
 import unittest
 import os
 
+import numpy
 import pytest
 
 from codescanner_analysis import libcodescanpy as codescan
@@ -14,10 +15,36 @@ class LibCodescanTest(unittest.TestCase):
         self.test_file = os.path.join(test_file_dir, 'testfile')
         codescan.init()
 
+    def test_init_once(self):
+        lib = codescan.libcodescan
+
+        codescan.init()
+
+        assert codescan.is_initialized()
+        assert lib is codescan.libcodescan
+
+        codescan.reload()
+
+        assert codescan.is_initialized()
+        assert codescan.scan(self.test_file, 0, 0)['Code']
+
     def test_no_file(self):
         with pytest.raises(OSError):
             codescan.scan('nofile', 0, 0)
 
+    def test_status_errors(self):
+        for status in codescan.STATUS_ERRORS:
+            with pytest.raises(codescan.CodescanError) as e:
+                codescan._raise_for_status(status, 'test')
+            assert e.value.status == status
+            assert isinstance(e.value, codescan.STATUS_ERRORS[status])
+
+        with pytest.raises(MemoryError):
+            codescan._raise_for_status(5, 'test')
+
+        with pytest.raises(codescan.CodescanFileError):
+            codescan.scan('nofile', 0, 0)
+
     def test_run_dict(self):
         test_file = self.test_file
 
@@ -61,3 +88,32 @@ class LibCodescanTest(unittest.TestCase):
 
         assert result['Data'] == expected_data
         assert len(result['Data']) == 1
+
+    def test_scan_buffer(self):
+        with open(self.test_file, 'rb') as f:
+            data = f.read()
+
+        expected = codescan.scan(self.test_file, 0, 0, r_type=codescan.RESULT_LIST)
+
+        assert codescan.scan_buffer(data, r_type=codescan.RESULT_LIST) == expected
+        assert codescan.scan_buffer(memoryview(data), r_type=codescan.RESULT_LIST) == expected
+        assert codescan.scan_buffer(numpy.frombuffer(data, dtype=numpy.uint8), r_type=codescan.RESULT_LIST) == expected
+
+    def test_scan_empty_buffer(self):
+        with pytest.raises(OSError):
+            codescan.scan_buffer(b'')
+
+    def test_run_numpy(self):
+        result = codescan.scan(self.test_file, 0, 0, r_type=codescan.RESULT_NUMPY)
+        expected = codescan.scan(self.test_file, 0, 0, r_type=codescan.RESULT_LIST)
+
+        assert sorted(result) == sorted(expected)
+        assert result['Code'].dtype == codescan.REGION_DTYPE
+
+        for t in expected:
+            assert result[t]['start'].tolist() == [r[0] for r in expected[t]]
+            assert result[t]['end'].tolist() == [r[1] for r in expected[t]]
+
+        code = result['Code'][0]
+        assert [codescan.architecture_name(code['arch']), code['bitness'], code['endianess']] == expected['Code'][0][2:]
+        assert codescan.architecture_name(result['Data'][0]['arch']) is None
@@ -14,6 +14,13 @@ class LibHeaderParserTest(unittest.TestCase):
         self.libheaderparser_src = os.path.join(root_directory, 'res/lib', 'libheaderparser.so')
         header_parser.init(self.libheaderparser_src)
 
+    def test_init_once(self):
+        lib = header_parser.lib_header_parser
+
+        assert lib is header_parser.init(self.libheaderparser_src)
+        assert lib is header_parser.library()
+        assert self.libheaderparser_src == header_parser.default_library_src()
+
     def test_no_file(self):
         test_file = 'nofile'
         result = header_parser.get_basic_info(test_file)
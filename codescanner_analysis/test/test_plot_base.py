@@ -1,8 +1,19 @@
+import io
 import os
+import shutil
+import tempfile
 import unittest
 
+import matplotlib.pyplot
+import numpy
+import pytest
+from PIL import Image
+
+from codescanner_analysis import BytePlot
 from codescanner_analysis import CodescannerAnalysisData
+from codescanner_analysis import ColorMap
 from codescanner_analysis import PlotBase
+from codescanner_analysis.test import helper
 
 
 class PlotBaseTest(unittest.TestCase):
@@ -25,3 +36,86 @@ class PlotBaseTest(unittest.TestCase):
         p.update_code_spec_label(None)
 
         assert p._area_specs[0].label == old_label
+
+    def test_region_runs(self):
+        regions = {'Code': [[0x10, 0x30, u'Intel', 64, 1], [0x20, 0x28, u'Intel', 64, 1]],
+                   'Zero': [[0x28, 0x40], [0x48, 0x48]], 'Data': [[0x50, 0x60], [0x4, 0x2]], 'Unknown': [[0, 0x100]]}
+        p = PlotBase(self._test_binary_src, regions)
+
+        bounds, labels = p._region_runs()
+
+        assert bounds.tolist() == [0, 0x10, 0x30, 0x40, 0x50, 0x60, numpy.iinfo(numpy.int64).max]
+        assert labels.tolist() == [-1, 0, 4, -1, 5, -1]
+        assert p._region_runs() is p._runs
+
+        bounds, labels = PlotBase(self._test_binary_src, {})._region_runs()
+        assert bounds.tolist() == [0, numpy.iinfo(numpy.int64).max]
+        assert labels.tolist() == [-1]
+
+    def test_reuse_figure(self):
+        cad = CodescannerAnalysisData(self._test_binary_src)
+
+        for plotter in (BytePlot(self._test_binary_src, cad.regions), ColorMap(self._test_binary_src, cad.regions)):
+            image = plotter.plot_to_buffer(30)
+            figure = plotter._figure
+
+            assert image.startswith(helper.MAGIC_PNG_BYTES)
+            assert not figure.axes
+            assert image == plotter.plot_to_buffer(30)
+            assert figure is plotter._figure
+
+            plotter.close()
+            assert plotter._figure is None
+
+        # no global pyplot state is used
+        assert not matplotlib.pyplot.get_fignums()
+
+    def test_image_formats(self):
+        cad = CodescannerAnalysisData(self._test_binary_src)
+        plotter = ColorMap(self._test_binary_src, cad.regions)
+        png = plotter.plot_to_buffer(30)
+
+        rgba = plotter.plot_to_buffer(30, image_format=PlotBase.RGBA)
+        assert rgba.shape == (30 * 3.5, 30 * 16, 4) and rgba.dtype == numpy.uint8
+        assert (rgba == numpy.asarray(Image.open(io.BytesIO(png)).convert('RGBA'))).all()
+
+        assert plotter.plot_to_buffer(30, image_format='webp').startswith(b'RIFF')
+        assert b'<svg' in plotter.plot_to_buffer(30, image_format='svg')
+        assert len(plotter.plot_to_buffer(30, compression=0)) > len(plotter.plot_to_buffer(30, compression=9))
+
+        with pytest.raises(ValueError):
+            plotter.plot_to_buffer(30, image_format='bmp')
+        with pytest.raises(ValueError):
+            plotter.plot_to_buffer(30, image_format='svg', compression=1)
+        with pytest.raises(ValueError):
+            plotter.plot_to_buffer(30, compression=10)
+
+    def test_plot_to_file_format_of_extension(self):
+        cad = CodescannerAnalysisData(self._test_binary_src)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            cad.plot_to_file(os.path.join(temp_dir, 'plot.webp'), 30, cad.COLOR_MAP)
+            cad.plot_to_file(os.path.join(temp_dir, 'plot.npy'), 30, cad.COLOR_MAP)
+            cad.plot_to_file(os.path.join(temp_dir, 'plot'), 30, cad.COLOR_MAP, 'svg')
+
+            with open(os.path.join(temp_dir, 'plot.webp'), 'rb') as f:
+                assert f.read(4) == b'RIFF'
+            assert numpy.load(os.path.join(temp_dir, 'plot.npy')).shape == (30 * 3.5, 30 * 16, 4)
+            with open(os.path.join(temp_dir, 'plot'), 'rb') as f:
+                assert b'<svg' in f.read()
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_render(self):
+        cad = CodescannerAnalysisData(self._test_binary_src)
+        plotter = ColorMap(self._test_binary_src, cad.regions)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            assert plotter.render(30) == plotter.plot_to_buffer(30)
+            assert plotter.render(30, (800, 300)) == plotter.plot_to_dynamic_size_buffer(30, 800, 300)
+
+            assert plotter.render(30, file_name=os.path.join(temp_dir, 'plot.webp')) is None
+            with open(os.path.join(temp_dir, 'plot.webp'), 'rb') as f:
+                assert f.read(4) == b'RIFF'
+        finally:
+            shutil.rmtree(temp_dir)
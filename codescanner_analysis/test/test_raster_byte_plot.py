@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+import numpy
+from _pytest.monkeypatch import MonkeyPatch
+
+from codescanner_analysis import BytePlot, ByteSummary, CodescannerAnalysisData, LodBytePlot
+from codescanner_analysis.raster_byte_plot import RasterBytePlot
+from codescanner_analysis.utils import file_utils
+from codescanner_analysis.test import helper
+
+
+class RasterBytePlotTest(unittest.TestCase):
+
+    def setUp(self):
+        self._test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self._test_binary_src = os.path.join(self._test_file_dir, 'testfile')
+
+    def test_region_labels(self):
+        regions = {'Code': [[0x10, 0x20, u'Intel', 64, 1]], 'Zero': [[0x20, 0x28]], 'Data': [[0x30, 0x40]],
+                   'Unknown': [[0x40, 0x50]]}
+        plotter = RasterBytePlot(self._test_binary_src, regions)
+
+        labels = plotter._region_labels(0x8, 0x48)
+        expected = numpy.full(0x40, -1, dtype=numpy.int8)
+        expected[0x8:0x18] = 0
+        expected[0x18:0x20] = 4
+        expected[0x28:0x38] = 5
+
+        assert labels.tolist() == expected.tolist()
+
+    def test_rasterize(self):
+        regions = {'Code': [[0, 0x100, u'Intel', 64, 1]], 'Data': [[0x100, 0x200]]}
+        plotter = RasterBytePlot(self._test_binary_src, regions)
+        byte_array = numpy.zeros(0x300, dtype=numpy.uint8)
+        byte_array[0:0x100] = numpy.arange(0x100)
+        byte_array[0x180] = 0x42
+
+        image = plotter._rasterize(byte_array, 3)
+
+        assert image.shape == (0x100, 3, 4)
+        # code: one byte per value
+        assert (image[:, 0, 3] > 0).all()
+        assert tuple(image[0x10, 0, :3]) == (0x00, 0xbf, 0xbf)
+        # data: 0xff zeros and one 0x42, zeros are denser
+        assert tuple(image[0x42, 1, :3]) == (0xbf, 0xbf, 0x00)
+        assert image[0x42, 1, 3] < image[0, 1, 3] == 0xff
+        assert (image[1:0x42, 1, 3] == 0).all()
+        # no region: base color
+        assert image[0, 2, 3] == 0xff
+        assert (image[1:, 2, 3] == 0).all()
+
+    def test_rasterize_many_regions(self):
+        size = 0x4000
+        dense_regions = helper.create_dense_regions(size)
+        regions = {'Ascii': dense_regions['A'], 'Zero': dense_regions['B'], 'Data': dense_regions['C']}
+        plotter = RasterBytePlot(self._test_binary_src, regions)
+        plotter.MAX_RUNS_PER_COLUMN = 1
+        byte_array = numpy.frombuffer(numpy.random.bytes(size), dtype=numpy.uint8)
+
+        image = plotter._rasterize(byte_array, 50)
+        plotter.MAX_RUNS_PER_COLUMN = size
+        expected = plotter._rasterize(byte_array, 50)
+
+        assert (image == expected).all()
+
+    def test_plot_to_file(self):
+        dpi = 50
+        img_path = os.path.join(tempfile.gettempdir(), 'RBPT-tptf.png')
+        expected_size = (dpi * RasterBytePlot.FIG_SIZE[0], dpi * RasterBytePlot.FIG_SIZE[1])
+
+        cad = CodescannerAnalysisData(self._test_binary_src)
+        cad.plot_to_file(img_path, dpi, cad.RASTER_BYTE_PLOT)
+
+        helper.assert_image_size(expected_size, img_path)
+        os.remove(img_path)
+
+        assert cad.plot_to_dynamic_size_buffer(72, 800, 400, cad.RASTER_BYTE_PLOT).startswith(helper.MAGIC_PNG_BYTES)
+
+    def test_lod_summary_image(self):
+        regions = {'Code': [[0, 0x180, u'Intel', 64, 1]], 'Data': [[0x180, 0x200]]}
+        plotter = LodBytePlot(self._test_binary_src, regions)
+        byte_array = numpy.zeros(0x300, dtype=numpy.uint8)
+        byte_array[0:0x100] = numpy.arange(0x100)
+
+        coverage = plotter._label_coverage(numpy.array([0, 0x100, 0x200, 0x300]))
+        image = plotter._summary_image(ByteSummary.from_array(byte_array, 3))
+
+        assert coverage[:, 1].tolist() == [0, 0x80, 0, 0, 0, 0, 0x80]
+        assert coverage.sum(axis=0).tolist() == [0x100] * 3
+        assert image.shape == (0x100, 3, 4)
+        assert (image[:, 0, 3] > 0).all()
+        assert tuple(image[0x10, 0, :3]) == (0x00, 0xbf, 0xbf)
+        # no region: base color
+        assert image[0, 2, 3] == 0xff
+        assert (image[1:, 2, 3] == 0).all()
+
+    def test_lod_plot(self):
+        cad = CodescannerAnalysisData(self._test_binary_src)
+        summary = cad.byte_summary()
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(file_utils, 'map_bytes', lambda *args: self.fail('read bytes with a summary'))
+        monkeypatch.setattr(CodescannerAnalysisData, 'MAX_PLOT_FILE_SIZE', 0x100)
+        try:
+            plotter = cad._init_plotter(cad.BYTE_PLOT)
+            assert isinstance(plotter, LodBytePlot)
+            assert cad.plot_to_buffer(30).startswith(helper.MAGIC_PNG_BYTES)
+        finally:
+            monkeypatch.undo()
+
+        assert cad.byte_summary() is summary
+        assert type(cad._init_plotter(cad.BYTE_PLOT)) is BytePlot
@@ -0,0 +1,125 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from _pytest.monkeypatch import MonkeyPatch
+
+from codescanner_analysis import ByteSummary
+from codescanner_analysis import EntropyTrace
+from codescanner_analysis import CodescannerAnalysisData
+from codescanner_analysis import ResultCache
+from codescanner_analysis.codescan_interface import CodescanInterface
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.test_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data')
+        self.test_file = os.path.join(self.test_file_dir, 'testfile')
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.temp_dir, 'results.db'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_key(self):
+        copy = os.path.join(self.temp_dir, 'renamed')
+        shutil.copy(self.test_file, copy)
+
+        assert self.cache.key(self.test_file) == self.cache.key(copy)
+        assert self.cache.key(self.test_file) != self.cache.key(self.test_file, 0, 0, 1)
+        assert self.cache.key(self.test_file) != self.cache.key(self.test_file, 0x100, 0x1000)
+
+        with open(copy, 'ab') as f:
+            f.write(b'\x00')
+        assert self.cache.key(self.test_file) != self.cache.key(copy)
+
+    def test_analysis_data_cache_hit(self):
+        expected = CodescannerAnalysisData(self.test_file, cache=self.cache)
+        assert len(self.cache) == 1
+
+        copy = os.path.join(self.temp_dir, 'renamed')
+        shutil.copy(self.test_file, copy)
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(CodescanInterface, 'run', lambda *args: self.fail('scanned on a cache hit'))
+        try:
+            cad = CodescannerAnalysisData(copy, cache=self.cache)
+        finally:
+            monkeypatch.undo()
+
+        assert expected.regions == cad.regions
+        assert expected.sizes == cad.sizes
+        assert expected.decision == cad.decision
+        assert expected.decision_detail == cad.decision_detail
+        assert type(expected.decision_detail) == type(cad.decision_detail)
+        assert expected.architecture == cad.architecture
+        assert expected.file_header == cad.file_header
+        assert len(self.cache) == 1
+
+    def test_eviction(self):
+        result = {field: None for field in ResultCache.FIELDS}
+        result['regions'] = {'Data': [[i, i + 1] for i in range(0, 2000, 7)]}
+
+        cache = ResultCache(self.cache.path, 1)
+        cache.put('too big', result)
+        assert len(cache) == 0
+        cache.close()
+
+        self.cache.put('a', result)
+        size = self.cache._connect().execute("SELECT size FROM results").fetchone()[0]
+        self.cache.max_size = 2 * size
+        self.cache.put('b', result)
+        assert self.cache.get('a') == result
+        self.cache.put('c', result)
+
+        assert len(self.cache) == 2
+        assert self.cache.get('b') is None
+        assert self.cache.get('a') == result
+        assert self.cache.get('c') == result
+
+    def test_pickle(self):
+        self.cache.put('a', {field: field for field in ResultCache.FIELDS})
+        cache = pickle.loads(pickle.dumps(self.cache))
+
+        assert cache.path == self.cache.path
+        assert cache.get('a')['decision'] == 'decision'
+        cache.close()
+
+    def test_byte_summary(self):
+        cad = CodescannerAnalysisData(self.test_file, cache=self.cache)
+        expected = cad.byte_summary(0x40)
+        assert len(self.cache) == 2
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(ByteSummary, 'from_file', lambda *args: self.fail('summarized on a cache hit'))
+        try:
+            summary = CodescannerAnalysisData(self.test_file, cache=self.cache).byte_summary(0x40)
+        finally:
+            monkeypatch.undo()
+
+        assert (summary.histograms == expected.histograms).all()
+        assert (summary.column_bounds == expected.column_bounds).all()
+
+    def test_entropy_trace(self):
+        cad = CodescannerAnalysisData(self.test_file, cache=self.cache)
+        expected = cad.entropy_trace(0x200, 0x80)
+        assert cad.entropy_trace(0x200, 0x80) is expected
+        assert len(self.cache) == 2
+
+        monkeypatch = MonkeyPatch()
+        monkeypatch.setattr(EntropyTrace, 'from_file', lambda *args: self.fail('computed on a cache hit'))
+        try:
+            trace = CodescannerAnalysisData(self.test_file, cache=self.cache).entropy_trace(0x200, 0x80)
+        finally:
+            monkeypatch.undo()
+
+        assert (trace.offsets == expected.offsets).all()
+        assert (trace.entropy == expected.entropy).all()
+
+        # every window and step is cached on its own
+        cad.entropy_trace(0x200, 0x100)
+        assert len(self.cache) == 3
@@ -2,71 +2,90 @@
 # Viviane - 9.12.2013
 # must be python3 compatible
 
+import math
 import numpy as np
 import os
+from collections import namedtuple
+
+from codescanner_analysis.utils import file_utils
 
 # (temporary) for numpy getlimits warning
 np.finfo(np.dtype("float64"))
 
+# bytes per vectorized pass of blockHistograms() and blockStatistics(), bounds the temporary memory
+BLOCK_CHUNK_SIZE = 0x400000
+
+# unit histograms per pass of slidingStatistics(), bounds its temporary memory (about 20 bytes per bin)
+SLIDING_CHUNK_UNITS = 0x1000
+# smaller units of slidingStatistics() have more bins than bytes, their windows are counted incrementally
+MIN_SLIDING_UNIT = 0x40
+
+# greater byte counts are not looked up in a table by histogramStatistics()
+MAX_ENTROPY_TABLE_COUNT = 0x10000
+
+# per block features, see blockStatistics()
+# offsets: block start offsets, sizes: bytes per block (only the last block may be shorter),
+# entropy: Shannon entropy in bits per byte [0...8], zero_ratio and ascii_ratio: [0...1]
+BlockStatistics = namedtuple('BlockStatistics', ['offsets', 'sizes', 'entropy', 'zero_ratio', 'ascii_ratio'])
+
 
-def loadInts(finame, starts=0, ends=0):
+def loadInts(finame, starts=0, ends=0, copy=True):
+    '''
+    Writable array of the file, with copy=False a read-only view of the shared memory map of the file
+    (see file_utils.map_file()), which does not read the bytes in advance.
+    '''
     if not os.path.isfile(finame):
         print("(FA) File '%s' does not exist." % (finame))
         return np.array([], dtype=np.uint32)
 
-    f = open(finame, 'rb')
-
     if (starts or ends):
-        from os import SEEK_SET
-        f.seek(starts, SEEK_SET)  # seek
-        X = np.fromfile(f, dtype=np.uint8, count=(ends - starts))
+        X = file_utils.map_bytes(finame, starts, ends)
     else:
-        X = np.fromfile(f, dtype=np.uint32)
+        X = file_utils.map_file(finame)
+        X = X[:(X.size // 4) * 4].view(np.uint32)
 
-    f.close()
+    return np.array(X) if copy else X
 
-    return X
 
-
-def load(finame, starts=0, ends=0):
+def load(finame, starts=0, ends=0, copy=True):
+    '''
+    Writable array of the file, with copy=False a read-only view of the shared memory map of the file
+    (see file_utils.map_file()), which does not read the bytes in advance.
+    '''
     if not os.path.isfile(finame):
         return np.array([], dtype=np.uint32)
 
-    f = open(finame, 'rb')
-
-    if (starts or ends):
-        from os import SEEK_SET
-        f.seek(starts, SEEK_SET)  # seek
-        X = np.fromfile(f, dtype=np.uint8, count=(ends - starts))
-    else:
-        X = np.fromfile(f, dtype=np.uint8)
-
-    f.close()
+    X = file_utils.map_bytes(finame, starts, ends)
 
-    return X
+    return np.array(X) if copy else X
 
 
 def splitblocks(block, blocksize):
-    howMany = block.shape[0] / blocksize
+    howMany = block.shape[0] // blocksize
     block = block[:(howMany * blocksize)]
     blocks = block.reshape(howMany, blocksize)
     return blocks
 
 
+def _countValues(block, start, last):
+    # one bincount instead of a comparison per value
+    block = np.asarray(block).ravel()
+    if block.dtype == np.uint8 and start == 0 and last == 255:
+        return np.bincount(block, minlength=0x100)
+
+    block = block[(block >= start) & (block <= last)]
+    block = block[block == np.floor(block)] if block.dtype.kind == 'f' else block
+
+    return np.bincount((block - start).astype(np.intp), minlength=(last - start) + 1)
+
+
 # Absolute
 def sortPerFrequencies(block, start=0, last=0):
     if not last:
         start = 0
         last = 255
 
-    freqrange = (last - start) + 1
-    freqs = np.zeros(freqrange, dtype=np.float32)
-
-    # sort per frequency
-    for i in range(0, freqrange):
-        freqs[i] = block[block == (start + i)].shape[0]
-
-    return freqs
+    return _countValues(block, start, last).astype(np.float32)
 
 
 # Normalized [0...1] or as percentage
@@ -79,18 +98,196 @@ def sortPerFrequencies_Normalized(block, start=0, last=0):
     if not size:
         return np.zeros((0))
 
-    freqrange = (last - start) + 1
-    freqs = np.zeros(freqrange, dtype=np.float32)
-
-    # sort per frequency
-    for i in range(0, freqrange):
-        freqs[i] = block[block == (start + i)].shape[0]
-
+    freqs = _countValues(block, start, last).astype(np.float32)
     freqs /= size
 
     return freqs
 
 
+def blockHistograms(block, blocksize):
+    '''
+    Byte value histograms of consecutive blocks, one bincount per BLOCK_CHUNK_SIZE bytes.
+
+    :param block: numpy uint8 array, e.g. of load()
+    :param blocksize: bytes per block, the last block holds the remaining bytes
+    :return: numpy uint32 array of shape (blocks, 0x100)
+    '''
+    if blocksize < 1:
+        raise ValueError("ValueError: Block size must be at least 1.")
+
+    block = np.asarray(block, dtype=np.uint8).ravel()
+    full = block.size // blocksize
+    histograms = np.zeros((full + (block.size % blocksize > 0), 0x100), dtype=np.uint32)
+    rowsPerChunk = max(1, BLOCK_CHUNK_SIZE // max(blocksize, 0x100))
+
+    for first in range(0, full, rowsPerChunk):
+        rows = splitblocks(block[first * blocksize:(first + rowsPerChunk) * blocksize], blocksize)
+        # value + 0x100 * row: every row counts into its own 0x100 bins
+        index = rows + (np.arange(rows.shape[0], dtype=np.intp) << 8)[:, None]
+        counts = np.bincount(index.ravel(), minlength=rows.shape[0] * 0x100)
+        histograms[first:first + rows.shape[0]] = counts.reshape(-1, 0x100)
+
+    if full < histograms.shape[0]:
+        histograms[full] = np.bincount(block[full * blocksize:], minlength=0x100)
+
+    return histograms
+
+
+def histogramStatistics(histograms):
+    '''
+    :param histograms: byte value histograms of shape (blocks, 0x100), see blockHistograms()
+    :return: sizes, entropy (bits per byte), zero ratio and printable ASCII ratio of every block
+             (0x20 to 0x7e, tab, line feed and carriage return),
+             0 for empty blocks
+    '''
+    histograms = np.asarray(histograms).reshape(-1, 0x100)
+    sizes = histograms.sum(axis=1, dtype=np.int64)
+    divisor = np.maximum(sizes, 1)
+
+    # entropy = log2(size) - sum(c * log2(c)) / size, c * log2(c) is looked up for small counts
+    largest = int(histograms.max()) if histograms.size else 0
+    if largest <= MAX_ENTROPY_TABLE_COUNT:
+        counts = np.arange(largest + 1, dtype=np.float64)
+        cLogC = (counts * np.log2(np.maximum(counts, 1)))[histograms]
+    else:
+        counts = histograms.astype(np.float64)
+        cLogC = counts * np.log2(counts, out=np.zeros_like(counts), where=counts > 0)
+    entropy = np.maximum(np.log2(divisor) - cLogC.sum(axis=1) / divisor, 0.0)
+
+    asciiCounts = histograms[:, 0x20:0x7f].sum(axis=1, dtype=np.int64) + \
+        histograms[:, [0x09, 0x0a, 0x0d]].sum(axis=1, dtype=np.int64)
+
+    return sizes, entropy, histograms[:, 0] / divisor, asciiCounts / divisor
+
+
+def blockStatistics(block, blocksize=0x1000, offset=0):
+    '''
+    Entropy, zero ratio and printable ASCII ratio of consecutive blocks,
+    computed chunk by chunk from their histograms, so the memory does not grow with the size of block.
+
+    :param block: numpy uint8 array, e.g. of load()
+    :param blocksize: bytes per block, the last block holds the remaining bytes
+    :param offset: offset of the first byte of block, added to the block offsets
+    :return: BlockStatistics
+    '''
+    if blocksize < 1:
+        raise ValueError("ValueError: Block size must be at least 1.")
+
+    block = np.asarray(block, dtype=np.uint8).ravel()
+    chunkSize = max(1, BLOCK_CHUNK_SIZE // blocksize) * blocksize
+    parts = [histogramStatistics(blockHistograms(block[i:i + chunkSize], blocksize))
+             for i in range(0, block.size, chunkSize)]
+
+    if not parts:
+        parts = [histogramStatistics(np.zeros((0, 0x100), dtype=np.uint32))]
+
+    sizes, entropy, zeroRatio, asciiRatio = [np.concatenate(columns) for columns in zip(*parts)]
+    offsets = offset + np.arange(sizes.size, dtype=np.int64) * blocksize
+
+    return BlockStatistics(offsets, sizes, entropy, zeroRatio, asciiRatio)
+
+
+def slidingStatistics(block, window, step, offset=0):
+    '''
+    blockStatistics() of the windows [i * step, i * step + window) of block, which fit into it.
+    Block smaller than window are a single window.
+
+    Linear in the size of block: histograms of gcd(window, step) sized units are counted once,
+    the window histograms are differences of their cumulative sums, at most SLIDING_CHUNK_UNITS units at a time.
+    Windows of more units or of units smaller than MIN_SLIDING_UNIT are counted incrementally,
+    from the bytes leaving and entering the window.
+
+    :param block: numpy uint8 array, e.g. of load()
+    :param window: bytes per window
+    :param step: distance of the window starts, a divisor of window is fastest
+    :param offset: offset of the first byte of block, added to the window offsets
+    :return: BlockStatistics, offsets are the window starts
+    '''
+    if window < 1 or step < 1:
+        raise ValueError("ValueError: Window and step must be at least 1.")
+
+    block = np.asarray(block, dtype=np.uint8).ravel()
+    if block.size <= window:
+        return blockStatistics(block, max(1, block.size), offset)
+
+    count = (block.size - window) // step + 1
+    unit = math.gcd(window, step)
+    if unit >= MIN_SLIDING_UNIT and window // unit <= SLIDING_CHUNK_UNITS:
+        parts = _unitWindowHistograms(block, window, step, count)
+    else:
+        parts = _incrementalWindowHistograms(block, window, step, count)
+
+    sizes, entropy, zeroRatio, asciiRatio = [np.concatenate(columns) for columns in
+                                             zip(*[histogramStatistics(h) for h in parts])]
+    offsets = offset + np.arange(count, dtype=np.int64) * step
+
+    return BlockStatistics(offsets, sizes, entropy, zeroRatio, asciiRatio)
+
+
+def _unitWindowHistograms(block, window, step, count):
+    '''
+    Window histograms of slidingStatistics() from the cumulative sums of unit histograms, chunk by chunk.
+    '''
+    unit = math.gcd(window, step)
+    unitsPerWindow = window // unit
+    unitsPerStep = step // unit
+    # the units of a chunk: (windows - 1) * unitsPerStep + unitsPerWindow
+    windowsPerChunk = min(max(1, BLOCK_CHUNK_SIZE // max(step, 0x100)),
+                          (SLIDING_CHUNK_UNITS - unitsPerWindow) // unitsPerStep + 1)
+
+    for first in range(0, count, windowsPerChunk):
+        n = min(windowsPerChunk, count - first)
+        start = first * step
+        histograms = blockHistograms(block[start:start + (n - 1) * step + window], unit)
+
+        cumulative = np.zeros((histograms.shape[0] + 1, 0x100), dtype=np.int64)
+        np.cumsum(histograms, axis=0, out=cumulative[1:])
+        starts = np.arange(n, dtype=np.intp) * unitsPerStep
+        yield cumulative[starts + unitsPerWindow] - cumulative[starts]
+
+
+def _incrementalWindowHistograms(block, window, step, count):
+    '''
+    Window histograms of slidingStatistics() for windows of many small units:
+    every window is the last one without the bytes before its start and with the bytes up to its end.
+    '''
+    windowsPerChunk = max(1, SLIDING_CHUNK_UNITS // 2)
+    histogram = _byteHistogram(block[:window])
+
+    for first in range(0, count, windowsPerChunk):
+        n = min(windowsPerChunk, count - first)
+        histograms = np.empty((n, 0x100), dtype=np.int64)
+        for i in range(n):
+            start = (first + i) * step
+            if first + i == 0:
+                pass
+            elif step < window:
+                histogram -= _byteHistogram(block[start - step:start])
+                histogram += _byteHistogram(block[start - step + window:start + window])
+            else:
+                histogram = _byteHistogram(block[start:start + window])
+            histograms[i] = histogram
+        yield histograms
+
+
+def _byteHistogram(block):
+    '''
+    :return: byte value histogram of block, one bincount per BLOCK_CHUNK_SIZE bytes
+    '''
+    histogram = np.zeros(0x100, dtype=np.int64)
+    for i in range(0, block.size, BLOCK_CHUNK_SIZE):
+        histogram += np.bincount(block[i:i + BLOCK_CHUNK_SIZE], minlength=0x100)
+
+    return histogram
+
+
+def fileBlockStatistics(finame, blocksize=0x1000, starts=0, ends=0):
+    '''
+    blockStatistics() of the bytes [starts, ends) of a file, read from its shared memory map.
+    '''
+    return blockStatistics(load(finame, starts, ends, copy=False), blocksize, starts)
+
+
 def toDigital(B):
     # get start and end indices
     MatrixA = np.zeros((B.size + 2))
@@ -1,4 +1,20 @@
+import hashlib
 import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy
+
+# shared read-only maps of whole files, see map_file()
+_mapped_files = weakref.WeakValueDictionary()
+_mapped_files_lock = threading.Lock()
+
+# digests of the most recently hashed files, see file_digest()
+MAX_CACHED_DIGESTS = 0x400
+_file_digests = OrderedDict()
+_file_digests_lock = threading.Lock()
 
 
 def sanitize_file_name(file_name, check_existence=True):
@@ -6,3 +22,178 @@ def sanitize_file_name(file_name, check_existence=True):
     if check_existence and not os.path.isfile(file_name):
         raise IOError('IOError: Source file does not exist: %s' % file_name)
     return file_name
+
+
+def file_digest(file_name, chunk_size=0x100000):
+    '''
+    sha256 hex digest of the content of a file, read in chunks of chunk_size.
+    Cached per process by file identity (device, inode, size, mtime), a file is only hashed again after a change.
+    '''
+    stat = os.stat(file_name)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    with _file_digests_lock:
+        hexdigest = _file_digests.get(key)
+        if hexdigest is not None:
+            _file_digests.move_to_end(key)
+            return hexdigest
+
+    digest = hashlib.sha256()
+    view = memoryview(bytearray(chunk_size))
+
+    with open(file_name, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            digest.update(view[:n])
+
+    hexdigest = digest.hexdigest()
+    with _file_digests_lock:
+        _file_digests[key] = hexdigest
+        if len(_file_digests) > MAX_CACHED_DIGESTS:
+            _file_digests.popitem(last=False)
+
+    return hexdigest
+
+
+def map_file(file_name):
+    '''
+    Shared, read-only memory map of a whole file as numpy uint8 array.
+    Nothing is read up front, only the pages actually accessed are read by the kernel.
+    The map is shared by all callers as long as anybody holds it (or a slice of it),
+    a changed file (size, mtime) gets a new map.
+
+    :param file_name: the file path
+    :return: read-only numpy uint8 array
+    '''
+    stat = os.stat(file_name)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    with _mapped_files_lock:
+        array = _mapped_files.get(key)
+        if array is None:
+            if stat.st_size == 0:
+                # empty files can not be mapped
+                array = numpy.zeros(0, dtype=numpy.uint8)
+                array.flags.writeable = False
+            else:
+                array = numpy.memmap(file_name, dtype=numpy.uint8, mode='r').view(numpy.ndarray)
+            _mapped_files[key] = array
+
+    return array
+
+
+def map_bytes(file_name, start=0, end=0):
+    '''
+    Read-only window [start, end) of a file, see map_file().
+
+    :param file_name: the file path
+    :param start: start offset
+    :param end: end offset (exclusive), 0 for the end of the file
+    :return: read-only numpy uint8 array
+    '''
+    array = map_file(file_name)
+    if end:
+        return array[start:end]
+
+    return array[start:]
+
+
+class MemoryFile(object):
+    '''
+    Exposes an in-memory buffer (bytes, bytearray, memoryview, numpy array, ...) under a file path.
+
+    libcodescan only accepts file names, so the buffer is written once into an anonymous memory file
+    (memfd, Linux) and handed over as /proc/self/fd/<fd>. Nothing touches the disk.
+    On other systems a temporary file is used as fallback.
+    The path is valid until close() is called.
+    '''
+    COPY_CHUNK_SIZE = 0x4000000
+
+    def __init__(self, buffer=b''):
+        self._fd = None
+        self._temp_name = None
+
+        view = memoryview(buffer)
+        if not view.contiguous:
+            raise ValueError('ValueError: Buffer has to be contiguous.')
+        view = view.cast('B')
+
+        self.size = 0
+
+        if hasattr(os, 'memfd_create') and os.path.isdir('/proc/self/fd'):
+            self._fd = os.memfd_create('codescan', 0)
+            self.name = '/proc/self/fd/%d' % self._fd
+        else:
+            self._fd, self._temp_name = tempfile.mkstemp(prefix='codescan-')
+            self.name = self._temp_name
+
+        try:
+            self._write(view)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def from_file(cls, file_name, start, end):
+        '''
+        Copy the window [start, end) of a file into a memory file.
+        The copy is done by the kernel (sendfile), where possible.
+        '''
+        memory_file = cls()
+        try:
+            with open(file_name, 'rb') as f:
+                memory_file._copy(f.fileno(), start, end - start)
+        except Exception:
+            memory_file.close()
+            raise
+
+        return memory_file
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write(self, view):
+        written = 0
+        while written < view.nbytes:
+            written += os.write(self._fd, view[written:])
+        self.size += written
+
+        return written
+
+    def _copy(self, fd, offset, count):
+        use_sendfile = hasattr(os, 'sendfile')
+
+        while count > 0:
+            chunk_size = min(count, self.COPY_CHUNK_SIZE)
+            if use_sendfile:
+                try:
+                    copied = os.sendfile(self._fd, fd, offset, chunk_size)
+                    self.size += copied
+                except OSError:
+                    use_sendfile = False
+                    continue
+            else:
+                copied = self._write(memoryview(os.pread(fd, chunk_size, offset)))
+
+            if copied == 0:
+                # end of file
+                break
+
+            offset += copied
+            count -= copied
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._temp_name is not None:
+            os.remove(self._temp_name)
+            self._temp_name = None
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Interval arithmetic on regions: sets of half-open byte ranges [start, end).
+# All functions take lists of [start, end, ...] regions or (n, 2) arrays and return
+# normalized intervals: a numpy int64 array of shape (n, 2), sorted, without empty, overlapping or touching intervals.
+# Time is O(n log n) and memory O(n) in the number of intervals, independent of the covered sizes.
+
+import numpy as np
+
+
+def as_array(regions):
+    '''
+    :param regions: iterable of [start, end, ...] regions, or an array of shape (n, >= 2)
+    :return: numpy int64 array of shape (n, 2), in the given order
+    '''
+    if isinstance(regions, np.ndarray):
+        return regions.reshape(-1, regions.shape[-1] if regions.ndim > 1 else 2)[:, :2].astype(np.int64)
+
+    return np.array([r[0:2] for r in regions], dtype=np.int64).reshape(-1, 2)
+
+
+def normalize(regions):
+    '''
+    Sort and merge overlapping and touching regions, drop empty ones.
+
+    :return: normalized intervals
+    '''
+    intervals = as_array(regions)
+    intervals = intervals[intervals[:, 1] > intervals[:, 0]]
+    if len(intervals) == 0:
+        return intervals
+
+    intervals = intervals[np.argsort(intervals[:, 0], kind='stable')]
+    ends = np.maximum.accumulate(intervals[:, 1])
+
+    # a new interval starts where the start lies behind all ends before
+    first = np.ones(len(intervals), dtype=bool)
+    first[1:] = intervals[1:, 0] > ends[:-1]
+    last = np.ones(len(intervals), dtype=bool)
+    last[:-1] = first[1:]
+
+    return np.column_stack((intervals[first, 0], ends[last]))
+
+
+def union(a, b):
+    return normalize(np.concatenate((as_array(a), as_array(b))))
+
+
+def intersection(a, b):
+    return _combine(a, b, np.logical_and)
+
+
+def difference(a, b):
+    '''
+    :return: normalized intervals of a, which are not covered by b
+    '''
+    return _combine(a, b, lambda in_a, in_b: in_a & ~in_b)
+
+
+def containing(regions, intervals):
+    '''
+    Find a region containing each interval.
+
+    :param regions: regions (not necessarily sorted)
+    :param intervals: the intervals to look up
+    :return: numpy array of indices into regions, -1 for intervals not contained in any region;
+             if several regions contain an interval, the one reaching furthest is chosen
+    '''
+    regions = as_array(regions)
+    intervals = as_array(intervals)
+    if len(regions) == 0:
+        return np.full(len(intervals), -1, dtype=np.int64)
+
+    order = np.argsort(regions[:, 0], kind='stable')
+    starts = regions[order, 0]
+    ends = regions[order, 1]
+
+    # furthest reaching region of all regions starting at or before each region start
+    furthest = np.maximum.accumulate(ends)
+    furthest_index = np.maximum.accumulate(np.where(ends >= furthest, np.arange(len(ends)), 0))
+
+    candidates = np.searchsorted(starts, intervals[:, 0], 'right') - 1
+    valid = candidates >= 0
+    candidates = np.maximum(candidates, 0)
+    contained = valid & (furthest[candidates] >= intervals[:, 1])
+
+    return np.where(contained, order[furthest_index[candidates]], -1)
+
+
+def _combine(a, b, operation):
+    '''
+    Split the number line at all bounds of a and b into elementary segments,
+    keep the segments for which operation(in a, in b) holds and merge them.
+    '''
+    a = normalize(a)
+    b = normalize(b)
+
+    points = np.unique(np.concatenate((a.ravel(), b.ravel())))
+    if len(points) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    # a point lies in normalized intervals, if an odd number of their bounds is <= point
+    segment_starts = points[:-1]
+    in_a = np.searchsorted(a.ravel(), segment_starts, 'right') % 2 == 1
+    in_b = np.searchsorted(b.ravel(), segment_starts, 'right') % 2 == 1
+    selected = operation(in_a, in_b)
+
+    before = np.concatenate(([False], selected[:-1]))
+    after = np.concatenate((selected[1:], [False]))
+
+    return np.column_stack((points[:-1][selected & ~before], points[1:][selected & ~after]))